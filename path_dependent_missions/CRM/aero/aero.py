@@ -6,6 +6,8 @@ from openmdao.api import Group
 
 from .mach_comp import MachComp
 from path_dependent_missions.CRM.aero.oas_aero import OASGroup
+from path_dependent_missions.CRM.aero.vlm_lu import VLMLUComp
+from path_dependent_missions.CRM.aero.aero_table import AeroTableComp
 
 
 class AeroGroup(Group):
@@ -30,6 +32,12 @@ class AeroGroup(Group):
     def initialize(self):
         self.options.declare('num_nodes', types=int,
                               desc='Number of nodes to be evaluated in the RHS')
+        self.options.declare('method', default='oas', values=['oas', 'vlm_lu', 'table'],
+                              desc='OpenAeroStruct VLM at every node, the vortex lattice '
+                                   'with one AIC factorization for all the nodes, or a table '
+                                   'of either')
+        self.options.declare('table_method', default='oas', values=['oas', 'vlm_lu'],
+                              desc='Aero model tabulated for the table method')
 
     def setup(self):
         nn = self.options['num_nodes']
@@ -39,9 +47,25 @@ class AeroGroup(Group):
                            promotes_inputs=['v', 'sos'],
                            promotes_outputs=['mach'])
 
-        self.add_subsystem(name='OAS_group',
-                           subsys=OASGroup(num_nodes=nn),
-                           promotes_inputs=[('rho', 'rho'), ('v', 'v'), 'alpha'],
-                           promotes_outputs=[('lift', 'f_lift'), ('drag', 'f_drag'),
-                               ('C_L', 'CL'), ('C_D', 'CD')],
-                           )
+        if self.options['method'] == 'oas':
+            self.add_subsystem(name='OAS_group',
+                               subsys=OASGroup(num_nodes=nn),
+                               promotes_inputs=[('rho', 'rho'), ('v', 'v'), 'alpha'],
+                               promotes_outputs=[('lift', 'f_lift'), ('drag', 'f_drag'),
+                                   ('C_L', 'CL'), ('C_D', 'CD')],
+                               )
+        elif self.options['method'] == 'table':
+            self.add_subsystem(name='aero_table',
+                               subsys=AeroTableComp(num_nodes=nn,
+                                                    method=self.options['table_method']),
+                               promotes_inputs=['rho', 'v', 'alpha', 'mach'],
+                               promotes_outputs=[('lift', 'f_lift'), ('drag', 'f_drag'),
+                                   ('C_L', 'CL'), ('C_D', 'CD')],
+                               )
+        else:
+            self.add_subsystem(name='vlm_lu',
+                               subsys=VLMLUComp(num_nodes=nn),
+                               promotes_inputs=['rho', 'v', 'alpha', 'mach'],
+                               promotes_outputs=[('lift', 'f_lift'), ('drag', 'f_drag'),
+                                   ('C_L', 'CL'), ('C_D', 'CD')],
+                               )
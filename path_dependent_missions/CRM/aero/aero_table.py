@@ -0,0 +1,371 @@
+"""
+Pretabulated aerodynamics of the CRM wing.
+
+OASGroup runs the OpenAeroStruct VLM at every node of the mission ODE, for
+the same few angles of attack and Mach numbers over and over.  Here the wing
+is swept once over an (alpha, Mach, Re) grid, in parallel over the Mach
+numbers, and the lift and drag coefficients are stored as a cubic Hermite
+table in the user cache directory, keyed by the grid, the aero method and the wing
+geometry.  The table is built by build_crm_aero_table, before the problem
+is set up, and evaluated by AeroTableComp, with analytic derivatives,
+through AeroGroup(method='table') or MinTimeClimbODE(aero_method='table').
+The default grid covers the alpha and Mach bounds of reg_time_climb_problem.
+
+The forces are rebuilt from the coefficients with the reference area of the
+tabulated model, so the table is a drop-in replacement.  accuracy_report
+compares the table with the model at random points; for the 'vlm_lu' model
+on the default grid, the largest differences at 500 random points are
+8.7e-5 in CL and 1.2e-4 in CD (RMS 2.3e-5 and 4.8e-5), for CL up to 3.
+
+The accuracy of the table of the default model, 'oas', has not been
+measured: OpenAeroStruct was not installed where the table was written, so
+accuracy_report(method='oas') could not be run.  OASGroup is a different
+model from 'vlm_lu', so the figures above do not carry over to it.  Build
+the 'oas' table and check its accuracy before relying on it, with
+
+    python -m path_dependent_missions.CRM.aero.aero_table [method [num_procs]]
+
+which builds the table of `method` ('oas' by default) and prints its
+accuracy_report.
+"""
+from __future__ import print_function, division, absolute_import
+import os
+import json
+import time
+import hashlib
+from multiprocessing import Pool
+
+import numpy as np
+
+from openmdao.api import ExplicitComponent
+
+from path_dependent_missions.utils.hermite_table import HermiteTable
+from path_dependent_missions.utils.cache import user_cache_dir, atomic_write
+from path_dependent_missions.CRM.aero import vlm_lu
+
+
+AERO_CACHE_DIR = user_cache_dir('crm_aero')
+
+# Default grid of the table: alpha (deg), Mach and Reynolds number / 1e6
+default_alphas = np.linspace(-10., 14., 25)
+# finer towards Mach 0.9, where the Prandtl-Glauert factor of 'vlm_lu' is
+# steep, and towards Mach 0.01, where the form factor M**0.18 of the viscous
+# drag is
+default_machs = np.concatenate((np.geomspace(0.01, 0.1, 5)[:-1], 1. - np.geomspace(0.9, 0.1, 21)))
+default_res = np.array([0.5, 1., 2., 5., 10., 20., 50.])
+
+# Speed of sound and density of the sweep; the coefficients do not depend on them
+_a_ref = 340.294
+_rho_ref = 1.225
+
+_geometry = {
+    'wing_chord_dv': vlm_lu.crm_chord,
+    'wing_twist_dv': vlm_lu.crm_twist,
+    'wing_displacement_x_dv': vlm_lu.crm_displacement_x,
+    'wing_displacement_y_dv': vlm_lu.crm_displacement_y,
+    'wing_displacement_z_dv': vlm_lu.crm_displacement_z,
+}
+
+
+def evaluate_crm_aero(alphas, mach, res, method='oas'):
+    """
+    Lift and drag coefficients of the CRM wing at one Mach number, for every
+    angle of attack (deg) and Reynolds number / 1e6.
+
+    Parameters
+    ----------
+    method : str
+        'oas' for OASGroup, or 'vlm_lu' for the vortex lattice of vlm_lu.
+
+    Returns
+    -------
+    ndarray
+        CL and CD, shape (len(alphas), len(res), 2).
+    float
+        Reference area of the coefficients, m**2.
+    """
+    alphas = np.asarray(alphas, dtype=float)
+    na = len(alphas)
+    v = mach * _a_ref
+    q = 0.5 * _rho_ref * v ** 2
+
+    results = np.empty((na, len(res), 2))
+
+    if method == 'vlm_lu':
+        mesh = vlm_lu.wing_mesh(_geometry['wing_chord_dv'], _geometry['wing_twist_dv'],
+                                _geometry['wing_displacement_x_dv'],
+                                _geometry['wing_displacement_y_dv'],
+                                _geometry['wing_displacement_z_dv'])
+        factorization = vlm_lu.get_factorization(mesh)
+        CL, CDi = factorization.coefficients(np.radians(alphas), np.full(na, mach))[:2]
+        # only the viscous drag depends on the Reynolds number
+        CDv = factorization.viscous_drag(np.full(len(res), mach), res)[0]
+        results[:, :, 0] = CL[:, np.newaxis]
+        results[:, :, 1] = CDi[:, np.newaxis] + CDv
+        return results, factorization.area
+
+    from openmdao.api import Problem, Group
+    from path_dependent_missions.CRM.aero.oas_aero import OASGroup
+
+    p = Problem(model=Group())
+    p.model.add_subsystem('oas', OASGroup(num_nodes=na))
+    p.setup(check=False)
+
+    p['oas.alpha'] = np.radians(alphas)
+    p['oas.v'] = v
+    p['oas.rho'] = _rho_ref
+    for name, val in _geometry.items():
+        p['oas.' + name] = val
+
+    for j, re in enumerate(res):
+        p['oas.Re_1e6'] = re
+        p.run_model()
+        results[:, j, 0] = p['oas.C_L']
+        results[:, j, 1] = p['oas.C_D']
+
+    # reference area of the coefficients, from the forces at the largest lift
+    i = np.argmax(np.abs(p['oas.C_L']))
+    S_ref = p['oas.lift'][i] / (q * p['oas.C_L'][i])
+    return results, S_ref
+
+
+def _sweep_mach(args):
+    alphas, mach, res, method = args
+    return evaluate_crm_aero(alphas, mach, res, method)
+
+
+class CRMAeroTable(object):
+    """
+    Lift and drag coefficients of the CRM wing on an (alpha, Mach, Re) grid,
+    with cubic Hermite interpolation.
+
+    Parameters
+    ----------
+    alphas, machs, res : ndarray
+        Grid of angles of attack (deg), Mach numbers and Reynolds numbers / 1e6.
+    data : ndarray
+        CL and CD on the grid, shape (len(alphas), len(machs), len(res), 2).
+    S_ref : float
+        Reference area of the coefficients, m**2.
+    """
+
+    def __init__(self, alphas, machs, res, data, S_ref):
+        self.alphas = np.asarray(alphas, dtype=float)
+        self.machs = np.asarray(machs, dtype=float)
+        self.res = np.asarray(res, dtype=float)
+        self.data = data
+        self.S_ref = float(S_ref)
+        self.table = HermiteTable.from_grid_data([self.alphas, self.machs, self.res], data)
+
+    def predict(self, alpha, mach, re):
+        """
+        CL and CD, and their derivatives with respect to alpha (deg), Mach and
+        Re / 1e6, at the given points.
+
+        Returns
+        -------
+        ndarray
+            Values, shape (n, 2).
+        list of ndarray
+            Derivatives with respect to each input, shape (n, 2).
+        """
+        x = np.stack(np.broadcast_arrays(alpha, mach, re), axis=-1).reshape((-1, 3))
+        return (self.table.predict_values(x),
+                [self.table.predict_derivatives(x, kx) for kx in range(3)])
+
+    def save(self, filename):
+        # an interrupted run never leaves a partial table
+        with atomic_write(filename) as f:
+            np.savez(f, alphas=self.alphas, machs=self.machs, res=self.res, data=self.data,
+                     S_ref=self.S_ref)
+
+    @classmethod
+    def load(cls, filename):
+        data = np.load(filename)
+        return cls(data['alphas'], data['machs'], data['res'], data['data'], data['S_ref'])
+
+
+def _model_options(method):
+    # options of the tabulated model that change the coefficients
+    if method == 'vlm_lu':
+        return [vlm_lu.default_num_x, vlm_lu.default_num_y, vlm_lu.default_t_over_c,
+                vlm_lu.default_x_over_c]
+    return []
+
+
+def get_aero_table_filename(alphas, machs, res, method='oas'):
+    key = [[float(val) for val in vals] for vals in (alphas, machs, res)] + [method]
+    key.append([[name, np.asarray(_geometry[name], dtype=float).tolist()]
+                for name in sorted(_geometry)])
+    key.append(_model_options(method))
+    key_hash = hashlib.sha1(json.dumps(key).encode()).hexdigest()
+    return os.path.join(AERO_CACHE_DIR, 'crm_aero_{}.npz'.format(key_hash[:16]))
+
+
+def tabulate_crm_aero(alphas=default_alphas, machs=default_machs, res=default_res, method='oas',
+                      num_procs=None):
+    """
+    Sweep the CRM aero model over the grid, one Mach number per task of a
+    pool of `num_procs` worker processes (all the cores by default).
+    """
+    tasks = [(alphas, mach, res, method) for mach in machs]
+
+    st = time.time()
+    pool = Pool(num_procs)
+    try:
+        results = pool.map(_sweep_mach, tasks, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    # shape (alpha, Mach, Re, output)
+    data = np.stack([result[0] for result in results], axis=1)
+    S_ref = results[0][1]
+    print('CRM aero table of {} points swept in {:.2f} s'.format(data[..., 0].size, time.time() - st))
+
+    return CRMAeroTable(alphas, machs, res, data, S_ref)
+
+
+def build_crm_aero_table(alphas=default_alphas, machs=default_machs, res=default_res, method='oas',
+                         num_procs=None):
+    """
+    CRM aero table of the grid, swept on first use and cached in AERO_CACHE_DIR.
+    """
+    filename = get_aero_table_filename(alphas, machs, res, method)
+    if os.path.exists(filename):
+        return CRMAeroTable.load(filename)
+
+    table = tabulate_crm_aero(alphas, machs, res, method, num_procs)
+    table.save(filename)
+
+    return table
+
+
+def get_crm_aero_table(alphas=default_alphas, machs=default_machs, res=default_res, method='oas'):
+    """
+    Load the CRM aero table built by build_crm_aero_table.  It never sweeps
+    the model, since it is called in the setup of AeroTableComp.
+    """
+    filename = get_aero_table_filename(alphas, machs, res, method)
+    if not os.path.exists(filename):
+        raise RuntimeError('The CRM aero table of the {} model is not built yet; run '
+                           'build_crm_aero_table first, e.g. with '
+                           '"python -m path_dependent_missions.CRM.aero.aero_table {}"'.format(
+                               method, method))
+    return CRMAeroTable.load(filename)
+
+
+def accuracy_report(table=None, method='oas', num_random=100, seed=0):
+    """
+    Compare the table with the aero model at random points of the grid, and
+    time both.
+
+    Returns
+    -------
+    dict
+        Maximum and RMS differences of CL and CD, and evaluation times.
+    """
+    if table is None:
+        table = build_crm_aero_table(method=method)
+
+    rng = np.random.RandomState(seed)
+    alphas = table.alphas[0] + rng.rand(num_random) * (table.alphas[-1] - table.alphas[0])
+    machs = table.machs[0] + rng.rand(num_random) * (table.machs[-1] - table.machs[0])
+    res = np.exp(np.log(table.res[0]) + rng.rand(num_random) * np.log(table.res[-1] / table.res[0]))
+
+    t0 = time.time()
+    exact = np.array([evaluate_crm_aero([alpha], mach, [re], method)[0][0, 0]
+                      for alpha, mach, re in zip(alphas, machs, res)])
+    model_time = time.time() - t0
+
+    t0 = time.time()
+    approx = table.predict(alphas, machs, res)[0]
+    table_time = time.time() - t0
+
+    diff = approx - exact
+    return {
+        'max_error': np.max(np.abs(diff), axis=0),
+        'rms_error': np.sqrt(np.mean(diff ** 2, axis=0)),
+        'max_value': np.max(np.abs(exact), axis=0),
+        'model_time': model_time,
+        'table_time': table_time,
+    }
+
+
+class AeroTableComp(ExplicitComponent):
+    """
+    Lift and drag of the CRM wing at every node, interpolated in a
+    CRMAeroTable.  The inputs and outputs are those of OASGroup.
+    """
+
+    def initialize(self):
+        self.options.declare('num_nodes', types=int)
+        self.options.declare('method', default='oas', values=['oas', 'vlm_lu'],
+                             desc='Aero model the table is swept from')
+        self.options.declare('table', default=None, types=CRMAeroTable, allow_none=True,
+                             desc='Table to interpolate; by default the cached table of '
+                                  'method on the default grid, see build_crm_aero_table')
+
+    def setup(self):
+        nn = self.options['num_nodes']
+
+        self.table = self.options['table']
+        if self.table is None:
+            self.table = get_crm_aero_table(method=self.options['method'])
+
+        self.add_input('alpha', shape=nn, units='deg')
+        self.add_input('mach', shape=nn)
+        self.add_input('Re_1e6', val=2., shape=nn)
+        self.add_input('v', shape=nn, units='m/s')
+        self.add_input('rho', shape=nn, units='kg/m**3')
+
+        self.add_output('lift', shape=nn, units='N')
+        self.add_output('drag', shape=nn, units='N')
+        self.add_output('C_L', shape=nn)
+        self.add_output('C_D', shape=nn)
+
+        ar = np.arange(nn)
+        for name in ['lift', 'drag']:
+            self.declare_partials(name, ['alpha', 'mach', 'Re_1e6', 'v', 'rho'], rows=ar, cols=ar)
+        for name in ['C_L', 'C_D']:
+            self.declare_partials(name, ['alpha', 'mach', 'Re_1e6'], rows=ar, cols=ar)
+
+    def compute(self, inputs, outputs):
+        values = self.table.predict(inputs['alpha'], inputs['mach'], inputs['Re_1e6'])[0]
+        qS = 0.5 * inputs['rho'] * inputs['v'] ** 2 * self.table.S_ref
+
+        outputs['C_L'] = values[:, 0]
+        outputs['C_D'] = values[:, 1]
+        outputs['lift'] = qS * values[:, 0]
+        outputs['drag'] = qS * values[:, 1]
+
+    def compute_partials(self, inputs, partials):
+        values, derivs = self.table.predict(inputs['alpha'], inputs['mach'], inputs['Re_1e6'])
+        rho = inputs['rho']
+        v = inputs['v']
+        S_ref = self.table.S_ref
+        qS = 0.5 * rho * v ** 2 * S_ref
+
+        for i, (coeff, force) in enumerate([('C_L', 'lift'), ('C_D', 'drag')]):
+            for name, deriv in zip(['alpha', 'mach', 'Re_1e6'], derivs):
+                partials[coeff, name] = deriv[:, i]
+                partials[force, name] = qS * deriv[:, i]
+            partials[force, 'v'] = rho * v * S_ref * values[:, i]
+            partials[force, 'rho'] = 0.5 * v ** 2 * S_ref * values[:, i]
+
+
+if __name__ == "__main__":
+    import sys
+
+    method = sys.argv[1] if len(sys.argv) > 1 else 'oas'
+    num_procs = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    table = build_crm_aero_table(method=method, num_procs=num_procs)
+    report = accuracy_report(table, method=method)
+
+    print('Table vs {} at random points'.format(method))
+    for i, name in enumerate(['CL', 'CD']):
+        print('  {:3s} max {:.3e}  rms {:.3e}  (largest |{}| {:.3f})'.format(
+            name, report['max_error'][i], report['rms_error'][i], name, report['max_value'][i]))
+    print('{} time: {:.4f} s'.format(method, report['model_time']))
+    print('Table time: {:.4f} s'.format(report['table_time']))
@@ -0,0 +1,424 @@
+"""
+Vortex lattice aerodynamics of the CRM wing with a reusable factorization of
+the aerodynamic influence coefficient (AIC) matrix.
+
+OASGroup builds the OpenAeroStruct VLM system once per node, and assembles
+and solves its AIC matrix at every node and every iteration, although the
+wing does not change during a mission.  Here the AIC matrix of the
+incompressible problem is assembled and LU-factored once per wing geometry,
+and cached by geometry, so that every ODE instance of every phase shares it.
+The circulations of all the nodes, and their derivatives with respect to the
+angle of attack, are then one back-substitution with 2 * num_nodes
+right-hand sides.
+
+Compressibility is handled by the Prandtl-Glauert rule: the circulations of
+the incompressible problem are divided by beta = sqrt(1 - M**2), so the lift
+scales with 1 / beta and the induced drag with 1 / beta**2, with analytic
+derivatives with respect to the Mach number.  The rule holds for subsonic,
+shock-free flow; the Mach number is clipped to `max_mach` for beta.
+
+The wing is a lattice of horseshoe vortices, with the bound vortices on the
+quarter chord lines of the panels, the trailing legs along x, and the flow
+tangency condition at the three-quarter chord points.  The forces are from
+the Kutta-Joukowski theorem at the bound vortices, which gives the induced
+drag.  The viscous drag is added as in OpenAeroStruct: turbulent flat plate
+skin friction on the chord of each spanwise strip, at the Reynolds number per
+unit length `Re_1e6` of OASGroup, times a form factor for the thickness, the
+Mach number and the sweep, over a wetted area of twice the planform.  The
+axes are x aft, y to the right and z up; the geometry inputs follow the
+OpenAeroStruct CRM definition of reg_time_climb_problem, where the spanwise
+positions are `displacement_z` and the vertical ones `displacement_y`.
+
+By default the lattice has the 2 x 3 points of the OASGroup mesh.  It is still
+a different implementation of the same model, so 'vlm_lu' and 'oas' do not
+give identical climbs: OpenAeroStruct uses vortex rings rather than
+horseshoes, and its own compressibility correction and viscous drag options
+(laminar fraction, thickness of the sections), which are not reproduced here.
+Compare the two with aero_table.evaluate_crm_aero before switching a study
+from one to the other.
+"""
+from __future__ import print_function, division, absolute_import
+import hashlib
+
+import numpy as np
+from scipy.linalg import lu_factor, lu_solve
+
+from openmdao.api import ExplicitComponent
+
+from path_dependent_missions.utils.memoize import LRUCache
+
+
+# CRM wing of reg_time_climb_problem, at 5 spanwise sections from tip to tip
+crm_chord = np.array([107.4, 285.8, 536.2, 285.8, 107.4]) * 0.0254
+crm_twist = np.array([-3.75, 0.76, 6.72, 0.76, -3.75]) * np.pi / 180.
+crm_displacement_x = np.array([1780, 1226, 904, 1226, 1780]) * 0.0254
+crm_displacement_y = np.array([263.8, 181.1, 174.1, 181.1, 263.8]) * 0.0254
+crm_displacement_z = np.array([-1157, -428, 0, 428, 1157]) * 0.0254
+
+# Mesh of OASGroup, chordwise and spanwise points
+default_num_x = 2
+default_num_y = 3
+
+# Thickness to chord ratio of the sections and chordwise position of their
+# largest thickness, for the form factor; the OpenAeroStruct defaults
+default_t_over_c = 0.15
+default_x_over_c = 0.303
+
+# Factorizations of the last wing geometries, shared by all the components
+_factorizations = LRUCache(maxsize=8)
+
+
+def wing_mesh(chord, twist, displacement_x, displacement_y, displacement_z, num_x=default_num_x,
+              num_y=default_num_y):
+    """
+    Mesh of the wing, from the chord, twist (rad, nose up) and quarter chord
+    position of spanwise sections, linearly interpolated between them.
+
+    Returns
+    -------
+    ndarray
+        Points of the mesh, shape (num_x, num_y, 3), from the leading to the
+        trailing edge and from the left to the right tip.
+    """
+    s_sections = np.linspace(0., 1., len(chord))
+    # cosine spacing, finer at the tips
+    s = 0.5 * (1. - np.cos(np.pi * np.linspace(0., 1., num_y)))
+
+    c = np.interp(s, s_sections, chord)
+    tw = np.interp(s, s_sections, twist)
+    x_qc = np.interp(s, s_sections, displacement_x)
+    y = np.interp(s, s_sections, displacement_z)
+    z_qc = np.interp(s, s_sections, displacement_y)
+
+    # chordwise position relative to the quarter chord, from -0.25 to 0.75 chords
+    eta = np.linspace(-0.25, 0.75, num_x)[:, np.newaxis]
+
+    mesh = np.empty((num_x, num_y, 3))
+    mesh[:, :, 0] = x_qc + eta * c * np.cos(tw)
+    mesh[:, :, 1] = y
+    mesh[:, :, 2] = z_qc - eta * c * np.sin(tw)
+    return mesh
+
+
+def _segment_velocity(P, A, B, cutoff=1e-10):
+    """
+    Velocity induced at points P by unit vortex segments from A to B.
+
+    P has shape (m, 3) and A, B shape (n, 3); the result has shape (m, n, 3).
+    """
+    r1 = P[:, np.newaxis, :] - A
+    r2 = P[:, np.newaxis, :] - B
+    r0 = B - A
+    cross = np.cross(r1, r2)
+    cross2 = np.sum(cross ** 2, axis=-1)
+    n1 = np.linalg.norm(r1, axis=-1)
+    n2 = np.linalg.norm(r2, axis=-1)
+
+    # points on the line of a segment, e.g. the middle of its own bound vortex
+    singular = cross2 < cutoff * np.sum(r0 ** 2, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = np.sum(r0 * (r1 / n1[..., np.newaxis] - r2 / n2[..., np.newaxis]), axis=-1) / cross2
+    k[singular] = 0.
+    return cross * k[..., np.newaxis] / (4. * np.pi)
+
+
+def _trailing_velocity(P, A, cutoff=1e-10):
+    """
+    Velocity induced at points P by unit semi-infinite vortices from A to
+    x = +inf, shape (m, n, 3).
+    """
+    d = np.array([1., 0., 0.])
+    r = P[:, np.newaxis, :] - A
+    cross = np.cross(d, r)
+    cross2 = np.sum(cross ** 2, axis=-1)
+    nr = np.linalg.norm(r, axis=-1)
+
+    singular = cross2 < cutoff
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = (1. + r[..., 0] / nr) / cross2
+    k[singular] = 0.
+    return cross * k[..., np.newaxis] / (4. * np.pi)
+
+
+def _horseshoe_velocity(P, A, B):
+    """
+    Velocity induced at points P by unit horseshoe vortices coming from
+    x = +inf to A, bound from A to B and going back to x = +inf from B.
+    """
+    return _segment_velocity(P, A, B) + _trailing_velocity(P, B) - _trailing_velocity(P, A)
+
+
+class VLMFactorization(object):
+    """
+    Influence matrices of a wing mesh and the LU factorization of its AIC
+    matrix, for unit freestreams in the x-z plane.
+
+    Parameters
+    ----------
+    mesh : ndarray
+        Points of the mesh, shape (num_x, num_y, 3), see wing_mesh.
+    """
+
+    def __init__(self, mesh):
+        quarter = mesh[:-1] + 0.25 * (mesh[1:] - mesh[:-1])
+        three_quarter = mesh[:-1] + 0.75 * (mesh[1:] - mesh[:-1])
+
+        # bound vortex end points and collocation points of each panel
+        A = quarter[:, :-1].reshape((-1, 3))
+        B = quarter[:, 1:].reshape((-1, 3))
+        colloc = 0.5 * (three_quarter[:, :-1] + three_quarter[:, 1:]).reshape((-1, 3))
+
+        normals = np.cross(mesh[1:, 1:] - mesh[:-1, :-1], mesh[:-1, 1:] - mesh[1:, :-1])
+        norms = np.linalg.norm(normals, axis=-1)
+        self.area = 0.5 * np.sum(norms)
+        self.normals = (normals / norms[..., np.newaxis]).reshape((-1, 3))
+        self.num_panels = len(A)
+
+        self.lu = lu_factor(np.einsum('ijk,ik->ij', _horseshoe_velocity(colloc, A, B), self.normals))
+
+        # chord, planform area and quarter chord sweep of the spanwise strips
+        chords = np.linalg.norm(mesh[-1] - mesh[0], axis=-1)
+        self.strip_chords = 0.5 * (chords[:-1] + chords[1:])
+        self.strip_areas = 0.5 * np.sum(norms, axis=0)
+        d = quarter[0, 1:] - quarter[0, :-1]
+        self.strip_cos_sweep = np.abs(d[:, 1]) / np.sqrt(d[:, 0] ** 2 + d[:, 1] ** 2)
+
+        # velocities induced at the middle of the bound vortices, for the forces
+        self.bound = B - A
+        self.W = _horseshoe_velocity(0.5 * (A + B), A, B)
+
+    def solve(self, rhs):
+        """
+        Circulations for the normal velocities `rhs`, shape (num_panels, k);
+        one back-substitution for all the columns.
+        """
+        return lu_solve(self.lu, rhs)
+
+    def coefficients(self, alpha, mach, S_ref=None, max_mach=0.95):
+        """
+        Lift and induced drag coefficients, and their derivatives with respect
+        to alpha and Mach, at every node.
+
+        Parameters
+        ----------
+        alpha, mach : ndarray
+            Angle of attack (rad) and Mach number of each node.
+        S_ref : float or None
+            Reference area; the planform area of the mesh by default.
+
+        Returns
+        -------
+        tuple of ndarray
+            CL, CD, dCL_dalpha, dCL_dmach, dCD_dalpha, dCD_dmach.
+        """
+        alpha = np.atleast_1d(alpha)
+        nn = len(alpha)
+        if S_ref is None:
+            S_ref = self.area
+
+        # unit freestream, its derivative, and the lift direction
+        u = np.stack((np.cos(alpha), np.zeros(nn), np.sin(alpha)), axis=-1)
+        du = np.stack((-np.sin(alpha), np.zeros(nn), np.cos(alpha)), axis=-1)
+        lift_dir = du
+
+        # incompressible circulations of all the nodes and their alpha derivatives
+        sol = self.solve(-self.normals.dot(np.hstack((u.T, du.T))))
+        G0, dG0 = sol[:, :nn].T, sol[:, nn:].T
+
+        m = np.minimum(mach, max_mach)
+        beta = np.sqrt(1. - m ** 2)
+        dbeta = np.where(mach < max_mach, -m / beta, 0.)
+
+        G = G0 / beta[:, np.newaxis]
+        dG_dalpha = dG0 / beta[:, np.newaxis]
+        dG_dmach = -G * (dbeta / beta)[:, np.newaxis]
+
+        # induced velocities at the bound vortices, shape (nn, num_panels, 3)
+        w = np.einsum('jkc,nk->njc', self.W, G)
+
+        # Kutta-Joukowski force per rho * v**2, summed over the panels
+        F = np.einsum('nj,njc->nc', G, np.cross(u[:, np.newaxis, :] + w, self.bound))
+
+        def dF(dG, du_):
+            dw = np.einsum('jkc,nk->njc', self.W, dG)
+            return (np.einsum('nj,njc->nc', dG, np.cross(u[:, np.newaxis, :] + w, self.bound))
+                    + np.einsum('nj,njc->nc', G, np.cross(du_[:, np.newaxis, :] + dw, self.bound)))
+
+        dF_dalpha = dF(dG_dalpha, du)
+        dF_dmach = dF(dG_dmach, np.zeros_like(u))
+
+        k = 2. / S_ref
+        CL = k * np.sum(F * lift_dir, axis=-1)
+        CD = k * np.sum(F * u, axis=-1)
+        # the lift and drag directions rotate with alpha
+        dCL_dalpha = k * (np.sum(dF_dalpha * lift_dir, axis=-1) - np.sum(F * u, axis=-1))
+        dCD_dalpha = k * (np.sum(dF_dalpha * u, axis=-1) + np.sum(F * du, axis=-1))
+        dCL_dmach = k * np.sum(dF_dmach * lift_dir, axis=-1)
+        dCD_dmach = k * np.sum(dF_dmach * u, axis=-1)
+
+        return CL, CD, dCL_dalpha, dCL_dmach, dCD_dalpha, dCD_dmach
+
+    def viscous_drag(self, mach, re_1e6, S_ref=None, t_over_c=default_t_over_c,
+                     x_over_c=default_x_over_c):
+        """
+        Viscous drag coefficient, and its derivatives with respect to Mach and
+        Re_1e6, at every node.
+
+        Parameters
+        ----------
+        mach : ndarray
+            Mach number of each node.
+        re_1e6 : ndarray
+            Reynolds number per unit length (1/m) / 1e6 of each node.
+        S_ref : float or None
+            Reference area; the planform area of the mesh by default.
+        t_over_c, x_over_c : float
+            Thickness to chord ratio of the sections, and chordwise position of
+            their largest thickness.
+
+        Returns
+        -------
+        tuple of ndarray
+            CDv, dCDv_dmach, dCDv_dre.
+        """
+        mach = np.atleast_1d(mach)[:, np.newaxis]
+        re = np.atleast_1d(re_1e6)[:, np.newaxis]
+        if S_ref is None:
+            S_ref = self.area
+
+        # turbulent flat plate skin friction on the chord of each strip
+        log_re = np.log10(re * 1e6 * self.strip_chords)
+        compressibility = 1. + 0.144 * mach ** 2
+        cf = 0.455 / log_re ** 2.58 / compressibility ** 0.65
+        dcf_dre = -2.58 * cf / (log_re * np.log(10.) * re)
+        dcf_dmach = -0.65 * cf * 0.288 * mach / compressibility
+
+        # form factor; M**0.18 is held constant below Mach 0.01, where its
+        # slope is unbounded
+        m = np.maximum(mach, 0.01)
+        FF = ((1. + 0.6 / x_over_c * t_over_c + 100. * t_over_c ** 4)
+              * 1.34 * m ** 0.18 * self.strip_cos_sweep ** 0.28)
+        dFF_dmach = np.where(mach > 0.01, 0.18 * FF / m, 0.)
+
+        k = 2. * self.strip_areas / S_ref
+        CDv = np.sum(k * cf * FF, axis=1)
+        dCDv_dmach = np.sum(k * (dcf_dmach * FF + cf * dFF_dmach), axis=1)
+        dCDv_dre = np.sum(k * dcf_dre * FF, axis=1)
+
+        return CDv, dCDv_dmach, dCDv_dre
+
+
+def get_factorization(mesh):
+    """
+    Factorization of the AIC matrix of a mesh, assembled on first use and
+    reused by every component with the same mesh.
+    """
+    key = hashlib.sha1(np.ascontiguousarray(mesh).tobytes()).hexdigest()
+    factorization = _factorizations.get(key)
+    if factorization is None:
+        factorization = VLMFactorization(mesh)
+        _factorizations.put(key, factorization)
+    return factorization
+
+
+class VLMLUComp(ExplicitComponent):
+    """
+    Lift and drag of the CRM wing at every node, from the vortex lattice
+    method with the factorization of get_factorization, plus the viscous
+    drag.
+
+    The wing geometry inputs are the section values of the OpenAeroStruct CRM
+    wing; no derivatives are given with respect to them, since the wing is
+    fixed during a mission.
+    """
+
+    def initialize(self):
+        self.options.declare('num_nodes', types=int)
+        self.options.declare('num_x', default=default_num_x, types=int,
+                             desc='Number of chordwise mesh points, as in OASGroup by default')
+        self.options.declare('num_y', default=default_num_y, types=int,
+                             desc='Number of spanwise mesh points, as in OASGroup by default')
+        self.options.declare('S_ref', default=None, types=float, allow_none=True,
+                             desc='Reference area, m**2; the planform area by default')
+        self.options.declare('t_over_c', default=default_t_over_c, types=float,
+                             desc='Thickness to chord ratio of the sections')
+        self.options.declare('x_over_c', default=default_x_over_c, types=float,
+                             desc='Chordwise position of the largest thickness')
+        self.options.declare('CD0', default=0., types=float,
+                             desc='Drag coefficient of the rest of the aircraft, added to the '
+                                  'induced and viscous drag of the wing')
+        self.options.declare('max_mach', default=0.95, types=float,
+                             desc='Largest Mach number of the Prandtl-Glauert rule')
+
+    def setup(self):
+        nn = self.options['num_nodes']
+
+        self.add_input('alpha', shape=nn, units='rad')
+        self.add_input('mach', shape=nn)
+        self.add_input('v', shape=nn, units='m/s')
+        self.add_input('rho', shape=nn, units='kg/m**3')
+        # Reynolds number per unit length / 1e6, with the default of OASGroup
+        self.add_input('Re_1e6', val=2., shape=nn)
+
+        self.add_input('wing_chord_dv', val=crm_chord, units='m')
+        self.add_input('wing_twist_dv', val=crm_twist, units='rad')
+        self.add_input('wing_displacement_x_dv', val=crm_displacement_x, units='m')
+        self.add_input('wing_displacement_y_dv', val=crm_displacement_y, units='m')
+        self.add_input('wing_displacement_z_dv', val=crm_displacement_z, units='m')
+
+        self.add_output('lift', shape=nn, units='N')
+        self.add_output('drag', shape=nn, units='N')
+        self.add_output('C_L', shape=nn)
+        self.add_output('C_D', shape=nn)
+
+        ar = np.arange(nn)
+        for name in ['lift', 'drag']:
+            self.declare_partials(name, ['alpha', 'mach', 'v', 'rho'], rows=ar, cols=ar)
+        for name in ['C_L', 'C_D']:
+            self.declare_partials(name, ['alpha', 'mach'], rows=ar, cols=ar)
+        self.declare_partials(['C_D', 'drag'], 'Re_1e6', rows=ar, cols=ar)
+
+    def _evaluate(self, inputs):
+        mesh = wing_mesh(inputs['wing_chord_dv'], inputs['wing_twist_dv'],
+                         inputs['wing_displacement_x_dv'], inputs['wing_displacement_y_dv'],
+                         inputs['wing_displacement_z_dv'],
+                         num_x=self.options['num_x'], num_y=self.options['num_y'])
+        factorization = get_factorization(mesh)
+        S_ref = self.options['S_ref']
+        if S_ref is None:
+            S_ref = factorization.area
+        CL, CDi, dCL_da, dCL_dm, dCDi_da, dCDi_dm = factorization.coefficients(
+            inputs['alpha'], inputs['mach'], S_ref=S_ref, max_mach=self.options['max_mach'])
+        CDv, dCDv_dm, dCDv_dre = factorization.viscous_drag(
+            inputs['mach'], inputs['Re_1e6'], S_ref=S_ref, t_over_c=self.options['t_over_c'],
+            x_over_c=self.options['x_over_c'])
+        CD = CDi + CDv + self.options['CD0']
+        return S_ref, (CL, CD, dCL_da, dCL_dm, dCDi_da, dCDi_dm + dCDv_dm, dCDv_dre)
+
+    def compute(self, inputs, outputs):
+        S_ref, (CL, CD, _, _, _, _, _) = self._evaluate(inputs)
+        qS = 0.5 * inputs['rho'] * inputs['v'] ** 2 * S_ref
+
+        outputs['C_L'] = CL
+        outputs['C_D'] = CD
+        outputs['lift'] = qS * CL
+        outputs['drag'] = qS * CD
+
+    def compute_partials(self, inputs, partials):
+        S_ref, (CL, CD, dCL_da, dCL_dm, dCD_da, dCD_dm, dCD_dre) = self._evaluate(inputs)
+        rho = inputs['rho']
+        v = inputs['v']
+        qS = 0.5 * rho * v ** 2 * S_ref
+
+        partials['C_L', 'alpha'] = dCL_da
+        partials['C_L', 'mach'] = dCL_dm
+        partials['C_D', 'alpha'] = dCD_da
+        partials['C_D', 'mach'] = dCD_dm
+        partials['C_D', 'Re_1e6'] = dCD_dre
+        partials['drag', 'Re_1e6'] = qS * dCD_dre
+
+        for name, C, dC_da, dC_dm in [('lift', CL, dCL_da, dCL_dm), ('drag', CD, dCD_da, dCD_dm)]:
+            partials[name, 'alpha'] = qS * dC_da
+            partials[name, 'mach'] = qS * dC_dm
+            partials[name, 'v'] = rho * v * S_ref * C
+            partials[name, 'rho'] = 0.5 * v ** 2 * S_ref * C
@@ -29,6 +29,10 @@ class MinTimeClimbODE(Group):
 
     def initialize(self):
         self.options.declare('num_nodes', types=int)
+        self.options.declare('aero_method', default='oas', values=['oas', 'vlm_lu', 'table'],
+                             desc='Method of the AeroGroup')
+        self.options.declare('aero_table_method', default='oas', values=['oas', 'vlm_lu'],
+                             desc='Aero model tabulated for the table method')
 
     def setup(self):
         nn = self.options['num_nodes']
@@ -38,7 +42,8 @@ class MinTimeClimbODE(Group):
                            promotes_inputs=['h'])
 
         self.add_subsystem(name='aero',
-                           subsys=AeroGroup(num_nodes=nn),
+                           subsys=AeroGroup(num_nodes=nn, method=self.options['aero_method'],
+                                            table_method=self.options['aero_table_method']),
                            promotes_inputs=['v', 'alpha'],
                            )
 
@@ -3,6 +3,8 @@ import os
 
 from smt.surrogate_models import RMTC
 
+from path_dependent_missions.utils.cache import user_cache_dir, makedirs
+
 
 def get_b777_engine():
     this_dir = os.path.split(__file__)[0]
@@ -291,11 +293,13 @@ def plot_b777_engine(xt, yt, limits, interp):
 def get_prop_smt_model():
     xt, yt, dyt_dxt, xlimits = get_b777_engine()
 
-    this_dir = os.path.split(__file__)[0]
+    # SMT writes its cache file without creating the directory
+    data_dir = user_cache_dir('smt')
+    makedirs(data_dir)
 
     interp = RMTC(num_elements=6, xlimits=xlimits, nonlinear_maxiter=20, approx_order=2,
         energy_weight=0., regularization_weight=0., extrapolate=True, print_global=False,
-        data_dir=os.path.join(this_dir, '_smt_cache'),
+        data_dir=data_dir,
     )
     interp.set_training_values(xt, yt)
     interp.set_training_derivatives(xt, dyt_dxt[:, :, 0], 0)
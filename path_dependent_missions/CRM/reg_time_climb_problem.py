@@ -7,10 +7,22 @@ from openmdao.api import Problem, Group, pyOptSparseDriver, DirectSolver, \
 from dymos import Phase
 
 from path_dependent_missions.CRM.min_time_climb_ode import MinTimeClimbODE
+from path_dependent_missions.CRM.aero.aero_table import build_crm_aero_table
+from path_dependent_missions.utils.autoscale import autoscale
 
 optimizer = 'SNOPT'
 num_seg = 14
 transcription_order = 3
+# replace the hand-tuned scaling by one computed at the initial guess
+auto_scaling = False
+# 'oas' for the OpenAeroStruct VLM at every node, 'vlm_lu' for one AIC
+# factorization shared by all the nodes, 'table' for a table of the OAS wing
+# swept once and cached (see CRM/aero/aero_table.py)
+aero_method = 'oas'
+
+if aero_method == 'table':
+    # sweep the wing now, AeroTableComp only loads the table
+    build_crm_aero_table()
 
 p = Problem(model=Group())
 
@@ -25,6 +37,7 @@ if optimizer == 'SNOPT':
 
 phase = Phase('gauss-lobatto',
               ode_class=MinTimeClimbODE,
+              ode_init_kwargs={'aero_method': aero_method},
               num_segments=num_seg,
               transcription_order=transcription_order,
               compressed=False)
@@ -90,7 +103,10 @@ p['phase.controls:alpha'] = phase.interpolate(ys=[0.1, 0.1], nodes='all')
 p['phase.states:v'][:] = 200.
 
 # Create CRM geometry
-for phase_name in ['phase.rhs_disc.aero.OAS_group.', 'phase.rhs_col.aero.OAS_group.']:
+# the table is swept with this geometry already
+aero_names = {'oas': ['OAS_group'], 'vlm_lu': ['vlm_lu'], 'table': []}[aero_method]
+for phase_name in ['phase.{}.aero.{}.'.format(rhs, aero_name)
+                   for rhs in ['rhs_disc', 'rhs_col'] for aero_name in aero_names]:
     p[phase_name + 'wing_chord_dv'] = np.array([ 107.4 , 285.8 , 536.2 , 285.8 , 107.4 ]) * 0.0254
     p[phase_name + 'wing_twist_dv'] = np.array([ -3.75 ,  0.76 ,  6.72 ,  0.76 , -3.75 ]) * np.pi / 180.
     p[phase_name + 'wing_displacement_x_dv'] = np.array([  1780 ,  1226 ,   904 ,  1226 ,  1780 ]) * 0.0254
@@ -106,6 +122,9 @@ p.run_model()
 # p['phase.states:gam'] = np.atleast_2d(exp_out.get_values('gam'))
 # p['phase.states:m'] = np.atleast_2d(exp_out.get_values('m'))
 
+if auto_scaling:
+    autoscale(p)
+
 p.run_driver()
 
 
@@ -0,0 +1,300 @@
+from __future__ import print_function, division, absolute_import
+import os
+import json
+import hashlib
+import warnings
+
+import numpy as np
+
+from path_dependent_missions.utils.hermite_table import HermiteTable
+from path_dependent_missions.utils.cache import user_cache_dir, atomic_write
+
+
+DESIGN_SURROGATE_DIR = user_cache_dir('smt')
+
+
+# Grid resolution in (Mach, altitude / 1e4 ft, throttle) of the coefficient table
+default_num_points = (28, 36, 21)
+
+# Operating inputs, in the scaled units of the table.  They cover the mission
+# envelope (up to Mach 1.8, 20 km and idle), like the sweep of the decks in
+# design_deck.py; inputs outside are clipped.
+op_xlimits = np.array([
+    [0.0, 1.8],
+    [0., 7.],
+    [0., 1.],
+])
+
+
+def quadratic_basis(d, design_limits):
+    """
+    Full quadratic polynomial basis in the design inputs and its derivatives.
+
+    The design inputs are first mapped to [-1, 1] over design_limits.
+
+    Returns
+    -------
+    ndarray
+        Basis values, shape (n, nb).
+    ndarray
+        Derivative of the basis with respect to each (unscaled) design input,
+        shape (n, nb, nd).
+    """
+    d = np.atleast_2d(d)
+    n, nd = d.shape
+    scale = 2. / (design_limits[:, 1] - design_limits[:, 0])
+    s = (d - design_limits[:, 0]) * scale - 1.
+
+    pairs = [(i, j) for i in range(nd) for j in range(i, nd)]
+    nb = 1 + nd + len(pairs)
+
+    basis = np.empty((n, nb))
+    dbasis = np.zeros((n, nb, nd))
+
+    basis[:, 0] = 1.
+    for i in range(nd):
+        basis[:, 1 + i] = s[:, i]
+        dbasis[:, 1 + i, i] = scale[i]
+    for k, (i, j) in enumerate(pairs):
+        b = 1 + nd + k
+        basis[:, b] = s[:, i] * s[:, j]
+        dbasis[:, b, i] += s[:, j] * scale[i]
+        dbasis[:, b, j] += s[:, i] * scale[j]
+
+    return basis, dbasis
+
+
+class DesignSurrogate(object):
+    """
+    F110 thrust and fuel flow as functions of the operating point and the
+    engine design.
+
+    At every node of a (Mach, altitude, throttle) grid, the outputs and their
+    slopes are a least-squares quadratic in the design inputs.  The quadratic
+    coefficients are stored as the outputs of a cubic Hermite table, so an
+    evaluation is one table lookup plus a dot product with the design basis,
+    and it stays smooth in all the inputs.
+
+    The inputs are (MN, alt / 1e4 ft, throttle, fan:PRdes, hpc:PRdes,
+    T4max / 1e3 degR, Mix_ER) and the outputs (Fn / 1e4 lbf, Wfuel lbm/s) for
+    one engine, with the same predict_values / predict_derivatives interface
+    as the SMT models.  Operating points outside the table are clipped to it,
+    with a warning the first time, and the derivatives with respect to a
+    clipped input are zero.
+
+    Parameters
+    ----------
+    table : HermiteTable
+        Table of the basis coefficients, ny = 2 * nb with the coefficients of
+        the two outputs interleaved.
+    design_limits : ndarray
+        Range of the scaled design inputs, shape (4, 2).
+    """
+
+    def __init__(self, table, design_limits):
+        self.table = table
+        self.design_limits = np.asarray(design_limits, dtype=float)
+        self.ny = 2
+        self._warned = False
+
+    def _split(self, x):
+        x = np.atleast_2d(x)
+        x_op = np.clip(x[:, :3], self.table.xlimits[:, 0], self.table.xlimits[:, 1])
+        if not self._warned and np.any(x_op != x[:, :3]):
+            warnings.warn('F110 design surrogate evaluated outside of (MN, alt / 1e4 ft, '
+                          'throttle) limits {}, the inputs are clipped'.format(
+                              self.table.xlimits.tolist()))
+            self._warned = True
+        return x_op, x[:, 3:]
+
+    def predict_values(self, x):
+        x_op, d = self._split(x)
+        basis = quadratic_basis(d, self.design_limits)[0]
+        coeffs = self.table.predict_values(x_op).reshape((x_op.shape[0], -1, self.ny))
+        return np.einsum('nby,nb->ny', coeffs, basis)
+
+    def predict_derivatives(self, x, kx):
+        x_op, d = self._split(x)
+        basis, dbasis = quadratic_basis(d, self.design_limits)
+        if kx < 3:
+            coeffs = self.table.predict_derivatives(x_op, kx).reshape((x_op.shape[0], -1, self.ny))
+            clipped = x_op[:, kx] != np.atleast_2d(x)[:, kx]
+            return np.einsum('nby,nb->ny', coeffs, basis) * ~clipped[:, np.newaxis]
+        coeffs = self.table.predict_values(x_op).reshape((x_op.shape[0], -1, self.ny))
+        return np.einsum('nby,nb->ny', coeffs, dbasis[:, :, kx - 3])
+
+    def save(self, filename):
+        with atomic_write(filename) as f:
+            np.savez(f, xlimits=self.table.xlimits, coeffs=self.table.coeffs,
+                     design_limits=self.design_limits)
+
+    @classmethod
+    def load(cls, filename):
+        data = np.load(filename)
+        return cls(HermiteTable(data['xlimits'], data['coeffs']), data['design_limits'])
+
+
+def scale_design(designs):
+    """
+    Design inputs in the scaled units of the surrogate (T4max in 1e3 degR).
+    """
+    designs = np.array(designs, dtype=float)
+    designs[..., 2] /= 1e3
+    return designs
+
+
+def fit_design_surrogate(decks, design_limits, num_points=default_num_points):
+    """
+    Fit a DesignSurrogate to a set of off-design decks.
+
+    Each deck is smoothed with an RMTB, like the FLOPS F110 data, and baked to
+    a Hermite table on the common (Mach, altitude, throttle) grid; the node
+    data of all the tables is then fitted by least squares with a quadratic
+    in the design inputs.
+
+    Parameters
+    ----------
+    decks : list of (ndarray, ndarray)
+        Design inputs and (MN, alt, throttle, Fn, Wfuel) points of each deck,
+        as returned by design_deck.load_decks.
+    design_limits : ndarray
+        Range of the (unscaled) design inputs, shape (4, 2).
+    """
+    from smt.surrogate_models import RMTB
+
+    design_limits = scale_design(design_limits.T).T
+
+    designs = []
+    node_data = []
+    for design, deck in decks:
+        xt = deck[:, :3].copy()
+        xt[:, 1] /= 1e4
+        yt = np.vstack((deck[:, 3] / 1e4, deck[:, 4])).T
+
+        interp = RMTB(xlimits=op_xlimits, num_ctrl_pts=12, order=4,
+                      approx_order=2, nonlinear_maxiter=40, solver_tolerance=1.e-20,
+                      energy_weight=1.e-4, regularization_weight=0., extrapolate=True,
+                      print_global=False)
+        interp.set_training_values(xt, yt)
+        interp.train()
+
+        table = HermiteTable.from_function(op_xlimits, num_points,
+                                           interp.predict_values, interp.predict_derivatives)
+        designs.append(design)
+        node_data.append(table.coeffs)
+
+    basis = quadratic_basis(scale_design(designs), design_limits)[0]
+    if basis.shape[0] < basis.shape[1]:
+        raise ValueError('At least {} decks are needed to fit the design surrogate, got {}.'.format(
+            basis.shape[1], basis.shape[0]))
+
+    # least squares fit of all the node data at once
+    node_data = np.array(node_data)
+    shape = node_data.shape[1:]
+    coeffs = np.linalg.lstsq(basis, node_data.reshape((len(designs), -1)), rcond=None)[0]
+
+    # (nb, nodes..., masks, ny) -> (nodes..., masks, nb * ny)
+    coeffs = np.moveaxis(coeffs.reshape((-1,) + shape), 0, -2)
+    coeffs = coeffs.reshape(shape[:-1] + (-1,))
+
+    return DesignSurrogate(HermiteTable(op_xlimits, coeffs), design_limits)
+
+
+def _surrogate_filename(decks, num_points):
+    """
+    Cache file of the surrogate fitted to the given decks, keyed by their
+    contents, so that rerun or regenerated decks trigger a new fit.
+    """
+    h = hashlib.sha1()
+    for design, deck in decks:
+        h.update(np.ascontiguousarray(design, dtype=float).tobytes())
+        h.update(np.ascontiguousarray(deck, dtype=float).tobytes())
+    grid = 'x'.join(str(n) for n in num_points)
+    return os.path.join(DESIGN_SURROGATE_DIR, 'F110_design_{}_{}.npz'.format(
+        h.hexdigest()[:12], grid))
+
+
+def _index_filename(num_designs, seed, num_points):
+    """
+    Record of the last surrogate built for a sample of `num_designs` designs:
+    the sampled designs and the file of the fit.
+    """
+    grid = 'x'.join(str(n) for n in num_points)
+    return os.path.join(DESIGN_SURROGATE_DIR, 'F110_design_{}_seed{}_{}.json'.format(
+        num_designs, seed, grid))
+
+
+def build_F110_design_surrogate(num_designs=40, num_procs=None, num_points=default_num_points,
+                                seed=0):
+    """
+    Fit the design-aware F110 surrogate to the pyCycle decks of `num_designs`
+    sampled designs and cache it in the user cache directory.  Missing decks are
+    generated first in `num_procs` worker processes, so this is run once,
+    before any problem that uses the surrogate, e.g. with
+
+        python -m path_dependent_missions.F110.design_model
+
+    The sampled designs and the file of the fit are recorded next to it, and
+    get_F110_design_surrogate finds the fit from that record.
+    """
+    from path_dependent_missions.f110_pycycle.design_deck import generate_decks, load_decks, \
+        sample_designs, design_limits
+
+    designs = sample_designs(num_designs, seed)
+    decks = load_decks(generate_decks(designs, num_procs))
+    filename = _surrogate_filename(decks, num_points)
+
+    if os.path.exists(filename):
+        surrogate = DesignSurrogate.load(filename)
+    else:
+        surrogate = fit_design_surrogate(decks, design_limits, num_points)
+        surrogate.save(filename)
+
+    with atomic_write(_index_filename(num_designs, seed, num_points), 'w') as f:
+        json.dump({'designs': np.asarray(designs).tolist(),
+                   'surrogate': os.path.basename(filename)}, f, indent=1)
+
+    return surrogate
+
+
+def get_F110_design_surrogate(num_designs=40, num_points=default_num_points, seed=0):
+    """
+    Load the design-aware F110 surrogate built by build_F110_design_surrogate.
+    It never runs the decks or the fit, since it is called in the setup of
+    DesignThrustComp.
+    """
+    index_filename = _index_filename(num_designs, seed, num_points)
+    filename = None
+    if os.path.exists(index_filename):
+        with open(index_filename) as f:
+            filename = os.path.join(DESIGN_SURROGATE_DIR, json.load(f)['surrogate'])
+
+    if filename is None or not os.path.exists(filename):
+        raise RuntimeError('The F110 design surrogate for {} designs is not built yet; run '
+                           'build_F110_design_surrogate first, e.g. with '
+                           '"python -m path_dependent_missions.F110.design_model"'.format(
+                               num_designs))
+
+    return DesignSurrogate.load(filename)
+
+
+if __name__ == "__main__":
+    from path_dependent_missions.f110_pycycle.design_deck import generate_decks, load_decks, \
+        sample_designs, design_limits
+
+    build_F110_design_surrogate(40)
+
+    # leave-some-out check of the design interpolation
+    decks = load_decks(generate_decks(sample_designs(40)))
+    surrogate = fit_design_surrogate(decks[:-5], design_limits)
+
+    for design, deck in decks[-5:]:
+        x = np.empty((deck.shape[0], 7))
+        x[:, 0] = deck[:, 0]
+        x[:, 1] = deck[:, 1] / 1e4
+        x[:, 2] = deck[:, 2]
+        x[:, 3:] = scale_design(design)
+        y = surrogate.predict_values(x)
+        print('design {}: max thrust error {:.1f} lbf, max fuel flow error {:.4f} lbm/s'.format(
+            np.round(design, 3), np.max(np.abs(y[:, 0] * 1e4 - deck[:, 3])),
+            np.max(np.abs(y[:, 1] - deck[:, 4]))))
@@ -1,8 +1,6 @@
 import numpy as np
-import matplotlib.pyplot as plt
 import pickle
 import os
-from smt.surrogate_models import RMTB, RMTC, KRG
 
 
 def get_data():
@@ -30,17 +28,38 @@ def get_data():
 
     return xt, yt, xlimits
 
-def get_F110_interp():
-    this_dir = os.path.split(__file__)[0]
+def get_F110_interp(warm_start=False):
+    """
+    Train the F110 RMTB on the engine data.
+
+    With warm_start=True, the training starts from the coefficients of the
+    previous training when only the data points changed, which is much faster
+    when iterating on deck corrections.
+    """
+    # SMT is only imported when a model is actually trained, so that importing
+    # this module (e.g. for get_data) stays cheap.
+    from smt.surrogate_models import RMTB
+    from path_dependent_missions.utils.warm_rmts import WarmStartRMTB
+    from path_dependent_missions.utils.cache import user_cache_dir, makedirs
 
     xt, yt, xlimits = get_data()
 
-    interp = RMTB(xlimits=xlimits, num_ctrl_pts=15, order=4,
-        approx_order=2, nonlinear_maxiter=40, solver_tolerance=1.e-20,
-        # solver='lu', derivative_solver='lu',
-        energy_weight=1.e-4, regularization_weight=0.e-18, extrapolate=False, print_global=False,
-        data_dir=os.path.join(this_dir, '_smt_cache'),
-    )
+    if warm_start:
+        interp = WarmStartRMTB(xlimits=xlimits, num_ctrl_pts=15, order=4,
+            approx_order=2, nonlinear_maxiter=40, solver_tolerance=1.e-20,
+            energy_weight=1.e-4, regularization_weight=0.e-18, extrapolate=False, print_global=False,
+            state_file=os.path.join(user_cache_dir('smt'), 'F110_rmtb_state.pkl'),
+        )
+    else:
+        # SMT writes its cache file without creating the directory
+        data_dir = user_cache_dir('smt')
+        makedirs(data_dir)
+        interp = RMTB(xlimits=xlimits, num_ctrl_pts=15, order=4,
+            approx_order=2, nonlinear_maxiter=40, solver_tolerance=1.e-20,
+            # solver='lu', derivative_solver='lu',
+            energy_weight=1.e-4, regularization_weight=0.e-18, extrapolate=False, print_global=False,
+            data_dir=data_dir,
+        )
 
     # interp = KRG(theta0=[0.1]*3, data_dir='_smt_cache/')
 
@@ -0,0 +1,279 @@
+from __future__ import print_function, division, absolute_import
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from path_dependent_missions.F110.smt_model import get_data
+
+
+output_names = ['thrust', 'fuel_flow']
+
+# Candidate models and their hyperparameters.  Each entry maps a label to the
+# name of the SMT class and the keyword arguments used to build it; `xlimits`
+# is filled in for the models that need it.  SMT is only imported when a model
+# is benchmarked, so that the results can be loaded and compared without it.
+default_models = {
+    'RMTB': ('RMTB', {'num_ctrl_pts': 15, 'order': 4, 'approx_order': 2,
+                    'nonlinear_maxiter': 40, 'solver_tolerance': 1.e-20,
+                    'energy_weight': 1.e-4, 'regularization_weight': 0.}),
+    'RMTB_coarse': ('RMTB', {'num_ctrl_pts': 10, 'order': 4, 'approx_order': 2,
+                           'nonlinear_maxiter': 20, 'energy_weight': 1.e-4,
+                           'regularization_weight': 0.}),
+    'RMTC': ('RMTC', {'num_elements': 8, 'approx_order': 2, 'nonlinear_maxiter': 20,
+                    'energy_weight': 1.e-4, 'regularization_weight': 0.}),
+    'KRG': ('KRG', {'theta0': [1.e-1] * 3}),
+    'KPLS': ('KPLS', {'theta0': [1.e-1] * 2, 'n_comp': 2}),
+    'IDW': ('IDW', {'p': 2.5}),
+    'RBF': ('RBF', {'d0': 1., 'poly_degree': 1, 'reg': 1.e-10}),
+    'LS': ('LS', {}),
+    'QP': ('QP', {}),
+}
+
+default_batch_sizes = (1, 10, 100, 1000, 10000)
+
+
+def split_data(xt, yt, holdout_fraction=0.2, seed=0):
+    """
+    Randomly split the training data into a training and a holdout set.
+    """
+    rng = np.random.RandomState(seed)
+    perm = rng.permutation(xt.shape[0])
+    num_holdout = int(holdout_fraction * xt.shape[0])
+    test, train = perm[:num_holdout], perm[num_holdout:]
+    return xt[train], yt[train], xt[test], yt[test]
+
+
+def _array_bytes(obj, depth=3):
+    """
+    Total size of the numpy arrays and sparse matrices held by a model, which is
+    what a worker process has to keep in memory to evaluate it.
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if hasattr(obj, 'data') and hasattr(obj, 'nnz'):
+        return sum(_array_bytes(getattr(obj, name)) for name in ('data', 'indices', 'indptr', 'row', 'col')
+                   if hasattr(obj, name))
+    if depth == 0:
+        return 0
+    if isinstance(obj, dict):
+        return sum(_array_bytes(val, depth - 1) for val in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_array_bytes(val, depth - 1) for val in obj)
+    return 0
+
+
+def benchmark_model(model_class, kwargs, xt, yt, xtest, ytest, xlimits,
+                    batch_sizes=default_batch_sizes, num_repeats=3, seed=0):
+    """
+    Train one surrogate model and measure its speed and accuracy.
+
+    Parameters
+    ----------
+    model_class : class or str
+        SMT surrogate model class, or its name in smt.surrogate_models.
+    kwargs : dict
+        Options passed to the model constructor.
+    xt, yt : ndarray
+        Training inputs and outputs.
+    xtest, ytest : ndarray
+        Holdout inputs and outputs.
+    xlimits : ndarray
+        Input bounds, used by the model when needed and to draw the
+        throughput samples.
+    batch_sizes : sequence of int
+        Number of points per predict call for the throughput measurement.
+    num_repeats : int
+        Number of predict calls timed for each batch size; the fastest is kept.
+
+    Returns
+    -------
+    dict
+        Train time (s), throughput (points/s) and derivative cost relative to a
+        values call for each batch size, peak training memory and size of the
+        trained arrays (bytes), and holdout errors.
+    """
+    from smt import surrogate_models
+
+    if isinstance(model_class, str):
+        model_class = getattr(surrogate_models, model_class)
+
+    kwargs = dict(kwargs)
+    if issubclass(model_class, (surrogate_models.RMTB, surrogate_models.RMTC)):
+        kwargs['xlimits'] = xlimits
+    kwargs['print_global'] = False
+
+    model = model_class(**kwargs)
+    model.set_training_values(xt, yt)
+
+    tracemalloc.start()
+    t0 = time.time()
+    model.train()
+    train_time = time.time() - t0
+    train_peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = {
+        'train_time': train_time,
+        'train_peak_memory': train_peak_memory,
+        'model_size': _array_bytes(model.__dict__),
+        'throughput': {},
+        'deriv_cost': {},
+    }
+
+    rng = np.random.RandomState(seed)
+    for batch_size in batch_sizes:
+        x = xlimits[:, 0] + rng.rand(batch_size, 3) * (xlimits[:, 1] - xlimits[:, 0])
+
+        values_time = np.inf
+        for i in range(num_repeats):
+            t0 = time.time()
+            model.predict_values(x)
+            values_time = min(values_time, time.time() - t0)
+        result['throughput'][batch_size] = batch_size / max(values_time, 1.e-12)
+
+        if model.supports['derivatives']:
+            derivs_time = np.inf
+            for i in range(num_repeats):
+                t0 = time.time()
+                for kx in range(3):
+                    model.predict_derivatives(x, kx)
+                derivs_time = min(derivs_time, time.time() - t0)
+            result['deriv_cost'][batch_size] = derivs_time / max(values_time, 1.e-12)
+        else:
+            result['deriv_cost'][batch_size] = None
+
+    error = model.predict_values(xtest) - ytest
+    scale = np.max(np.abs(yt), axis=0)
+    for i, name in enumerate(output_names):
+        result['max_error_' + name] = np.max(np.abs(error[:, i])) / scale[i]
+        result['rms_error_' + name] = np.sqrt(np.mean(error[:, i] ** 2)) / scale[i]
+
+    return result
+
+
+def run_benchmark(models=None, batch_sizes=default_batch_sizes, holdout_fraction=0.2,
+                  seed=0, filename=None):
+    """
+    Benchmark a set of surrogate models on the F110 data and optionally save
+    the results as json.
+
+    Parameters
+    ----------
+    models : dict or None
+        Label -> (class or class name, kwargs) of the models to run; defaults
+        to `default_models`.
+    batch_sizes : sequence of int
+        Number of points per predict call for the throughput measurement.
+    holdout_fraction : float
+        Fraction of the data points held out for the error measurement.
+    seed : int
+        Seed of the holdout split and the throughput samples.
+    filename : str or None
+        If given, the results are written to this json file; read it back with
+        `load_results`.
+
+    Returns
+    -------
+    dict
+        Results of `benchmark_model` for each label.  Errors are relative to the
+        largest training output.
+    """
+    if models is None:
+        models = default_models
+
+    xt, yt, xlimits = get_data()
+    xtrain, ytrain, xtest, ytest = split_data(xt, yt, holdout_fraction, seed)
+
+    results = {}
+    for label, (model_class, kwargs) in models.items():
+        print('Benchmarking', label)
+        try:
+            results[label] = benchmark_model(model_class, kwargs, xtrain, ytrain,
+                                             xtest, ytest, xlimits, batch_sizes,
+                                             seed=seed)
+        except Exception as err:
+            print('  failed:', err)
+            results[label] = {'error': str(err)}
+
+    if filename is not None:
+        with open(filename, 'w') as f:
+            json.dump(results, f, indent=2, default=float)
+
+    return results
+
+
+def load_results(filename):
+    """
+    Results of `run_benchmark` saved as json.  json turns the integer batch
+    sizes of 'throughput' and 'deriv_cost' into strings; they are converted
+    back, so the results can be passed to `select_model`.
+    """
+    with open(filename) as f:
+        results = json.load(f)
+
+    for result in results.values():
+        for key in ('throughput', 'deriv_cost'):
+            if key in result:
+                result[key] = dict((int(batch_size), val) for batch_size, val in result[key].items())
+    return results
+
+
+def select_model(results, max_error, batch_size=max(default_batch_sizes)):
+    """
+    Return the label of the model with the highest throughput at `batch_size`
+    whose relative holdout max error is below `max_error` for every output, or
+    None if no model meets the accuracy budget.
+    """
+    best_label = None
+    best_throughput = 0.
+    for label, result in results.items():
+        if 'error' in result:
+            continue
+        if any(result['max_error_' + name] > max_error for name in output_names):
+            continue
+        throughput = result['throughput'][batch_size]
+        if throughput > best_throughput:
+            best_label = label
+            best_throughput = throughput
+    return best_label
+
+
+def print_results(results):
+    batch_sizes = None
+    for label, result in sorted(results.items()):
+        if 'error' in result:
+            print('{:12s} failed: {}'.format(label, result['error']))
+            continue
+        if batch_sizes is None:
+            batch_sizes = sorted(result['throughput'])
+            print('{:12s} {:>9s} {:>10s} {:>10s} {:>10s} {:>10s} {:>10s} {:>12s} {:>8s}'.format(
+                'model', 'train (s)', 'size (kB)', 'peak (kB)', 'thrust max', 'fuel max',
+                'thrust rms', 'pts/s @ {}'.format(batch_sizes[-1]), 'deriv x'))
+        deriv_cost = result['deriv_cost'][batch_sizes[-1]]
+        print('{:12s} {:9.3f} {:10.1f} {:10.1f} {:10.2e} {:10.2e} {:10.2e} {:12.3e} {:>8s}'.format(
+            label, result['train_time'], result['model_size'] / 1e3,
+            result['train_peak_memory'] / 1e3,
+            result['max_error_thrust'], result['max_error_fuel_flow'],
+            result['rms_error_thrust'], result['throughput'][batch_sizes[-1]],
+            '-' if deriv_cost is None else '{:.2f}'.format(deriv_cost)))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark SMT surrogates on the F110 data')
+    parser.add_argument('--models', nargs='*', default=sorted(default_models),
+                        help='labels of the models to run')
+    parser.add_argument('--max-error', type=float, default=1.e-2,
+                        help='relative holdout max error budget used to select a model')
+    parser.add_argument('--output', default='surrogate_benchmark.json',
+                        help='json file the results are written to (default: in the current directory)')
+    args = parser.parse_args()
+
+    models = {label: default_models[label] for label in args.models}
+    results = run_benchmark(models, filename=args.output)
+
+    print_results(results)
+    print('Fastest model within the error budget:', select_model(results, args.max_error))
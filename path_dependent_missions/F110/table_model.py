@@ -0,0 +1,143 @@
+from __future__ import print_function, division, absolute_import
+import os
+import time
+import hashlib
+
+import numpy as np
+
+from path_dependent_missions.utils.hermite_table import HermiteTable
+from path_dependent_missions.utils.cache import user_cache_dir
+
+
+this_dir = os.path.split(__file__)[0]
+
+# Grid resolution in (Mach, altitude / 1e4 ft, throttle)
+default_num_points = (37, 57, 41)
+
+
+def get_F110_data_hash():
+    """
+    Hash of the F110 engine data, `good_output_flops`.
+    """
+    with open(os.path.join(this_dir, 'good_output_flops'), 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()[:12]
+
+
+def get_table_filename(num_points=default_num_points):
+    """
+    Name of the baked table file.  It depends on the engine data and the grid,
+    so regenerating `good_output_flops` triggers a new bake.
+    """
+    data_hash = get_F110_data_hash()
+    grid = 'x'.join(str(n) for n in num_points)
+    return os.path.join(user_cache_dir('smt'), 'F110_table_{}_{}.npz'.format(data_hash, grid))
+
+
+def bake_F110_table(num_points=default_num_points, interp=None):
+    """
+    Sample the trained F110 RMTB and its exact first derivatives onto a regular
+    grid and return the resulting cubic Hermite table.
+    """
+    from path_dependent_missions.F110.smt_model import get_data, get_F110_interp
+
+    if interp is None:
+        interp = get_F110_interp()
+    xt, yt, xlimits = get_data()
+
+    return HermiteTable.from_function(xlimits, num_points,
+                                      interp.predict_values,
+                                      interp.predict_derivatives)
+
+
+def get_F110_table(num_points=default_num_points):
+    """
+    Load the baked F110 table from the SMT cache directory, baking it first if
+    it does not exist yet.
+    """
+    filename = get_table_filename(num_points)
+
+    if os.path.exists(filename):
+        return HermiteTable.load(filename)
+
+    table = bake_F110_table(num_points)
+    table.save(filename)
+
+    return table
+
+
+def get_F110_shared_table(num_points=default_num_points):
+    """
+    Memory-map the baked F110 table so that all worker processes share one
+    read-only copy of it.  The first process to get here bakes and exports the
+    table; the others attach to the exported files.
+    """
+    dirname = os.path.splitext(get_table_filename(num_points))[0]
+
+    if not os.path.isdir(dirname):
+        get_F110_table(num_points).export(dirname)
+
+    return HermiteTable.attach(dirname)
+
+
+def accuracy_report(table=None, interp=None, num_random=100000, seed=0):
+    """
+    Compare the baked table against the RMTB at the training points and at
+    random points in the domain, and time both on the random points.
+
+    Returns
+    -------
+    dict
+        Maximum and RMS differences for each output (in the scaled units of
+        `get_data`) for values and derivatives, plus evaluation times.
+    """
+    from path_dependent_missions.F110.smt_model import get_data, get_F110_interp
+
+    if interp is None:
+        interp = get_F110_interp()
+    if table is None:
+        table = get_F110_table()
+
+    xt, yt, xlimits = get_data()
+
+    rng = np.random.RandomState(seed)
+    x_rand = xlimits[:, 0] + rng.rand(num_random, 3) * (xlimits[:, 1] - xlimits[:, 0])
+
+    report = {}
+    for label, x in (('training', xt), ('random', x_rand)):
+        diff = table.predict_values(x) - interp.predict_values(x)
+        report[label] = {
+            'max_error': np.max(np.abs(diff), axis=0),
+            'rms_error': np.sqrt(np.mean(diff ** 2, axis=0)),
+        }
+        for kx in range(3):
+            ddiff = table.predict_derivatives(x, kx) - interp.predict_derivatives(x, kx)
+            report[label]['max_deriv_error_{}'.format(kx)] = np.max(np.abs(ddiff), axis=0)
+
+    t0 = time.time()
+    interp.predict_values(x_rand)
+    report['rmtb_time'] = time.time() - t0
+
+    t0 = time.time()
+    table.predict_values(x_rand)
+    report['table_time'] = time.time() - t0
+
+    return report
+
+
+if __name__ == "__main__":
+    report = accuracy_report()
+
+    output_names = ['thrust', 'fuel flow']
+    for label in ('training', 'random'):
+        print('Table vs RMTB at {} points (scaled outputs)'.format(label))
+        for i, name in enumerate(output_names):
+            print('  {:10s} max {:.3e}  rms {:.3e}  max d/dx {:.3e} {:.3e} {:.3e}'.format(
+                name,
+                report[label]['max_error'][i],
+                report[label]['rms_error'][i],
+                report[label]['max_deriv_error_0'][i],
+                report[label]['max_deriv_error_1'][i],
+                report[label]['max_deriv_error_2'][i]))
+
+    print('RMTB predict time:  {:.4f} s'.format(report['rmtb_time']))
+    print('Table predict time: {:.4f} s'.format(report['table_time']))
@@ -37,6 +37,8 @@ class AeroSMTGroup(Group):
     def initialize(self):
         self.options.declare('num_nodes', types=int,
                               desc='Number of nodes to be evaluated in the RHS')
+        self.options.declare('interp', default='smt', values=['smt', 'shared'],
+                              desc='Use the ESAV surrogate directly or the shared baked table')
 
     def setup(self):
         nn = self.options['num_nodes']
@@ -47,7 +49,7 @@ class AeroSMTGroup(Group):
                            promotes_outputs=['mach'])
 
         self.add_subsystem(name='SMT_comp',
-                           subsys=AeroSMTComp(num_nodes=nn),
+                           subsys=AeroSMTComp(num_nodes=nn, interp=self.options['interp']),
                            promotes_inputs=['mach', 'h', 'alpha'],
                            promotes_outputs=['CL', 'CD'])
 
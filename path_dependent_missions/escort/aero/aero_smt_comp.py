@@ -4,6 +4,7 @@ import numpy as np
 from openmdao.api import ExplicitComponent
 
 from esav.run.smt_model import get_ESAV_interp, get_data
+from path_dependent_missions.escort.aero.aero_table import get_ESAV_shared_table
 
 
 scaler = 2.
@@ -14,11 +15,17 @@ class AeroSMTComp(ExplicitComponent):
 
     def initialize(self):
         self.options.declare('num_nodes', types=int)
+        self.options.declare('interp', default='smt', values=['smt', 'shared'],
+                             desc='Evaluate the ESAV surrogate directly or a baked table '
+                                  'memory-mapped from disk and shared between processes')
 
     def setup(self):
         num_points = self.options['num_nodes']
 
-        self.aero_model = get_ESAV_interp()
+        if self.options['interp'] == 'shared':
+            self.aero_model = get_ESAV_shared_table()
+        else:
+            self.aero_model = get_ESAV_interp()
 
         self.add_input('mach', shape=num_points)
         self.add_input('h', shape=num_points, units='km')
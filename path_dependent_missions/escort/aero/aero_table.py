@@ -0,0 +1,50 @@
+from __future__ import print_function, division, absolute_import
+import os
+import hashlib
+
+import numpy as np
+
+from path_dependent_missions.utils.hermite_table import HermiteTable
+from path_dependent_missions.utils.cache import user_cache_dir
+
+
+# Grid resolution in (Mach, altitude / 1e4 m, alpha / 10 deg)
+default_num_points = (37, 41, 33)
+
+
+def get_ESAV_data_hash():
+    """
+    Hash of the training data of the ESAV aero surrogate.
+    """
+    from esav.run.smt_model import get_data
+
+    xt, yt, xlimits = get_data()
+    return hashlib.md5(np.ascontiguousarray(xt).tobytes() +
+                       np.ascontiguousarray(yt).tobytes()).hexdigest()[:12]
+
+
+def get_ESAV_shared_table(num_points=default_num_points):
+    """
+    Memory-map a baked cubic Hermite table of the ESAV aero surrogate so that
+    all worker processes share one read-only copy of it.
+
+    The first process to get here trains the ESAV surrogate, samples it onto the
+    grid and exports the table; the others attach to the exported files without
+    training.  The table directory is keyed by the ESAV training data and the
+    grid, so new aero data triggers a new bake.
+    """
+    from esav.run.smt_model import get_ESAV_interp, get_data
+
+    grid = 'x'.join(str(n) for n in num_points)
+    dirname = os.path.join(user_cache_dir('smt'),
+                           'ESAV_table_{}_{}'.format(get_ESAV_data_hash(), grid))
+
+    if not os.path.isdir(dirname):
+        xlimits = get_data()[2]
+        interp = get_ESAV_interp()
+        table = HermiteTable.from_function(xlimits, num_points,
+                                           interp.predict_values,
+                                           interp.predict_derivatives)
+        table.export(dirname)
+
+    return HermiteTable.attach(dirname)
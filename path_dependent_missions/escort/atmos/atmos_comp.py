@@ -3,7 +3,6 @@ from __future__ import print_function
 from collections import namedtuple
 
 import numpy as np
-from  scipy.interpolate import Akima1DInterpolator as Akima
 
 from openmdao.api import ExplicitComponent
 
@@ -67,17 +66,25 @@ USatm1976Data.viscosity = np.array([3.81E-07,3.78E-07,3.76E-07,3.74E-07,3.72E-07
                 3.10E-07,3.10E-07,3.11E-07,3.11E-07,3.11E-07,3.13E-07,3.18E-07,3.23E-07,3.28E-07,3.33E-07,3.37E-07,3.42E-07,3.47E-07,3.51E-07,
                 3.56E-07]) #units='lbf*s/ft**2'
 
-temp_interp = Akima(USatm1976Data.h, USatm1976Data.temp)
-pres_interp = Akima(USatm1976Data.h, USatm1976Data.pres)
-rho_interp = Akima(USatm1976Data.h, USatm1976Data.rho)
-a_interp = Akima(USatm1976Data.h, USatm1976Data.a)
-viscosity_interp = Akima(USatm1976Data.h, USatm1976Data.viscosity)
+_interps = {}
 
-temp_interp_deriv = temp_interp.derivative(1)
-pres_interp_deriv = pres_interp.derivative(1)
-rho_interp_deriv = rho_interp.derivative(1)
-a_interp_deriv = a_interp.derivative(1)
-viscosity_interp_deriv = viscosity_interp.derivative(1)
+
+def get_interps():
+    """
+    Akima interpolants of the 1976 standard atmosphere and their derivatives.
+    They are built on first use rather than at import, since importing scipy
+    and constructing them is a noticeable part of the import time of every
+    mission module.
+    """
+    if not _interps:
+        from scipy.interpolate import Akima1DInterpolator as Akima
+
+        for name in ('temp', 'pres', 'rho', 'a', 'viscosity'):
+            interp = Akima(USatm1976Data.h, getattr(USatm1976Data, name))
+            _interps[name] = interp
+            _interps[name + '_deriv'] = interp.derivative(1)
+
+    return _interps
 
 
 class AtmosComp(ExplicitComponent):
@@ -101,15 +108,17 @@ class AtmosComp(ExplicitComponent):
         # self.set_check_partial_options(wrt='*', step_calc='central', step=1e-9)
 
     def compute(self, inputs, outputs):
+        interps = get_interps()
 
-        outputs['temp'] = temp_interp(inputs['h'])
-        outputs['pres'] = pres_interp(inputs['h'])
-        outputs['rho'] = rho_interp(inputs['h'])
-        outputs['sos'] = a_interp(inputs['h'])
+        outputs['temp'] = interps['temp'](inputs['h'])
+        outputs['pres'] = interps['pres'](inputs['h'])
+        outputs['rho'] = interps['rho'](inputs['h'])
+        outputs['sos'] = interps['a'](inputs['h'])
 
     def compute_partials(self, inputs, partials):
+        interps = get_interps()
 
-        partials['temp', 'h'] = temp_interp_deriv(inputs['h'])
-        partials['pres', 'h'] = pres_interp_deriv(inputs['h'])
-        partials['rho', 'h'] = rho_interp_deriv(inputs['h'])
-        partials['sos', 'h'] = a_interp_deriv(inputs['h'])
+        partials['temp', 'h'] = interps['temp_deriv'](inputs['h'])
+        partials['pres', 'h'] = interps['pres_deriv'](inputs['h'])
+        partials['rho', 'h'] = interps['rho_deriv'](inputs['h'])
+        partials['sos', 'h'] = interps['a_deriv'](inputs['h'])
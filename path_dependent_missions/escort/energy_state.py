@@ -0,0 +1,327 @@
+"""
+Energy-state approximation of the climb problems.
+
+The specific excess power Ps = v (T - D) / W of the escort aircraft is
+computed at full throttle and in trimmed level flight (L = W), for a whole
+grid of points in one vectorized evaluation of the atmosphere, aero and F110
+propulsion models.  The minimum time or minimum fuel climb between two
+energy heights is then found by dynamic programming over energy levels.  As
+in Rutowski's classical solution, altitude and speed are exchanged
+instantaneously at constant energy, so the result is only approximate, but it
+takes a fraction of a second and is a good initial guess for the collocation
+problems.
+"""
+from __future__ import print_function, division, absolute_import
+
+import numpy as np
+
+from openmdao.api import Problem, Group, IndepVarComp, ExecComp
+
+from path_dependent_missions.escort.atmos.atmos_comp import AtmosComp
+from path_dependent_missions.escort.aero import AeroGroup
+from path_dependent_missions.escort.prop.F110_prop import PropGroup
+
+
+g = 9.80665
+
+# Angles of attack over which the lift is interpolated to trim, in deg
+alpha_grid = np.linspace(-2., 12., 15)
+
+_problems = {}
+
+
+def get_performance_problem(nn, aero):
+    """
+    Problem evaluating the aero and propulsion models at nn points, set up
+    once per size and aero model.  The thrust in N is 'thrust.T'.
+    """
+    key = (nn, aero)
+    if key in _problems:
+        return _problems[key]
+
+    p = Problem(model=Group())
+
+    ivc = IndepVarComp()
+    ivc.add_output('h', val=np.zeros(nn), units='m')
+    ivc.add_output('v', val=np.ones(nn), units='m/s')
+    ivc.add_output('alpha', val=np.zeros(nn), units='deg')
+    ivc.add_output('S', val=49.2386 * np.ones(nn), units='m**2')
+    ivc.add_output('throttle', val=np.ones(nn))
+    p.model.add_subsystem('ivc', ivc, promotes=['*'])
+
+    p.model.add_subsystem(name='atmos',
+                          subsys=AtmosComp(num_nodes=nn),
+                          promotes_inputs=['h'])
+
+    if aero == 'smt':
+        # the ESAV data are only needed for the SMT aero model
+        from path_dependent_missions.escort.aero.aero_smt import AeroSMTGroup
+
+        p.model.add_subsystem(name='aero',
+                              subsys=AeroSMTGroup(num_nodes=nn),
+                              promotes_inputs=['h', 'v', 'alpha', 'S'])
+    else:
+        p.model.add_subsystem(name='aero',
+                              subsys=AeroGroup(num_nodes=nn),
+                              promotes_inputs=['v', 'alpha', 'S'])
+
+    p.model.connect('atmos.sos', 'aero.sos')
+    p.model.connect('atmos.rho', 'aero.rho')
+
+    p.model.add_subsystem(name='prop',
+                          subsys=PropGroup(num_nodes=nn),
+                          promotes_inputs=['h', 'throttle'])
+
+    p.model.connect('aero.mach', 'prop.mach')
+
+    # the F110 components give the thrust in lbf
+    p.model.add_subsystem(name='thrust',
+                          subsys=ExecComp('T = thrust',
+                                          T={'value': np.zeros(nn), 'units': 'N'},
+                                          thrust={'value': np.zeros(nn), 'units': 'N'}))
+    p.model.connect('prop.thrust', 'thrust.thrust')
+
+    p.setup(check=False)
+    p.set_solver_print(level=-1)
+
+    _problems[key] = p
+    return p
+
+
+def excess_power(h, v, mass=19030.468, aero='analytic'):
+    """
+    Specific excess power and fuel flow at full throttle in trimmed level flight.
+
+    Parameters
+    ----------
+    h : array_like
+        Altitudes, m.
+    v : array_like
+        True airspeeds, m/s, same shape as h.
+    mass : float
+        Aircraft mass, kg.
+    aero : str
+        'analytic' for the AeroGroup or 'smt' for the AeroSMTGroup.
+
+    Returns
+    -------
+    dict of ndarray
+        'Ps' (m/s), 'm_dot' (fuel flow, kg/s, positive), 'alpha' (trim angle
+        of attack, deg), 'thrust' and 'drag' (N) and 'mach', with the shape of
+        h.  Ps is -inf where the aircraft cannot be trimmed within alpha_grid.
+    """
+    h = np.asarray(h, dtype=float)
+    v = np.asarray(v, dtype=float)
+    shape = h.shape
+    n = h.size
+    na = len(alpha_grid)
+
+    # every point at every angle of attack of the grid, in one evaluation
+    p = get_performance_problem(n * na, aero)
+    p['h'] = np.repeat(h.ravel(), na)
+    p['v'] = np.repeat(v.ravel(), na)
+    p['alpha'] = np.tile(alpha_grid, n)
+    p.run_model()
+
+    lift = p['aero.f_lift'].reshape((n, na))
+    drag = p['aero.f_drag'].reshape((n, na))
+    thrust = p['thrust.T'].reshape((n, na))[:, 0]
+    m_dot = -p['prop.m_dot'].reshape((n, na))[:, 0]
+    mach = p['aero.mach'].reshape((n, na))[:, 0]
+
+    # first angle of attack of the grid at which the lift exceeds the weight,
+    # and linear interpolation of the drag there
+    weight = mass * g
+    above = lift >= weight
+    trimmed = np.any(above, axis=1) & ~above[:, 0]
+    i = np.clip(np.argmax(above, axis=1), 1, na - 1)
+    rows = np.arange(n)
+    w = (weight - lift[rows, i - 1]) / (lift[rows, i] - lift[rows, i - 1])
+    alpha = alpha_grid[i - 1] + w * (alpha_grid[i] - alpha_grid[i - 1])
+    drag = drag[rows, i - 1] + w * (drag[rows, i] - drag[rows, i - 1])
+
+    Ps = np.where(trimmed, v.ravel() * (thrust - drag) / weight, -np.inf)
+
+    results = {'Ps': Ps, 'm_dot': m_dot, 'alpha': np.where(trimmed, alpha, np.nan),
+               'thrust': thrust, 'drag': np.where(trimmed, drag, np.nan), 'mach': mach}
+    return dict((name, val.reshape(shape)) for name, val in results.items())
+
+
+def energy_climb(h0=100., v0=135.964, hf=20000., vf=283.159, mass=19030.468, objective='time',
+                 num_h=41, num_levels=60, max_dh=None, v_limits=(60., 600.), aero='analytic'):
+    """
+    Energy-state minimum time or minimum fuel climb.
+
+    The energy height E = h + v^2 / (2 g) is discretized in num_levels levels
+    between the initial and final points, and at each level the altitude in
+    num_h values between 0 and the ceiling of the grid.  The dynamic
+    programming finds the altitude at each level that minimizes the total
+    time, sum dE / Ps, or fuel, sum m_dot dE / Ps.
+
+    Parameters
+    ----------
+    h0, v0 : float
+        Initial altitude (m) and speed (m/s).
+    hf, vf : float
+        Final altitude (m) and speed (m/s).
+    mass : float
+        Aircraft mass (kg), held constant.
+    objective : str
+        'time' or 'fuel'.
+    num_h : int
+        Number of altitudes of the grid.
+    num_levels : int
+        Number of energy levels.
+    max_dh : float or None
+        Largest altitude change between two energy levels (m); None for the
+        unrestricted Rutowski path.
+    v_limits : tuple of float
+        Range of the speeds of the grid (m/s).
+    aero : str
+        'analytic' or 'smt', see excess_power.
+
+    Returns
+    -------
+    dict of ndarray
+        The path at each energy level: 'time' (s), 'r' (m), 'h' (m), 'v'
+        (m/s), 'gam' (rad), 'm' (kg), 'fuel' (kg), 'alpha' (deg), 'Ps' (m/s),
+        'mach' and 'E' (m).
+    """
+    if objective not in ('time', 'fuel'):
+        raise ValueError("objective must be 'time' or 'fuel', got '{}'".format(objective))
+
+    E0 = h0 + v0 ** 2 / (2 * g)
+    Ef = hf + vf ** 2 / (2 * g)
+    E = np.linspace(E0, Ef, num_levels)
+    dE = E[1] - E[0]
+
+    h_max = max(h0, hf, 1.05 * E[-1])
+    h = np.union1d(np.linspace(0., h_max, num_h), [h0, hf])
+
+    # speed at each altitude of each level; points outside the speed range
+    # are excluded
+    H = np.tile(h, (num_levels, 1))
+    V2 = 2 * g * (E[:, np.newaxis] - H)
+    valid = V2 >= v_limits[0] ** 2
+    V = np.sqrt(np.clip(V2, v_limits[0] ** 2, None))
+    valid &= V <= v_limits[1]
+
+    perf = excess_power(H, V, mass=mass, aero=aero)
+    Ps = np.where(valid, perf['Ps'], -np.inf)
+
+    # time or fuel per unit energy, at each point of the grid
+    with np.errstate(divide='ignore'):
+        rate = np.where(Ps > 0., 1. / Ps, np.inf)
+    if objective == 'fuel':
+        rate = rate * perf['m_dot']
+
+    nh = len(h)
+    if max_dh is None:
+        allowed = np.ones((nh, nh), dtype=bool)
+    else:
+        allowed = np.abs(h[:, np.newaxis] - h[np.newaxis, :]) <= max_dh
+
+    j0 = np.argmin(np.abs(h - h0))
+    jf = np.argmin(np.abs(h - hf))
+
+    # cost[j] is the best cost to reach altitude j of the current level; each
+    # step costs the trapezoidal rule of the rate between the two levels
+    cost = np.full(nh, np.inf)
+    cost[j0] = 0.
+    parent = np.zeros((num_levels, nh), dtype=int)
+    for k in range(1, num_levels):
+        step = cost[:, np.newaxis] + 0.5 * dE * (rate[k - 1][:, np.newaxis] + rate[k][np.newaxis, :])
+        step[~allowed] = np.inf
+        parent[k] = np.argmin(step, axis=0)
+        cost = step[parent[k], np.arange(nh)]
+
+    if not np.isfinite(cost[jf]):
+        raise ValueError('No feasible energy climb from ({}, {}) to ({}, {}) on this grid.'.format(
+            h0, v0, hf, vf))
+
+    j = np.empty(num_levels, dtype=int)
+    j[-1] = jf
+    for k in range(num_levels - 1, 0, -1):
+        j[k - 1] = parent[k, j[k]]
+
+    levels = np.arange(num_levels)
+    path = {
+        'E': E,
+        'h': h[j],
+        'v': V[levels, j],
+        'Ps': Ps[levels, j],
+        'alpha': perf['alpha'][levels, j],
+        'mach': perf['mach'][levels, j],
+    }
+    path['h'][0], path['v'][0] = h0, v0
+    path['h'][-1], path['v'][-1] = hf, vf
+
+    dt = 0.5 * dE * (1. / path['Ps'][1:] + 1. / path['Ps'][:-1])
+    path['time'] = np.hstack((0., np.cumsum(dt)))
+
+    m_dot = perf['m_dot'][levels, j]
+    path['fuel'] = np.hstack((0., np.cumsum(0.5 * dt * (m_dot[1:] + m_dot[:-1]))))
+    path['m'] = mass - path['fuel']
+
+    # flight path angle and range from the altitude and speed along the path;
+    # the instantaneous zooms of the path would give vertical flight, so the
+    # angle is limited to keep a usable guess
+    h_dot = np.gradient(path['h'], path['time'])
+    path['gam'] = np.arcsin(np.clip(h_dot / path['v'], -0.5, 0.5))
+    v_horiz = path['v'] * np.cos(path['gam'])
+    path['r'] = np.hstack((0., np.cumsum(0.5 * dt * (v_horiz[1:] + v_horiz[:-1]))))
+
+    return path
+
+
+def set_energy_guess(p, path, phase_name='phase', state_nodes='state_input',
+                     control_nodes='control_input', r0=0., m0=None):
+    """
+    Set the initial guess of a climb phase to an energy-state path.
+
+    Parameters
+    ----------
+    p : Problem
+        Problem after setup, with a phase of the MinTimeClimbODE.
+    path : dict
+        Path returned by energy_climb.
+    phase_name : str
+        Name of the phase in the model.
+    state_nodes, control_nodes : str
+        Nodes of the states and controls for phase.interpolate, e.g. 'disc'
+        and 'all' for the escort problems.
+    r0 : float
+        Initial range of the phase (m).
+    m0 : float or None
+        Initial mass of the phase (kg); by default the mass of the path.
+    """
+    phase = p.model._get_subsystem(phase_name)
+    t = path['time']
+    m = path['m'] if m0 is None else path['m'] - path['m'][0] + m0
+
+    p[phase_name + '.t_duration'] = t[-1]
+    for name, val in [('r', r0 + path['r']), ('h', path['h']), ('v', path['v']),
+                      ('gam', path['gam']), ('m', m)]:
+        p['{}.states:{}'.format(phase_name, name)] = phase.interpolate(xs=t, ys=val, nodes=state_nodes)
+
+    # the problems optimize alpha in deg
+    alpha = np.where(np.isnan(path['alpha']), 0., path['alpha'])
+    p[phase_name + '.controls:alpha'] = phase.interpolate(xs=t, ys=alpha, nodes=control_nodes)
+
+
+if __name__ == "__main__":
+    import time
+
+    h = np.linspace(0., 20000., 41)
+    v = np.linspace(100., 600., 51)
+    H, V = np.meshgrid(h, v, indexing='ij')
+
+    st = time.time()
+    excess_power(H, V)
+    print('Ps grid setup and evaluation: {:.2f} s'.format(time.time() - st))
+
+    for objective in ['time', 'fuel']:
+        st = time.time()
+        path = energy_climb(objective=objective)
+        print('min {} climb in {:.3f} s: {:.1f} s, {:.1f} kg of fuel, final range {:.1f} km'.format(
+            objective, time.time() - st, path['time'][-1], path['fuel'][-1], path['r'][-1] / 1e3))
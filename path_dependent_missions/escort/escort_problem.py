@@ -1,6 +1,4 @@
 from __future__ import print_function, division, absolute_import
-import matplotlib
-# matplotlib.use('agg')
 import numpy as np
 
 from openmdao.api import Problem, Group, pyOptSparseDriver, DirectSolver, \
@@ -11,10 +9,15 @@ from dymos.phases.components import PhaseLinkageComp
 
 from min_time_climb_ode import MinTimeClimbODE
 from path_dependent_missions.escort.read_db import read_db
+from path_dependent_missions.utils.coloring_cache import use_coloring_cache
+from path_dependent_missions.utils.fast_setup import fast_setup
+from path_dependent_missions.utils.deriv_mode import select_deriv_mode
+from path_dependent_missions.utils.autoscale import autoscale
 
 
 def escort_problem(optimizer='SNOPT', num_seg=3, transcription_order=5,
-                           transcription='gauss-lobatto', meeting_altitude=11000.):
+                           transcription='gauss-lobatto', meeting_altitude=11000.,
+                           coloring_cache=False, deriv_mode='auto', auto_scaling=False):
 
     p = Problem(model=Group())
 
@@ -170,7 +173,10 @@ def escort_problem(optimizer='SNOPT', num_seg=3, transcription_order=5,
 
     # p.driver.add_recorder(SqliteRecorder('escort.db'))
 
-    p.setup(check=True, force_alloc_complex=True)
+    if deriv_mode == 'benchmark':
+        deriv_mode = select_deriv_mode(p)
+
+    fast_setup(p, force_alloc_complex=True, mode=deriv_mode)
 
     p['climb.t_initial'] = 0.0
     p['climb.t_duration'] = 300.
@@ -190,6 +196,12 @@ def escort_problem(optimizer='SNOPT', num_seg=3, transcription_order=5,
     p['escort.states:m'] = escort.interpolate(ys=[29e3, 25e3], nodes='disc')
     p['escort.controls:alpha'] = escort.interpolate(ys=[0.2, 0.2], nodes='all')
 
+    if auto_scaling:
+        autoscale(p)
+
+    if coloring_cache:
+        use_coloring_cache(p)
+
     return p
 
 
@@ -9,10 +9,15 @@ from dymos.phases.components import PhaseLinkageComp
 
 from min_time_climb_ode import MinTimeClimbODE
 from path_dependent_missions.escort.read_db import read_db
+from path_dependent_missions.utils.coloring_cache import use_coloring_cache
+from path_dependent_missions.utils.fast_setup import fast_setup
+from path_dependent_missions.utils.deriv_mode import select_deriv_mode
+from path_dependent_missions.utils.autoscale import autoscale
 
 
 def escort_problem(optimizer='SLSQP', num_seg=3, transcription_order=5,
-                           transcription='gauss-lobatto', meeting_altitude=15000.):
+                           transcription='gauss-lobatto', meeting_altitude=15000.,
+                           coloring_cache=True, deriv_mode='fwd', auto_scaling=False):
 
     p = Problem(model=Group())
 
@@ -238,7 +243,10 @@ def escort_problem(optimizer='SLSQP', num_seg=3, transcription_order=5,
 
     # p.driver.add_recorder(SqliteRecorder('escort.db'))
 
-    p.setup(mode='fwd', check=True)
+    if deriv_mode == 'benchmark':
+        deriv_mode = select_deriv_mode(p)
+
+    fast_setup(p, mode=deriv_mode)
 
     p['climb.t_initial'] = 0.0
     p['climb.t_duration'] = 298.46902
@@ -267,6 +275,13 @@ def escort_problem(optimizer='SLSQP', num_seg=3, transcription_order=5,
     p['descent.states:m'] = descent.interpolate(ys=[15000., 14500.], nodes='disc')
     p['descent.controls:alpha'] = descent.interpolate(ys=[0.0, 0.0], nodes='all')
 
+    if auto_scaling:
+        autoscale(p)
+
+    # only SNOPT runs use coloring
+    if coloring_cache and p.driver.options['dynamic_simul_derivs']:
+        use_coloring_cache(p)
+
     return p
 
 
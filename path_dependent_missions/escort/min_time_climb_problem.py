@@ -1,17 +1,23 @@
 from __future__ import print_function, division, absolute_import
-import matplotlib
-# matplotlib.use('agg')
 import numpy as np
 
 from openmdao.api import Problem, Group, pyOptSparseDriver, DirectSolver
 from dymos import Phase
 
 from min_time_climb_ode import MinTimeClimbODE
+from path_dependent_missions.utils.coloring_cache import use_coloring_cache
+from path_dependent_missions.utils.fast_setup import fast_setup
+from path_dependent_missions.utils.deriv_mode import select_deriv_mode
+from path_dependent_missions.utils.autoscale import autoscale
+from path_dependent_missions.utils.bspline_control import add_bspline_control
+from path_dependent_missions.utils.memoize import use_memoization
 
 
 def min_time_climb_problem(optimizer='SLSQP', num_seg=3, transcription_order=5,
                            transcription='gauss-lobatto',
-                           top_level_densejacobian=True, meeting_altitude=20000.):
+                           top_level_densejacobian=True, meeting_altitude=20000.,
+                           coloring_cache=False, deriv_mode='fwd', memoize=False, auto_scaling=False,
+                           bspline_controls=None):
 
     p = Problem(model=Group())
 
@@ -50,8 +56,13 @@ def min_time_climb_problem(optimizer='SLSQP', num_seg=3, transcription_order=5,
     phase.set_state_options('m', fix_initial=True, lower=10.0, upper=1.0E5,
                             scaler=1.0E-3, defect_scaler=1.0E-3, units='kg')
 
-    phase.add_control('alpha', units='deg', lower=-8.0, upper=8.0, scaler=1.0,
-                      rate_continuity=True)
+    if bspline_controls is None:
+        phase.add_control('alpha', units='deg', lower=-8.0, upper=8.0, scaler=1.0,
+                          rate_continuity=True)
+    else:
+        # alpha as a cubic B-spline with this many coefficients
+        add_bspline_control(p.model, 'phase', phase, 'alpha', bspline_controls, units='deg',
+                            lower=-8.0, upper=8.0)
 
     phase.add_design_parameter('S', val=49.2386, units='m**2', opt=False)
     phase.add_design_parameter('throttle', val=1.0, opt=False)
@@ -73,7 +84,10 @@ def min_time_climb_problem(optimizer='SLSQP', num_seg=3, transcription_order=5,
         p.model.linear_solver = DirectSolver(assemble_jac=True)
         p.model.options['assembled_jac_type'] = 'csc'
 
-    p.setup(mode='fwd', check=True)
+    if deriv_mode == 'benchmark':
+        deriv_mode = select_deriv_mode(p)
+
+    fast_setup(p, mode=deriv_mode)
 
     p['phase.t_initial'] = 0.0
     p['phase.t_duration'] = 200.
@@ -84,6 +98,15 @@ def min_time_climb_problem(optimizer='SLSQP', num_seg=3, transcription_order=5,
     p['phase.states:m'] = phase.interpolate(ys=[19030.468, 16841.431], nodes='state_input')
     # p['phase.controls:alpha'] = phase.interpolate(ys=[0.50, 0.50], nodes='all')
 
+    if auto_scaling:
+        autoscale(p)
+
+    if coloring_cache:
+        use_coloring_cache(p)
+
+    if memoize:
+        use_memoization(p)
+
     return p
 
 
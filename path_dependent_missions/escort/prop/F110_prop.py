@@ -4,6 +4,7 @@ from openmdao.api import Group
 
 from .mdot_comp import MassFlowRateComp
 from .smt_thrust_throttle import SMTThrustComp
+from .design_thrust_comp import DesignThrustComp
 
 
 class PropGroup(Group):
@@ -33,12 +34,23 @@ class PropGroup(Group):
     def initialize(self):
         self.options.declare('num_nodes', types=int,
                               desc='Number of nodes to be evaluated in the RHS')
+        self.options.declare('interp', default='rmtb', values=['rmtb', 'table', 'shared', 'design'],
+                              desc='Use the F110 RMTB directly, its baked lookup table, the '
+                                   'shared memory-mapped table, or the design-aware surrogate of '
+                                   'the pyCycle decks, which adds the engine design inputs')
 
     def setup(self):
         nn = self.options['num_nodes']
 
 
-        self.add_subsystem(name='thrust_comp',
-                           subsys=SMTThrustComp(num_nodes=nn),
-                           promotes_inputs=['mach', 'h', 'throttle'],
-                           promotes_outputs=['thrust', 'm_dot'])
+        if self.options['interp'] == 'design':
+            self.add_subsystem(name='thrust_comp',
+                               subsys=DesignThrustComp(num_nodes=nn),
+                               promotes_inputs=['mach', 'h', 'throttle', 'fan:PRdes', 'hpc:PRdes',
+                                                'T4max', 'Mix_ER'],
+                               promotes_outputs=['thrust', 'm_dot'])
+        else:
+            self.add_subsystem(name='thrust_comp',
+                               subsys=SMTThrustComp(num_nodes=nn, interp=self.options['interp']),
+                               promotes_inputs=['mach', 'h', 'throttle'],
+                               promotes_outputs=['thrust', 'm_dot'])
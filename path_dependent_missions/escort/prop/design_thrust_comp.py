@@ -0,0 +1,96 @@
+from __future__ import division
+import numpy as np
+
+from openmdao.api import ExplicitComponent
+
+from path_dependent_missions.F110.design_model import get_F110_design_surrogate
+
+
+class DesignThrustComp(ExplicitComponent):
+    """
+    Thrust and fuel flow of the two F110 engines from the design-aware
+    surrogate, so that the engine design inputs can be optimized together
+    with the mission.
+
+    The surrogate must be built beforehand by build_F110_design_surrogate;
+    setup only loads it.
+    """
+
+    def initialize(self):
+        self.options.declare('num_nodes', types=int)
+        self.options.declare('surrogate', default=None, allow_none=True,
+                             desc='DesignSurrogate to use; the cached one by default')
+
+    def setup(self):
+        num_points = self.options['num_nodes']
+        self.prop_model = self.options['surrogate']
+        if self.prop_model is None:
+            self.prop_model = get_F110_design_surrogate()
+
+        self.add_input('mach', shape=num_points, val=0.8)
+        self.add_input('h', shape=num_points, units='ft')
+        self.add_input('throttle', shape=num_points)
+
+        self.add_input('fan:PRdes', val=3.3)
+        self.add_input('hpc:PRdes', val=9.3)
+        self.add_input('T4max', val=3200., units='degR')
+        self.add_input('Mix_ER', val=1.05)
+
+        self.add_output('thrust', shape=num_points, units='lbf')
+        self.add_output('m_dot', shape=num_points, units='kg/s')
+
+        self.x = np.zeros((num_points, 7))
+
+        arange = np.arange(num_points)
+        self.declare_partials(['thrust', 'm_dot'], ['mach', 'h', 'throttle'], rows=arange, cols=arange)
+        self.declare_partials(['thrust', 'm_dot'], ['fan:PRdes', 'hpc:PRdes', 'T4max', 'Mix_ER'],
+                              rows=arange, cols=np.zeros(num_points, int))
+
+    def _set_x(self, inputs):
+        self.x[:, 0] = inputs['mach']
+        self.x[:, 1] = inputs['h'] / 1e4
+        self.x[:, 2] = inputs['throttle']
+        self.x[:, 3] = inputs['fan:PRdes']
+        self.x[:, 4] = inputs['hpc:PRdes']
+        self.x[:, 5] = inputs['T4max'] / 1e3
+        self.x[:, 6] = inputs['Mix_ER']
+
+    def compute(self, inputs, outputs):
+        self._set_x(inputs)
+
+        out = self.prop_model.predict_values(self.x)
+
+        outputs['thrust'] = out[:, 0] * 2 * 1e4
+        outputs['m_dot'] = -out[:, 1] * 2 * 0.45359237
+
+    def compute_partials(self, inputs, partials):
+        self._set_x(inputs)
+
+        # derivative of the scaled inputs with respect to the component inputs
+        input_scales = [('mach', 1.), ('h', 1e-4), ('throttle', 1.), ('fan:PRdes', 1.),
+                        ('hpc:PRdes', 1.), ('T4max', 1e-3), ('Mix_ER', 1.)]
+
+        for kx, (name, scale) in enumerate(input_scales):
+            derivs = self.prop_model.predict_derivatives(self.x, kx)
+            partials['thrust', name] = derivs[:, 0] * 2 * 1e4 * scale
+            partials['m_dot', name] = -derivs[:, 1] * 2 * 0.45359237 * scale
+
+
+if __name__ == "__main__":
+    from openmdao.api import Problem, Group
+    from path_dependent_missions.F110.design_model import build_F110_design_surrogate
+
+    nn = 3
+
+    p = Problem(model=Group())
+
+    p.model.add_subsystem('prop', DesignThrustComp(num_nodes=nn,
+                                                   surrogate=build_F110_design_surrogate()),
+                          promotes=['*'])
+
+    p.setup(check=True)
+    p['mach'] = [0.4, 0.8, 1.2]
+    p['h'] = [5000., 15000., 30000.]
+    p['throttle'] = [0.6, 0.8, 1.0]
+    p.run_model()
+    p.check_partials(compact_print=True)
@@ -4,6 +4,7 @@ import numpy as np
 from openmdao.api import ExplicitComponent, AnalysisError
 
 from path_dependent_missions.F110.smt_model import get_F110_interp
+from path_dependent_missions.F110.table_model import get_F110_table, get_F110_shared_table
 
 
 scaler = 1.
@@ -12,10 +13,18 @@ class SMTThrustComp(ExplicitComponent):
 
     def initialize(self):
         self.options.declare('num_nodes', types=int)
+        self.options.declare('interp', default='rmtb', values=['rmtb', 'table', 'shared'],
+                             desc='Evaluate the F110 RMTB directly, its baked lookup table, or '
+                                  'the baked table memory-mapped from disk and shared between processes')
 
     def setup(self):
         num_points = self.options['num_nodes']
-        self.prop_model = get_F110_interp()
+        if self.options['interp'] == 'table':
+            self.prop_model = get_F110_table()
+        elif self.options['interp'] == 'shared':
+            self.prop_model = get_F110_shared_table()
+        else:
+            self.prop_model = get_F110_interp()
 
         self.add_input('mach', shape=num_points, val=0.8)
         self.add_input('h', shape=num_points, units='ft')
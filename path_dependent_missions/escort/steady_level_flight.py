@@ -1,6 +1,4 @@
 from __future__ import print_function, division, absolute_import
-import matplotlib
-# matplotlib.use('agg')
 import numpy as np
 
 from openmdao.api import Problem, Group, pyOptSparseDriver, DirectSolver
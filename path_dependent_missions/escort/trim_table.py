@@ -0,0 +1,247 @@
+"""
+Steady level flight trim of the escort aircraft over a grid of flight
+conditions.
+
+At each (h, Mach, mass) point, the angle of attack and throttle satisfy the
+equations of motion of FlightPathEOM2D at zero flight path angle,
+
+    T cos(alpha) - D = 0
+    T sin(alpha) + L - m g = 0.
+
+All the points are solved together by Newton iterations, with the 2 x 2
+Jacobian of each point from forward differences, so every iteration is one
+vectorized evaluation of the aero and F110 propulsion models.  The tables
+are cached in the user cache directory, keyed by the grid, the engine and
+aero data, and the source of the models.
+"""
+from __future__ import print_function, division, absolute_import
+import os
+import json
+import time
+import hashlib
+
+import numpy as np
+
+from path_dependent_missions.utils.cache import user_cache_dir, atomic_write
+from path_dependent_missions.escort.atmos.atmos_comp import get_interps
+from path_dependent_missions.escort.energy_state import get_performance_problem, g
+
+
+TRIM_CACHE_DIR = user_cache_dir('trim')
+
+# Default grid of the table
+default_hs = np.linspace(0., 16000., 17)
+default_machs = np.linspace(0.3, 1.6, 27)
+default_masses = np.linspace(14000., 20000., 4)
+
+trim_outputs = ['alpha', 'throttle', 'thrust', 'drag', 'm_dot', 'specific_range', 'converged']
+
+
+def speed_of_sound(h):
+    """
+    Speed of sound of the standard atmosphere of AtmosComp, m/s, at h in m.
+    """
+    return get_interps()['a'](np.asarray(h) / 0.3048) * 0.3048
+
+
+def solve_trim(h, mach, mass, aero='analytic', tol=1e-8, maxiter=30, alpha=2., throttle=0.5):
+    """
+    Trim angle of attack and throttle of many flight conditions at once.
+
+    Parameters
+    ----------
+    h, mach, mass : array_like
+        Altitude (m), Mach number and mass (kg) of each point, same shape.
+    aero : str
+        'analytic' or 'smt', see energy_state.excess_power.
+    tol : float
+        Tolerance on the residuals, relative to the weight.
+    maxiter : int
+        Maximum number of Newton iterations.
+    alpha, throttle : float or array_like
+        Initial guesses, deg and unitless.
+
+    Returns
+    -------
+    dict of ndarray
+        'alpha' (deg), 'throttle', 'thrust' and 'drag' (N), 'm_dot' (fuel
+        flow, kg/s, positive), 'specific_range' (m/kg) and 'converged', with
+        the shape of h.  Throttles outside [0, 1] are returned as solved, so
+        that they show how far a point is from being trimmable.
+    """
+    h = np.asarray(h, dtype=float)
+    shape = h.shape
+    h = h.ravel()
+    mach = np.broadcast_to(mach, shape).ravel().astype(float)
+    mass = np.broadcast_to(mass, shape).ravel().astype(float)
+    n = h.size
+
+    v = mach * speed_of_sound(h)
+    weight = mass * g
+
+    x = np.empty((n, 2))
+    x[:, 0] = np.broadcast_to(alpha, shape).ravel()
+    x[:, 1] = np.broadcast_to(throttle, shape).ravel()
+    steps = np.array([1e-4, 1e-5])
+    max_step = np.array([2., 0.2])
+
+    # the point itself and one perturbation of each unknown, in one evaluation
+    p = get_performance_problem(3 * n, aero)
+    p['h'] = np.tile(h, 3)
+    p['v'] = np.tile(v, 3)
+
+    def residuals(x):
+        p['alpha'] = np.hstack((x[:, 0], x[:, 0] + steps[0], x[:, 0]))
+        p['throttle'] = np.hstack((x[:, 1], x[:, 1], x[:, 1] + steps[1]))
+        p.run_model()
+
+        a = np.radians(p['alpha'])
+        T = p['thrust.T']
+        R = np.empty((3 * n, 2))
+        R[:, 0] = T * np.cos(a) - p['aero.f_drag']
+        R[:, 1] = T * np.sin(a) + p['aero.f_lift'] - np.tile(weight, 3)
+        return R.reshape((3, n, 2)) / weight[:, np.newaxis]
+
+    converged = np.zeros(n, dtype=bool)
+    for iteration in range(maxiter):
+        R = residuals(x)
+        converged = np.max(np.abs(R[0]), axis=1) < tol
+        if np.all(converged):
+            break
+
+        # J[i, :, k] is the derivative of the residuals of point i wrt unknown k
+        J = np.empty((n, 2, 2))
+        J[:, :, 0] = (R[1] - R[0]) / steps[0]
+        J[:, :, 1] = (R[2] - R[0]) / steps[1]
+
+        dx = np.zeros((n, 2))
+        todo = ~converged & (np.abs(np.linalg.det(J)) > 1e-300)
+        dx[todo] = -np.linalg.solve(J[todo], R[0][todo][:, :, np.newaxis])[:, :, 0]
+        x += np.clip(dx, -max_step, max_step)
+
+    # outputs at the final iterate
+    R = residuals(x)
+    converged = np.max(np.abs(R[0]), axis=1) < tol
+    m_dot = -p['prop.m_dot'][:n]
+
+    results = {
+        'alpha': x[:, 0],
+        'throttle': x[:, 1],
+        'thrust': p['thrust.T'][:n].copy(),
+        'drag': p['aero.f_drag'][:n].copy(),
+        'm_dot': m_dot,
+        'specific_range': v / m_dot,
+        'converged': converged,
+    }
+    return dict((name, val.reshape(shape)) for name, val in results.items())
+
+
+def _trim_model_hash(aero='analytic'):
+    """
+    Hash of what the trim depends on besides the grid: the F110 engine data,
+    the training data of the ESAV surrogate for aero='smt', and the source of
+    the aero and propulsion components and of the performance problem.
+    """
+    from path_dependent_missions.F110.table_model import get_F110_data_hash
+
+    sha = hashlib.sha1(get_F110_data_hash().encode())
+    if aero == 'smt':
+        from path_dependent_missions.escort.aero.aero_table import get_ESAV_data_hash
+        sha.update(get_ESAV_data_hash().encode())
+
+    escort_dir = os.path.dirname(os.path.abspath(__file__))
+    sources = [os.path.join(escort_dir, 'energy_state.py')]
+    for dirname in ('aero', 'prop'):
+        sources += [os.path.join(escort_dir, dirname, name)
+                    for name in sorted(os.listdir(os.path.join(escort_dir, dirname)))
+                    if name.endswith('.py')]
+    for source in sources:
+        with open(source, 'rb') as f:
+            sha.update(f.read())
+    return sha.hexdigest()
+
+
+def get_trim_filename(hs, machs, masses, aero='analytic'):
+    grid = [[float(val) for val in vals] for vals in (hs, machs, masses)] + [aero, _trim_model_hash(aero)]
+    grid_hash = hashlib.sha1(json.dumps(grid).encode()).hexdigest()
+    return os.path.join(TRIM_CACHE_DIR, 'trim_{}.npz'.format(grid_hash[:16]))
+
+
+class TrimTable(object):
+    """
+    Trim data on a (h, Mach, mass) grid, with linear interpolation.
+
+    Parameters
+    ----------
+    hs, machs, masses : ndarray
+        Grid of altitudes (m), Mach numbers and masses (kg).
+    data : dict of ndarray
+        Outputs of solve_trim on the grid, shape (len(hs), len(machs), len(masses)).
+    """
+
+    def __init__(self, hs, machs, masses, data):
+        self.hs = np.asarray(hs, dtype=float)
+        self.machs = np.asarray(machs, dtype=float)
+        self.masses = np.asarray(masses, dtype=float)
+        self.data = data
+        self._interps = {}
+
+    def lookup(self, name, h, mach, mass):
+        """
+        Interpolated value of trim output `name` at the given points.
+        Unconverged grid points are returned as nan.
+        """
+        from scipy.interpolate import RegularGridInterpolator
+
+        if name not in self._interps:
+            values = np.where(self.data['converged'], self.data[name], np.nan)
+            self._interps[name] = RegularGridInterpolator((self.hs, self.machs, self.masses), values,
+                                                          bounds_error=False, fill_value=None)
+        h, mach, mass = np.broadcast_arrays(h, mach, mass)
+        points = np.stack((h.ravel(), mach.ravel(), mass.ravel()), axis=-1)
+        return self._interps[name](points).reshape(h.shape)
+
+    def feasible(self):
+        """
+        Mask of the grid points trimmed with a throttle between 0 and 1.
+        """
+        throttle = self.data['throttle']
+        return self.data['converged'] & (throttle >= 0.) & (throttle <= 1.)
+
+    def save(self, filename):
+        # an interrupted run never leaves a partial table
+        with atomic_write(filename) as f:
+            np.savez(f, hs=self.hs, machs=self.machs, masses=self.masses, **self.data)
+
+    @classmethod
+    def load(cls, filename):
+        data = np.load(filename)
+        return cls(data['hs'], data['machs'], data['masses'],
+                   dict((name, data[name]) for name in trim_outputs))
+
+
+def get_trim_table(hs=default_hs, machs=default_machs, masses=default_masses, aero='analytic'):
+    """
+    Trim table of the grid, solved on first use and cached in TRIM_CACHE_DIR.
+    """
+    filename = get_trim_filename(hs, machs, masses, aero)
+    if os.path.exists(filename):
+        return TrimTable.load(filename)
+
+    st = time.time()
+    H, M, W = np.meshgrid(hs, machs, masses, indexing='ij')
+    table = TrimTable(hs, machs, masses, solve_trim(H, M, W, aero=aero))
+    print('trim table of {} points solved in {:.2f} s, {} converged, {} feasible'.format(
+        H.size, time.time() - st, int(np.sum(table.data['converged'])), int(np.sum(table.feasible()))))
+
+    table.save(filename)
+
+    return table
+
+
+if __name__ == "__main__":
+    table = get_trim_table()
+
+    # the condition of steady_level_flight.py
+    for name in ['alpha', 'throttle', 'm_dot', 'specific_range']:
+        print('{}: {:.4g}'.format(name, float(table.lookup(name, 1e4, 1.2, 19030.468))))
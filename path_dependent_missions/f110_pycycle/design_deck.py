@@ -0,0 +1,186 @@
+"""
+Off-design decks of the MixedFlowTurbofan for a sample of engine designs.
+
+The design inputs (fan and HPC design pressure ratios, T4max and the mixer
+extraction ratio) are sampled with a Latin hypercube and every design is run
+through a (MN, alt, throttle) sweep in its own worker process, with the
+throttle points of each flight condition grouped under one solver.  Each deck is
+stored in the user cache directory, keyed by its design and the sweep, so adding
+samples or rerunning after a crash only computes the missing decks.  The
+sweep covers the mission envelope, up to Mach 1.8, 70 kft and idle.  Run with
+
+    python -m path_dependent_missions.f110_pycycle.design_deck [num_designs [num_procs]]
+"""
+from __future__ import print_function, division, absolute_import
+import os
+import json
+import time
+import hashlib
+from multiprocessing import Pool
+
+import numpy as np
+
+from path_dependent_missions.utils.cache import user_cache_dir, atomic_write
+from path_dependent_missions.utils.sampling import lhs_sample
+
+
+DECK_CACHE_DIR = user_cache_dir('decks')
+
+# Sampled design inputs and their ranges
+design_vars = ['fan:PRdes', 'hpc:PRdes', 'T4max', 'Mix_ER']
+design_limits = np.array([
+    [2.9, 3.7],
+    [8.3, 10.3],
+    [3000., 3400.],
+    [0.95, 1.15],
+])
+
+# Off-design sweep of every deck; each altitude is swept in Mach number, and
+# each Mach number from full throttle down
+deck_alts = [0., 5000., 10000., 20000., 30000., 40000., 50000., 60000., 70000.]
+deck_MNs = [0.001, 0.2, 0.4, 0.6, 0.8, 1.0, 1.2, 1.4, 1.6, 1.8]
+deck_throttles = [1.0, 0.9, 0.8, 0.7, 0.6, 0.5, 0.4, 0.3, 0.2, 0.1, 0.0]
+
+# Throttle maps linearly to the requested core temperature, from
+# T4_idle_fraction * T4max at zero throttle to T4max at full throttle.  The
+# augmentor is always balanced to T4maxab, as in loop_od_points.py.
+T4_idle_fraction = 0.6
+
+
+def sample_designs(num_designs, seed=0):
+    """
+    Latin hypercube sample of the design inputs, shape (num_designs, 4).
+    """
+    return lhs_sample(design_limits, num_designs, seed=seed)
+
+
+def get_deck_filename(design):
+    key = [['{:.12g}'.format(v) for v in design], deck_alts, deck_MNs, deck_throttles,
+           T4_idle_fraction]
+    design_hash = hashlib.sha1(json.dumps(key).encode()).hexdigest()
+    return os.path.join(DECK_CACHE_DIR, 'deck_{}.npz'.format(design_hash[:16]))
+
+
+def run_design_deck(design):
+    """
+    Run the off-design sweep for one design.
+
+    The throttle points of each flight condition are solved together in a
+    GroupedOD group, and each of them continues from the same throttle at the
+    previous Mach number.  Every point is checked on its own, and the points
+    that failed are restarted from their converged throttle neighbours, see
+    `solve_grouped`.
+
+    Parameters
+    ----------
+    design : sequence of float
+        Values of the design_vars.
+
+    Returns
+    -------
+    ndarray
+        One row (MN, alt, throttle, Fn, Wfuel, converged) per point, with Fn in
+        lbf and Wfuel in lbm/s for one engine.
+    """
+    from path_dependent_missions.f110_pycycle.od_cache import get_point_states, set_point_states
+    from path_dependent_missions.f110_pycycle.od_problem import build_grouped_od_problem
+    from path_dependent_missions.f110_pycycle.grouped_od import point_names, solve_grouped
+
+    num_points = len(deck_throttles)
+    throttles = np.array(deck_throttles)
+    T4max = design[design_vars.index('T4max')]
+
+    prob = build_grouped_od_problem(num_points, design=dict(zip(design_vars, design)))
+    prob['OD.conditions.T4max'] = T4max * (T4_idle_fraction + (1 - T4_idle_fraction) * throttles)
+    pts = ['OD.' + pt for pt in point_names(num_points)]
+
+    rows = []
+    for i, alt in enumerate(deck_alts):
+        prob['OD.conditions.alt'] = alt * np.ones(num_points)
+        for j, MN in enumerate(deck_MNs):
+            prob['OD.conditions.MN'] = MN * np.ones(num_points)
+            converged = solve_grouped(prob, 'OD', throttles[:, np.newaxis], [0.1])
+
+            for k, throttle in enumerate(deck_throttles):
+                rows.append([MN, alt, throttle, prob[pts[k] + '.perf.Fn'][0],
+                             prob[pts[k] + '.perf.Wfuel'][0], converged[k]])
+
+            if j == 0:
+                row_start = [get_point_states(prob, pt, 'OD') for pt in pts]
+
+        # start the next altitude from the low speed points of this one
+        for pt, states in zip(pts, row_start):
+            states['balance.W'] = states['balance.W'] * .75
+            set_point_states(prob, pt, states, 'OD')
+
+    return np.array(rows)
+
+
+def _run_and_save(design):
+    filename = get_deck_filename(design)
+    if os.path.exists(filename):
+        return filename
+
+    st = time.time()
+    deck = run_design_deck(design)
+
+    # an interrupted run never leaves a partial deck
+    with atomic_write(filename) as f:
+        np.savez(f, design=np.asarray(design), deck=deck)
+
+    print('deck {} done in {:.1f} s, {} of {} points converged'.format(
+        os.path.basename(filename), time.time() - st, int(np.sum(deck[:, 5])), deck.shape[0]))
+    return filename
+
+
+def generate_decks(designs, num_procs=None):
+    """
+    Run the decks of all the designs that are not in the deck cache yet, in
+    `num_procs` worker processes (all the cores by default).
+
+    Returns
+    -------
+    list of str
+        Deck file of each design.
+    """
+    designs = [tuple(float(v) for v in design) for design in designs]
+    todo = [design for design in designs if not os.path.exists(get_deck_filename(design))]
+
+    if todo:
+        pool = Pool(num_procs)
+        try:
+            pool.map(_run_and_save, todo, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    return [get_deck_filename(design) for design in designs]
+
+
+def load_decks(filenames):
+    """
+    Designs and converged deck points of the given deck files.
+
+    Returns
+    -------
+    list of (ndarray, ndarray)
+        Design inputs and the (MN, alt, throttle, Fn, Wfuel) rows of its
+        converged points, for each deck.
+    """
+    decks = []
+    for filename in filenames:
+        data = np.load(filename)
+        deck = data['deck']
+        decks.append((data['design'], deck[deck[:, 5] > 0, :5]))
+    return decks
+
+
+if __name__ == "__main__":
+    import sys
+
+    num_designs = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    num_procs = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    st = time.time()
+    filenames = generate_decks(sample_designs(num_designs), num_procs)
+    print('{} decks in {:.1f} s'.format(len(filenames), time.time() - st))
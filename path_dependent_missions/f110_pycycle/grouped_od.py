@@ -0,0 +1,327 @@
+from __future__ import print_function, division, absolute_import
+
+import numpy as np
+
+from openmdao.api import Group, IndepVarComp, ExplicitComponent, DirectSolver, \
+                         BoundsEnforceLS, NewtonSolver, AnalysisError
+
+from path_dependent_missions.f110_pycycle.mixedflow_turbofan import MixedFlowTurbofan
+from path_dependent_missions.f110_pycycle.od_cache import point_scales, point_residual_norm, \
+    get_point_states, set_point_states, cached_points, seed_points, store_points
+from path_dependent_missions.f110_pycycle.mil_spec_recovery import MilSpecRecovery
+from path_dependent_missions.f110_pycycle.constrained_balance import ConstrainedTempBalance
+
+
+class MuxComp(ExplicitComponent):
+    """
+    Gather one scalar from each off-design point into a single vector, so the
+    quantity can feed a vectorized component.
+    """
+
+    def initialize(self):
+        self.options.declare('num_points', types=int)
+        self.options.declare('units', default=None, allow_none=True)
+
+    def setup(self):
+        num_points = self.options['num_points']
+        units = self.options['units']
+
+        self.add_output('y', shape=num_points, units=units)
+
+        for i in range(num_points):
+            self.add_input('x_{}'.format(i), units=units)
+            self.declare_partials('y', 'x_{}'.format(i), rows=[i], cols=[0], val=1.)
+
+    def compute(self, inputs, outputs):
+        outputs['y'] = np.concatenate([inputs['x_{}'.format(i)]
+                                       for i in range(self.options['num_points'])])
+
+
+class GroupedOD(Group):
+    """
+    Several off-design points of the MixedFlowTurbofan grouped under a single
+    Newton solver.
+
+    This is a grouping helper, not a vectorized engine: the pyCycle elements
+    are scalar, so every point is still its own MixedFlowTurbofan subgroup,
+    and a Newton iteration costs about as much as one iteration of each point
+    on its own.  The points do not depend on each other, so the assembled
+    Jacobian is block diagonal and the sparse factorization of the
+    DirectSolver costs about the same as factoring every point on its own.
+    Only the inlet recovery and the constrained core FAR balance, which have
+    num_nodes options, are evaluated once for all the points.
+
+    What the grouping saves is the per-point driver overhead for independent
+    points given all at once.  It is used by run_od_points, by loop_od_points
+    for each row of OD_CASES, and by the design decks for the throttle points
+    of each flight condition.  Since a single Newton solver converges all the
+    points, its atol grows with sqrt(num_points) only, and `solve_grouped`
+    checks the residuals of every point on its own and restarts the points
+    that did not converge from their converged neighbours.
+
+    The flight conditions and controls of every point are the outputs of the
+    `conditions` IndepVarComp, e.g. prob['OD.conditions.MN'] = MNs.
+    """
+
+    def initialize(self):
+        self.options.declare('num_points', types=int,
+                             desc='Number of off-design points')
+        self.options.declare('smooth', types=bool, default=False,
+                             desc='Smooth switching in the inlet recovery and the constrained core FAR balance')
+        self.options.declare('rho', types=float, default=50.,
+                             desc='Sharpness of the smooth switching of the inlet recovery')
+        self.options.declare('balance_rho', types=float, default=2000.,
+                             desc='Sharpness of the smooth switching of the constrained core FAR balance')
+
+    def setup(self):
+        num_points = self.options['num_points']
+        smooth = self.options['smooth']
+        rho = self.options['rho']
+        balance_rho = self.options['balance_rho']
+
+        conditions = self.add_subsystem('conditions', IndepVarComp())
+        conditions.add_output('MN', val=0.5*np.ones(num_points))
+        conditions.add_output('alt', val=np.zeros(num_points), units='ft')
+        conditions.add_output('vabi_control', val=np.ones(num_points))
+        conditions.add_output('hpc_control', val=np.zeros(num_points))
+        conditions.add_output('fan_control', val=np.zeros(num_points))
+        conditions.add_output('T4max', val=3200.*np.ones(num_points), units='degR')
+        conditions.add_output('T4maxab', val=3400.*np.ones(num_points), units='degR')
+
+        self.add_subsystem('mil_spec', MilSpecRecovery(num_nodes=num_points, smooth=smooth, rho=rho))
+        self.connect('conditions.MN', 'mil_spec.MN')
+
+        for pt in point_names(num_points):
+            self.add_subsystem(pt, MixedFlowTurbofan(design=False, grouped=True, smooth=smooth, rho=rho,
+                                                       balance_rho=balance_rho))
+
+        self.add_subsystem('T_mux', MuxComp(num_points=num_points, units='degR'))
+        self.add_subsystem('Nc_mux', MuxComp(num_points=num_points, units='rpm'))
+        self.add_subsystem('far_core_bal', ConstrainedTempBalance(num_nodes=num_points, smooth=smooth,
+                                                                   rho=balance_rho))
+        self.connect('T_mux.y', 'far_core_bal.T_computed')
+        self.connect('Nc_mux.y', 'far_core_bal.Nc_computed')
+        self.connect('conditions.T4max', 'far_core_bal.T_requested')
+
+        for i, pt in enumerate(point_names(num_points)):
+            self.connect('conditions.alt', pt+'.fc.alt', src_indices=[i])
+            self.connect('conditions.MN', pt+'.fc.MN', src_indices=[i])
+            self.connect('conditions.vabi_control', pt+'.vabi.fact', src_indices=[i])
+            self.connect('conditions.hpc_control', pt+'.hpc.map.alphaMap', src_indices=[i])
+            self.connect('conditions.fan_control', pt+'.fan.map.alphaMap', src_indices=[i])
+            self.connect('conditions.T4maxab', pt+'.balance.rhs:FAR_ab', src_indices=[i])
+
+            self.connect('mil_spec.ram_recovery', pt+'.inlet.ram_recovery', src_indices=[i])
+
+            self.connect(pt+'.burner.Fl_O:tot:T', 'T_mux.x_{}'.format(i))
+            self.connect(pt+'.fan.map.shaftNc.NcMap', 'Nc_mux.x_{}'.format(i))
+            self.connect('far_core_bal.FAR', pt+'.burner.Fl_I:FAR', src_indices=[i])
+
+        newton = self.nonlinear_solver = NewtonSolver()
+        newton.options['atol'] = 1e-6 * np.sqrt(num_points)
+        newton.options['rtol'] = 1e-10
+        newton.options['iprint'] = 2
+        newton.options['maxiter'] = 30
+        newton.options['solve_subsystems'] = True
+        newton.options['max_sub_solves'] = 10
+        newton.linesearch = BoundsEnforceLS()
+        newton.linesearch.options['bound_enforcement'] = 'scalar'
+        newton.linesearch.options['iprint'] = -1
+
+        self.linear_solver = DirectSolver(assemble_jac=True)
+
+
+def point_names(num_points):
+    return ['pt{}'.format(i) for i in range(num_points)]
+
+
+def solve_grouped(prob, od_name, points, scales, residual_tol=1e-4, max_retries=1):
+    """
+    Run the model and check the residuals of every point of the GroupedOD
+    group `od_name` on its own.
+
+    The points that did not converge are restarted from the states of the
+    nearest converged point of the group and the model is run again, up to
+    `max_retries` times, so that one diverging point does not take the guesses
+    of the others with it.
+
+    Parameters
+    ----------
+    prob : Problem
+        Problem with the conditions and the initial guesses of the group set.
+    od_name : str
+        Path name of the GroupedOD group.
+    points : array_like
+        Coordinates of each point, shape (num_points, n), used to find the
+        nearest converged point.
+    scales : array_like
+        Scale of each of the n coordinates in that distance.
+    residual_tol : float
+        Largest norm of the residuals of a converged point.
+    max_retries : int
+        Number of times the failed points are restarted.
+
+    Returns
+    -------
+    ndarray of bool
+        Whether each point converged.
+    """
+    points = np.asarray(points, dtype=float) / scales
+    names = [od_name + '.' + pt for pt in point_names(len(points))]
+
+    for attempt in range(max_retries + 1):
+        try:
+            prob.run_model()
+        except AnalysisError:
+            # the residuals were left at the failed iterate
+            prob.model.run_apply_nonlinear()
+
+        converged = np.array([point_residual_norm(prob, pt, od_name) < residual_tol
+                              for pt in names])
+        if converged.all() or not converged.any() or attempt == max_retries:
+            break
+
+        for i in np.nonzero(~converged)[0]:
+            distance = np.linalg.norm(points - points[i], axis=1)
+            distance[~converged] = np.inf
+            nearest = names[np.argmin(distance)]
+            set_point_states(prob, names[i], get_point_states(prob, nearest, od_name), od_name)
+
+    return converged
+
+
+def run_grouped_points(prob, od_name, cache, design_inputs, points, output_vars=(),
+                       residual_tol=1e-4, max_retries=1, max_distance=1., guess_points=None):
+    """
+    Converge the points of the GroupedOD group `od_name` through the OD cache.
+
+    When every point is in the cache the stored outputs are returned and the
+    model is not run; the stored states are still written into `prob`.
+    Otherwise the points are seeded from the cache, see `seed_points`, solved
+    together with `solve_grouped`, and the converged ones are added to the
+    cache.
+
+    Parameters
+    ----------
+    points : dict
+        (MN, alt, hpc_control, fan_control, vabi_control) of each point name,
+        '<od_name>.pt<i>', in the conditions of the group.
+    output_vars : list of str
+        Outputs returned and stored with each point, relative to the point.
+    guess_points : dict or None
+        Point at which the current guesses of each point name were converged.
+
+    Returns
+    -------
+    dict
+        Value of each of the output_vars, for each point name.
+    list of str
+        Names of the points that did not converge.
+    """
+    stored = cached_points(cache, design_inputs, points)
+    seed_points(prob, cache, design_inputs, points, max_distance=max_distance,
+                guess_points=guess_points, grouped=od_name)
+    if stored is not None:
+        return stored, []
+
+    names = sorted(points, key=lambda pt: int(pt[len(od_name + '.pt'):]))
+    solve_grouped(prob, od_name, [points[pt] for pt in names], point_scales,
+                  residual_tol=residual_tol, max_retries=max_retries)
+    failed = store_points(prob, cache, design_inputs, points, output_vars=output_vars,
+                          residual_tol=residual_tol, grouped=od_name)
+
+    outputs = dict((pt, dict((var, prob[pt + '.' + var].copy()) for var in output_vars))
+                   for pt in points)
+    return outputs, failed
+
+
+def set_od_guesses(prob, od_name, num_points):
+    """
+    Default initial guesses for every point of a GroupedOD group, the same
+    ones used for a single off-design point.
+    """
+    prob[od_name+'.far_core_bal.FAR'] = 0.028
+    for pt in point_names(num_points):
+        pt = od_name + '.' + pt
+        prob[pt+'.balance.FAR_ab'] = 0.034
+        prob[pt+'.balance.BPR'] = .9
+        prob[pt+'.balance.W'] = 157.225
+        prob[pt+'.balance.HP_Nmech'] = 1.
+        prob[pt+'.balance.LP_Nmech'] = 1.
+        prob[pt+'.fc.balance.Pt'] = 14.696
+        prob[pt+'.fc.balance.Tt'] = 518.67
+        prob[pt+'.mixer.balance.P_tot'] = 55
+        prob[pt+'.hpt.PR'] = 3.439
+        prob[pt+'.lpt.PR'] = 2.438
+        prob[pt+'.fan.map.RlineMap'] = 2.0
+        prob[pt+'.hpc.map.RlineMap'] = 2.0
+
+
+if __name__ == "__main__":
+    import time
+
+    from openmdao.api import Problem
+
+    from path_dependent_missions.f110_pycycle.mixedflow_turbofan import connect_des_data, print_perf
+    from path_dependent_missions.f110_pycycle.od_cases import OD_CASES
+
+    prob = Problem()
+
+    des_vars = prob.model.add_subsystem('des_vars', IndepVarComp(), promotes=["*"])
+
+    des_vars.add_output('alt', 0.0, units='ft')
+    des_vars.add_output('MN', 0.001)
+    des_vars.add_output('T4max', 3200, units='degR')
+    des_vars.add_output('T4maxab', 3400, units='degR')
+    des_vars.add_output('Fn_des', 17000., units='lbf')
+    des_vars.add_output('Mix_ER', 1.05, units=None)
+    des_vars.add_output('fan:PRdes', 3.3)
+    des_vars.add_output('hpc:PRdes', 9.3)
+
+    prob.model.add_subsystem('DESIGN', MixedFlowTurbofan(design=True))
+
+    prob.model.connect('alt', 'DESIGN.fc.alt')
+    prob.model.connect('MN', 'DESIGN.fc.MN')
+    prob.model.connect('Fn_des', 'DESIGN.balance.rhs:W')
+    prob.model.connect('T4max', 'DESIGN.balance.rhs:FAR_core')
+    prob.model.connect('T4maxab', 'DESIGN.balance.rhs:FAR_ab')
+    prob.model.connect('Mix_ER', 'DESIGN.balance.rhs:BPR')
+    prob.model.connect('fan:PRdes', 'DESIGN.fan.map.PRdes')
+    prob.model.connect('hpc:PRdes', 'DESIGN.hpc.map.PRdes')
+
+    # the sea level to 17 kft rows of the sweep, all solved at once
+    cases = np.array([case for row in OD_CASES[:6] for case in row])
+    num_points = len(cases)
+
+    prob.model.add_subsystem('OD', GroupedOD(num_points=num_points))
+    connect_des_data(prob, 'DESIGN', ['OD.' + pt for pt in point_names(num_points)])
+
+    prob.setup(check=False)
+
+    prob['DESIGN.balance.FAR_core'] = 0.025
+    prob['DESIGN.balance.FAR_ab'] = 0.025
+    prob['DESIGN.balance.BPR'] = 0.85
+    prob['DESIGN.balance.W'] = 150.
+    prob['DESIGN.balance.lpt_PR'] = 3.5
+    prob['DESIGN.balance.hpt_PR'] = 2.5
+    prob['DESIGN.fc.balance.Pt'] = 14.
+    prob['DESIGN.fc.balance.Tt'] = 500.0
+    prob['DESIGN.mixer.balance.P_tot'] = 72
+
+    prob['OD.conditions.MN'] = cases[:, 0]
+    prob['OD.conditions.alt'] = cases[:, 1]
+    prob['OD.conditions.hpc_control'] = cases[:, 2]
+    prob['OD.conditions.fan_control'] = cases[:, 3]
+    prob['OD.conditions.vabi_control'] = cases[:, 4]
+    set_od_guesses(prob, 'OD', num_points)
+
+    prob.set_solver_print(level=-1)
+    prob.set_solver_print(level=2, depth=2)
+
+    st = time.time()
+    converged = solve_grouped(prob, 'OD', cases[:, :2], point_scales[:2])
+    print('{} off-design points in {:.2f} s, {} converged'.format(
+        num_points, time.time() - st, int(np.sum(converged))))
+
+    for pt in point_names(num_points):
+        print_perf(prob, 'OD.' + pt)
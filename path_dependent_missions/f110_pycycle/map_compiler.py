@@ -0,0 +1,216 @@
+from __future__ import print_function, division, absolute_import
+import os
+import json
+import hashlib
+import importlib
+
+import numpy as np
+
+from path_dependent_missions.utils.hermite_table import HermiteTable
+from path_dependent_missions.utils.cache import user_cache_dir, atomic_write
+
+
+this_dir = os.path.split(__file__)[0]
+
+MAP_CACHE_DIR = user_cache_dir('maps')
+
+# Map name -> module holding its MapData definition
+map_modules = {
+    'HPCmap': 'path_dependent_missions.f110_pycycle.map_hpc9_3',
+    'FanMap': 'path_dependent_missions.f110_pycycle.map_msfan3_3',
+}
+
+# Maps already rebuilt by load_map_data in this process
+_loaded_maps = {}
+
+
+def compile_map(map_data, filename):
+    """
+    Write a pyCycle MapData to a binary npz file together with the slopes of
+    the cubic Hermite interpolant of its outputs.
+
+    Parameters
+    ----------
+    map_data : MapData
+        Map with `param_data` and `output_data` in the regular grid format.
+    filename : str
+        Name of the npz file to write.
+    """
+    grids = [np.asarray(param['values'], dtype=float) for param in map_data.param_data]
+    values = np.stack([np.asarray(out['values'], dtype=float) for out in map_data.output_data], axis=-1)
+    table = HermiteTable.from_grid_data(grids, values)
+
+    meta = {
+        'params': [{'name': p['name'], 'default': p['default'], 'units': p['units']}
+                   for p in map_data.param_data],
+        'outputs': [{'name': o['name'], 'units': o['units']} for o in map_data.output_data],
+        'defaults': map_data.defaults,
+        'units': getattr(map_data, 'units', {}),
+        'extra': {},
+    }
+
+    arrays = {}
+    for out in map_data.output_data:
+        arrays['default_' + out['name']] = np.asarray(out['default'], dtype=float)
+
+    # other scalar attributes of the map
+    for name, val in vars(map_data).items():
+        if isinstance(val, (int, float)) and not isinstance(val, bool):
+            meta['extra'][name] = val
+
+    # sweep workers compiling the same map at the same time never read a
+    # partially written file
+    with atomic_write(filename) as f:
+        np.savez(f, meta=np.array(json.dumps(meta)), xlimits=table.xlimits,
+                 coeffs=table.coeffs,
+                 **dict(table._grid_arrays(), **arrays))
+
+
+def get_compiled_map_file(name):
+    """
+    Return the npz file of a compiled map, compiling it first if it is missing.
+    The file name holds a hash of the module that defines the map, so editing
+    the map compiles it again, whatever the file times.
+    """
+    module_name = map_modules[name]
+
+    source = os.path.join(this_dir, module_name.rsplit('.', 1)[1] + '.py')
+    with open(source, 'rb') as f:
+        source_hash = hashlib.md5(f.read()).hexdigest()[:12]
+    filename = os.path.join(MAP_CACHE_DIR, '{}_{}.npz'.format(name, source_hash))
+
+    if not os.path.exists(filename):
+        module = importlib.import_module(module_name)
+        compile_map(getattr(module, name), filename)
+
+    return filename
+
+
+def load_map_data(name):
+    """
+    Rebuild a pyCycle MapData from its compiled npz file, without importing the
+    module that holds the map as Python literals.  The map is compiled on the
+    first call if needed, and rebuilt once per process.
+    """
+    from pycycle.maps.map_data import MapData
+
+    if name in _loaded_maps:
+        return _loaded_maps[name]
+
+    data = np.load(get_compiled_map_file(name))
+    meta = json.loads(str(data['meta']))
+
+    map_data = MapData()
+    map_data.defaults = meta['defaults']
+    map_data.units = meta['units']
+    for attr, val in meta['extra'].items():
+        setattr(map_data, attr, val)
+
+    map_data.param_data = []
+    for k, param in enumerate(meta['params']):
+        values = data['grid_{}'.format(k)]
+        setattr(map_data, param['name'], values)
+        map_data.param_data.append({'name': param['name'], 'values': values,
+                                    'default': param['default'], 'units': param['units']})
+
+    map_data.output_data = []
+    coeffs = data['coeffs']
+    for i, out in enumerate(meta['outputs']):
+        values = np.ascontiguousarray(coeffs[..., 0, i])
+        setattr(map_data, out['name'], values)
+        default = data['default_' + out['name']]
+        map_data.output_data.append({'name': out['name'], 'values': values,
+                                     'default': default if default.ndim else float(default),
+                                     'units': out['units']})
+
+    map_data.Npts = map_data.param_data[1]['values'].size
+
+    _loaded_maps[name] = map_data
+    return map_data
+
+
+class MapLookup(object):
+    """
+    Evaluation of a compiled map at many operating points per call, to plot
+    or check a map off-line.
+
+    The engine model does not use it: the map lookups of the pyCycle
+    Compressor elements are internal to pyCycle and still interpolate the
+    MapData rebuilt by load_map_data, one point at a time.  What the compiled
+    maps save in the engine model is the import of the map modules.
+
+    Parameters
+    ----------
+    name : str
+        Name of the map, one of the keys of `map_modules`.
+    """
+
+    def __init__(self, name):
+        filename = get_compiled_map_file(name)
+        data = np.load(filename)
+        meta = json.loads(str(data['meta']))
+
+        self.param_names = [param['name'] for param in meta['params']]
+        self.output_names = [out['name'] for out in meta['outputs']]
+        self.table = HermiteTable.load(filename)
+
+    def _x(self, params):
+        return np.column_stack([np.atleast_1d(params[name]).astype(float)
+                                for name in self.param_names])
+
+    def __call__(self, **params):
+        """
+        Evaluate the map outputs, e.g. lookup(alphaMap=a, NcMap=Nc, RlineMap=R).
+
+        Returns
+        -------
+        dict
+            Array of values for each map output.
+        """
+        y = self.table.predict_values(self._x(params))
+        return {name: y[:, i] for i, name in enumerate(self.output_names)}
+
+    def derivatives(self, **params):
+        """
+        Derivatives of every map output with respect to every map parameter.
+
+        Returns
+        -------
+        dict
+            Array of derivatives keyed by (output name, parameter name).
+        """
+        x = self._x(params)
+        derivs = {}
+        for k, param in enumerate(self.param_names):
+            dy = self.table.predict_derivatives(x, k)
+            for i, name in enumerate(self.output_names):
+                derivs[name, param] = dy[:, i]
+        return derivs
+
+
+if __name__ == "__main__":
+    import time
+
+    for name in sorted(map_modules):
+        t0 = time.time()
+        module = importlib.import_module(map_modules[name])
+        t_import = time.time() - t0
+
+        compile_map(getattr(module, name), get_compiled_map_file(name))
+
+        t0 = time.time()
+        load_map_data(name)
+        t_load = time.time() - t0
+
+        lookup = MapLookup(name)
+
+        n = 100000
+        source = getattr(module, name)
+        params = {p['name']: np.random.uniform(p['values'][0], p['values'][-1], n)
+                  for p in source.param_data}
+        t0 = time.time()
+        lookup(**params)
+        t_eval = time.time() - t0
+
+        print('{}: module import {:.4f} s, compiled load {:.4f} s, off-line lookup of {} points '
+              'in {:.4f} s'.format(name, t_import, t_load, n, t_eval))
@@ -1,40 +1,93 @@
+import numpy as np
+
 from openmdao.api import ExplicitComponent
 
 class MilSpecRecovery(ExplicitComponent):
 
+    def initialize(self):
+        self.options.declare('num_nodes', types=int, default=1,
+                             desc='Number of flight conditions evaluated at once')
+        self.options.declare('smooth', types=bool, default=False,
+                             desc='Blend the subsonic, supersonic and hypersonic branches smoothly '
+                                  'instead of switching at MN = 1 and MN = 5')
+        self.options.declare('rho', types=float, default=50.,
+                             desc='Sharpness of the smooth blending, in 1/MN')
+
     def setup(self):
+        nn = self.options['num_nodes']
+
+        self.add_input('MN', desc='Mach Number', val=0.5*np.ones(nn))
+        self.add_output('ram_recovery', desc='percent total pressure recovered', shape=nn)
+
+        ar = np.arange(nn)
+        self.declare_partials('ram_recovery', 'MN', rows=ar, cols=ar)
+
+    def _smooth_recovery(self, MN):
+        """
+        Supersonic recovery of the softplus of MN - 1, which is ~0 when subsonic,
+        blended with the hypersonic recovery around MN = 5 with a tanh.
+
+        Returns the recovery and its derivative with respect to MN.
+        """
+        rho = self.options['rho']
+
+        x = rho*(MN - 1.)
+        sp = (np.maximum(x, 0.) + np.log1p(np.exp(-np.abs(x))))/rho
+        dsp = 0.5*(1. + np.tanh(0.5*x))
+
+        sup = 1. - 0.076*sp**1.35
+        d_sup = -0.076*1.35*sp**0.35*dsp
+
+        hyp = 800/(MN**4 + 935)
+        d_hyp = -800.*4*MN**3/(MN**4 + 935.)**2
+
+        tanh = np.tanh(0.5*rho*(MN - 5.))
+        w = 0.5*(1. + tanh)
+        dw = 0.25*rho*(1. - tanh**2)
 
-        self.add_input('MN', desc='Mach Number', val=0.5)
-        self.add_output('ram_recovery', desc='percent total pressure recovered')
+        recovery = (1. - w)*sup + w*hyp
+        d_recovery = (1. - w)*d_sup + w*d_hyp + dw*(hyp - sup)
 
-        self.declare_partials('ram_recovery', 'MN')
+        return recovery, d_recovery
 
     def compute(self, inputs, outputs):
 
         MN = inputs['MN']
-        if MN <= 1.:
-            outputs['ram_recovery'] = 1.
-        elif (MN > 1.) and (MN <= 5.):
-            outputs['ram_recovery'] = 1. - 0.076*(MN - 1.)**1.35
-        else:
-            outputs['ram_recovery'] = 800/(MN**4 + 935)
+
+        if self.options['smooth']:
+            outputs['ram_recovery'] = self._smooth_recovery(MN)[0]
+            return
+
+        subsonic = MN <= 1.
+        supersonic = (MN > 1.) & (MN <= 5.)
+        hypersonic = MN > 5.
+
+        ram_recovery = np.ones(MN.shape)
+        ram_recovery[supersonic] = 1. - 0.076*(MN[supersonic] - 1.)**1.35
+        ram_recovery[hypersonic] = 800/(MN[hypersonic]**4 + 935)
+        outputs['ram_recovery'] = ram_recovery
 
     def compute_partials(self, inputs, J):
         MN = inputs['MN']
 
-        if MN <= 1.:
-            J['ram_recovery', 'MN'] = 0.
-        elif (MN > 1.) and (MN <= 5.):
-            J['ram_recovery', 'MN'] = -0.76*1.35*(MN - 1)**0.35
-        else:
-            J['ram_recovery', 'MN'] = -800.*4*MN**3/(MN**4 + 935.)**2
+        if self.options['smooth']:
+            J['ram_recovery', 'MN'] = self._smooth_recovery(MN)[1]
+            return
+
+        supersonic = (MN > 1.) & (MN <= 5.)
+        hypersonic = MN > 5.
+
+        d_recovery = np.zeros(MN.shape)
+        d_recovery[supersonic] = -0.076*1.35*(MN[supersonic] - 1)**0.35
+        d_recovery[hypersonic] = -800.*4*MN[hypersonic]**3/(MN[hypersonic]**4 + 935.)**2
+        J['ram_recovery', 'MN'] = d_recovery
 
 
 if __name__ == "__main__":
     from openmdao.api import Problem
 
     p = Problem()
-    p.model = MilSpecRecovery()
+    p.model = MilSpecRecovery(num_nodes=3)
 
     p.setup()
 
@@ -42,13 +95,15 @@ if __name__ == "__main__":
     # check partials will have trouble at these points
     # make sure to check partials in all three ranges
     print(80*'#')
-    p['MN'] = 0.5
+    p['MN'] = [0.5, 1.2, 6.0]
     p.check_partials()
 
-    print(80*'#')
-    p['MN'] = 1.2
-    p.check_partials()
+    # the smooth variant can be checked anywhere, including the switching points
+    p = Problem()
+    p.model = MilSpecRecovery(num_nodes=5, smooth=True)
+
+    p.setup()
 
     print(80*'#')
-    p['MN'] = 6.0
+    p['MN'] = [0.5, 1.0, 1.2, 5.0, 6.0]
     p.check_partials()
@@ -12,8 +12,6 @@ from pycycle.connect_flow import connect_flow
 # from pycycle.balance import Balance
 from pycycle.cea import species_data
 from pycycle.elements.api import FlightConditions, Inlet, Compressor, Combustor, Turbine, Nozzle, Shaft, Duct, Performance,Splitter, Mixer, BleedOut
-from pycycle.viewers import print_flow_station, print_compressor, print_turbine, \
-                            print_nozzle, print_bleed, print_shaft, print_burner, print_mixer
 from pycycle.maps.axi5 import AXI5
 from pycycle.maps.lpt2269 import LPT2269
 # from pycycle.maps.CFM56_Fan_map import FanMap
@@ -22,20 +20,36 @@ from pycycle.maps.CFM56_HPT_map import HPTmap
 from pycycle.maps.CFM56_LPT_map import LPTmap
 
 
-from path_dependent_missions.f110_pycycle.map_msfan3_3 import  FanMap
-from path_dependent_missions.f110_pycycle.map_hpc9_3 import  HPCmap
+from path_dependent_missions.f110_pycycle.map_compiler import load_map_data
 from path_dependent_missions.f110_pycycle.mil_spec_recovery import MilSpecRecovery
 from path_dependent_missions.f110_pycycle.constrained_balance import ConstrainedTempBalance
 
+
 class MixedFlowTurbofan(Group):
 
     def initialize(self):
         self.options.declare('design', default=True,
             desc='Switch between on-design and off-design calculation.')
+        self.options.declare('grouped', default=False,
+            desc='Off-design point inside a GroupedOD group, which provides the inlet recovery and '
+                 'core FAR balance of all its points and converges them with one Newton solver.')
+        self.options.declare('smooth', types=bool, default=False,
+            desc='Smooth switching in the inlet recovery and the constrained core FAR balance.')
+        self.options.declare('rho', types=float, default=50.,
+            desc='Sharpness of the smooth switching of the inlet recovery.')
+        self.options.declare('balance_rho', types=float, default=2000.,
+            desc='Sharpness of the smooth switching of the constrained core FAR balance.')
 
     def setup(self):
         thermo_spec = species_data.janaf
         design = self.options['design']
+        grouped = self.options['grouped']
+        smooth = self.options['smooth']
+        rho = self.options['rho']
+        balance_rho = self.options['balance_rho']
+
+        if design and grouped:
+            raise ValueError('Only off-design points can be part of a GroupedOD group.')
 
         ##########################################
         # Elements
@@ -43,7 +57,8 @@ class MixedFlowTurbofan(Group):
 
         self.add_subsystem('fc', FlightConditions(thermo_data=thermo_spec, elements=AIR_MIX))
         # Inlet Components
-        self.add_subsystem('mil_spec', MilSpecRecovery())
+        if not grouped:
+            self.add_subsystem('mil_spec', MilSpecRecovery(smooth=smooth, rho=rho))
         self.add_subsystem('inlet', Inlet(design=design, thermo_data=thermo_spec, elements=AIR_MIX))
 
         # Fan Components - Split here for CFD integration Add a CFDStart Compomponent
@@ -61,7 +76,9 @@ class MixedFlowTurbofan(Group):
         ##############
         self.add_subsystem('ic_duct', Duct(design=design, thermo_data=thermo_spec, elements=AIR_MIX))
 
-        self.add_subsystem('hpc', Compressor(map_data=HPCmap, design=design, thermo_data=thermo_spec, elements=AIR_MIX,
+        # the F110 HPC map is loaded from its compiled binary form, compiled
+        # on first use rather than at import
+        self.add_subsystem('hpc', Compressor(map_data=load_map_data('HPCmap'), design=design, thermo_data=thermo_spec, elements=AIR_MIX,
                                         bleed_names=['cool1', 'cool2'], map_extrap=True),
                             promotes_inputs=[('Nmech','HP_Nmech')])
 
@@ -139,8 +156,9 @@ class MixedFlowTurbofan(Group):
         #  Additional Connections
         ##########################################
         # Make additional model connections
-        self.connect('fc.Fl_O:stat:MN', 'mil_spec.MN')
-        self.connect('mil_spec.ram_recovery', 'inlet.ram_recovery')
+        if not grouped:
+            self.connect('fc.Fl_O:stat:MN', 'mil_spec.MN')
+            self.connect('mil_spec.ram_recovery', 'inlet.ram_recovery')
         self.connect('inlet.Fl_O:tot:P', 'perf.Pt2')
         self.connect('hpc.Fl_O:tot:P', 'perf.Pt3')
         self.connect('burner.Wfuel', 'perf.Wfuel_0')
@@ -210,11 +228,12 @@ class MixedFlowTurbofan(Group):
             self.connect('balance.FAR_ab', 'augmentor.Fl_I:FAR')
             self.connect('augmentor.Fl_O:tot:T', 'balance.lhs:FAR_ab')
 
-            far_core_bal = ConstrainedTempBalance()
-            self.add_subsystem('far_core_bal', far_core_bal)
-            self.connect('far_core_bal.FAR', 'burner.Fl_I:FAR')
-            self.connect('burner.Fl_O:tot:T', 'far_core_bal.T_computed')
-            self.connect('fan.map.shaftNc.NcMap', 'far_core_bal.Nc_computed')
+            if not grouped:
+                far_core_bal = ConstrainedTempBalance(smooth=smooth, rho=balance_rho)
+                self.add_subsystem('far_core_bal', far_core_bal)
+                self.connect('far_core_bal.FAR', 'burner.Fl_I:FAR')
+                self.connect('burner.Fl_O:tot:T', 'far_core_bal.T_computed')
+                self.connect('fan.map.shaftNc.NcMap', 'far_core_bal.Nc_computed')
 
             balance.add_balance('LP_Nmech', val=1., units='rpm', lower=0.5, upper=2., eq_units='hp', use_mult=True, mult_val=-1)
             self.connect('balance.LP_Nmech', 'LP_Nmech')
@@ -226,22 +245,23 @@ class MixedFlowTurbofan(Group):
             self.connect('hp_shaft.pwr_in', 'balance.lhs:HP_Nmech')
             self.connect('hp_shaft.pwr_out', 'balance.rhs:HP_Nmech')
 
-        newton = self.nonlinear_solver = NewtonSolver()
-        newton.options['atol'] = 1e-6
-        newton.options['rtol'] = 1e-10
-        newton.options['iprint'] = 2
-        newton.options['maxiter'] = 30
-        newton.options['solve_subsystems'] = True
-        newton.options['max_sub_solves'] = 10
-        newton.linesearch = BoundsEnforceLS()
-        newton.linesearch.options['bound_enforcement'] = 'scalar'
-        # newton.linesearch.options['print_bound_enforce'] = True
-        newton.linesearch.options['iprint'] = -1
+        if not grouped:
+            newton = self.nonlinear_solver = NewtonSolver()
+            newton.options['atol'] = 1e-6
+            newton.options['rtol'] = 1e-10
+            newton.options['iprint'] = 2
+            newton.options['maxiter'] = 30
+            newton.options['solve_subsystems'] = True
+            newton.options['max_sub_solves'] = 10
+            newton.linesearch = BoundsEnforceLS()
+            newton.linesearch.options['bound_enforcement'] = 'scalar'
+            # newton.linesearch.options['print_bound_enforce'] = True
+            newton.linesearch.options['iprint'] = -1
 
-        # newton.linesearch = ArmijoGoldsteinLS()
-        # newton.linesearch.options['c'] = -.1
+            # newton.linesearch = ArmijoGoldsteinLS()
+            # newton.linesearch.options['c'] = -.1
 
-        self.linear_solver = DirectSolver(assemble_jac=True)
+            self.linear_solver = DirectSolver(assemble_jac=True)
 
         # TODO: re-factor pycycle so this block isn't needed in default use case!!!
         if design:
@@ -369,6 +389,9 @@ def print_perf(prob,ptName):
 
 
 def page_viewer(prob,point):
+        from pycycle.viewers import print_flow_station, print_compressor, print_turbine, \
+                                    print_nozzle, print_bleed, print_shaft, print_burner, print_mixer
+
         flow_stations = ['fc.Fl_O', 'inlet.Fl_O', 'fan.Fl_O', 'bypass_duct.Fl_O',
                          'splitter.Fl_O2', 'splitter.Fl_O1', 'ic_duct.Fl_O',
                          'hpc.Fl_O', 'duct_3.Fl_O', 'bleed_3.Fl_O', 'burner.Fl_O', 'hpt.Fl_O',
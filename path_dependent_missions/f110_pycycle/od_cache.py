@@ -0,0 +1,398 @@
+from __future__ import print_function, division, absolute_import
+import os
+import json
+import sqlite3
+import hashlib
+
+import numpy as np
+
+from path_dependent_missions.utils.cache import user_cache_dir, makedirs
+
+
+OD_CACHE_FILE = os.path.join(user_cache_dir('od_points'), 'od_points.sqlite')
+
+# Design inputs of the MixedFlowTurbofan that the off-design points depend on
+design_vars = ['alt', 'MN', 'T4max', 'T4maxab', 'Fn_des', 'Mix_ER', 'fan:PRdes', 'hpc:PRdes']
+
+# Off-design point definition, in the order of the OD_CASES tuples
+point_vars = ['MN', 'alt', 'hpc_control', 'fan_control', 'vabi_control']
+
+# Solver states of an off-design point, relative to the point
+od_state_vars = ['far_core_bal.FAR', 'balance.FAR_ab', 'balance.BPR', 'balance.W', 'balance.HP_Nmech',
+                 'balance.LP_Nmech', 'fc.balance.Pt', 'fc.balance.Tt', 'mixer.balance.P_tot', 'hpt.PR',
+                 'lpt.PR', 'fan.map.RlineMap', 'hpc.map.RlineMap']
+
+# Options of the engine groups that change the converged off-design points
+model_options = ['smooth', 'rho', 'balance_rho']
+
+# Scale of each point variable in the distance used to find the nearest cached point
+point_scales = np.array([0.1, 2000., 0.1, 0.1, 0.1])
+
+
+def _format(value):
+    # 12 significant digits, so values that only differ by round-off share a key
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        return '{:.12g}'.format(float(value))
+    return str(value)
+
+
+def _hash(values):
+    return hashlib.sha1(json.dumps([_format(v) for v in values]).encode()).hexdigest()
+
+
+def _map_data_hash(map_data):
+    sha = hashlib.sha1()
+    for data in list(map_data.param_data) + list(map_data.output_data):
+        sha.update(data['name'].encode())
+        sha.update(np.ascontiguousarray(data['values'], dtype=float).tobytes())
+    return sha.hexdigest()
+
+
+def residual_norm(system):
+    """
+    Norm of the residuals of all the outputs of `system`, after it was run.
+    """
+    outputs = system.list_outputs(values=False, residuals=True, out_stream=None)
+    return np.sqrt(sum(np.sum(np.square(meta['resids'])) for _, meta in outputs))
+
+
+def get_subsystem(prob, pathname):
+    """
+    Subsystem of the model of `prob` with the given path name.
+    """
+    system = prob.model
+    for name in pathname.split('.'):
+        system = getattr(system, name)
+    return system
+
+
+def point_state_names(pt, grouped=None):
+    """
+    Name of each solver state of the off-design point `pt`, and its index in
+    that variable, or None for the whole variable.
+
+    The points of a GroupedOD group, named '<group>.pt<i>', have no core FAR
+    balance of their own: their FAR is entry i of the balance of the group,
+    whose path name is given as `grouped`.
+    """
+    names = dict((var, (pt + '.' + var, None)) for var in od_state_vars)
+    if grouped is not None:
+        index = int(pt[len(grouped + '.pt'):])
+        names['far_core_bal.FAR'] = (grouped + '.far_core_bal.FAR', index)
+    return names
+
+
+def get_point_states(prob, pt, grouped=None):
+    """
+    Current solver states of the off-design point `pt`, see point_state_names.
+    """
+    states = {}
+    for var, (name, index) in point_state_names(pt, grouped).items():
+        value = prob[name]
+        states[var] = value.copy() if index is None else value[index:index + 1].copy()
+    return states
+
+
+def set_point_states(prob, pt, states, grouped=None):
+    """
+    Set the solver states of the off-design point `pt`, see point_state_names.
+    """
+    for var, (name, index) in point_state_names(pt, grouped).items():
+        if index is None:
+            prob[name] = states[var]
+        else:
+            value = prob[name].copy()
+            value[index] = np.ravel(states[var])[0]
+            prob[name] = value
+
+
+def point_residual_norm(prob, pt, grouped=None):
+    """
+    Norm of the residuals of the off-design point `pt` alone, with its entry
+    of the core FAR balance of the group for the points of a GroupedOD group.
+    """
+    norm = residual_norm(get_subsystem(prob, pt))
+    if grouped is not None:
+        name, index = point_state_names(pt, grouped)['far_core_bal.FAR']
+        balance = get_subsystem(prob, grouped + '.far_core_bal')
+        resids = dict(balance.list_outputs(values=False, residuals=True, out_stream=None))
+        norm = np.sqrt(norm ** 2 + resids[name]['resids'][index] ** 2)
+    return norm
+
+
+def get_model_options(prob):
+    """
+    Options of the engine model that the off-design points depend on besides
+    the design inputs: the smooth switching options of every group of `prob`
+    that declares them, and the data of every performance map.
+
+    The values are gathered per class of system rather than per path name,
+    so that the points of problems that only differ in how they are laid out,
+    e.g. separate points or GroupedOD groups of any size, share their keys.
+    """
+    values = {}
+    for system in prob.model.system_iter(recurse=True):
+        for name in model_options:
+            if name in system.options:
+                values.setdefault('{}:{}'.format(type(system).__name__, name), set()).add(
+                    system.options[name])
+        if 'map_data' in system.options:
+            values.setdefault(type(system).__name__ + ':map_data', set()).add(
+                _map_data_hash(system.options['map_data']))
+    return dict((key, sorted(val)) for key, val in values.items())
+
+
+def get_design_inputs(prob, names=design_vars):
+    """
+    Current values of the design inputs, read from the promoted des_vars of
+    `prob`, together with the model options of `get_model_options`.
+    """
+    design_inputs = dict((name, float(prob[name])) for name in names)
+    design_inputs.update(get_model_options(prob))
+    return design_inputs
+
+
+class ODPointCache(object):
+    """
+    SQLite store of converged off-design points.
+
+    Points are keyed by a hash of the design inputs and model options, and a
+    hash of the point (MN, alt, hpc_control, fan_control, vabi_control).  For each point the
+    converged solver states (the usual initial guess variables) and the
+    requested outputs are stored.
+
+    Parameters
+    ----------
+    filename : str or None
+        Database file, OD_CACHE_FILE by default.
+    """
+
+    def __init__(self, filename=None):
+        if filename is None:
+            filename = OD_CACHE_FILE
+
+        dirname = os.path.dirname(filename)
+        if dirname:
+            makedirs(dirname)
+
+        self.filename = filename
+        self.hits = 0
+        self.near_misses = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(filename)
+        with self._conn:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS points ('
+                               'design_hash TEXT, point_hash TEXT, '
+                               'MN REAL, alt REAL, hpc_control REAL, fan_control REAL, vabi_control REAL, '
+                               'states TEXT, outputs TEXT, '
+                               'PRIMARY KEY (design_hash, point_hash))')
+
+    def _design_hash(self, design_inputs):
+        names = sorted(design_inputs)
+        return _hash(names + [design_inputs[name] for name in names])
+
+    def get(self, design_inputs, point):
+        """
+        Stored (states, outputs) of exactly this point, or None.
+        """
+        row = self._conn.execute('SELECT states, outputs FROM points '
+                                 'WHERE design_hash=? AND point_hash=?',
+                                 (self._design_hash(design_inputs), _hash(point))).fetchone()
+        if row is None:
+            return None
+        self.hits += 1
+        return json.loads(row[0]), json.loads(row[1])
+
+    def nearest(self, design_inputs, point, max_distance=1.):
+        """
+        Stored states of the closest point with the same design, or None if
+        there is none closer than `max_distance` (in units of `point_scales`).
+        """
+        rows = self._conn.execute('SELECT MN, alt, hpc_control, fan_control, vabi_control, states '
+                                  'FROM points WHERE design_hash=?',
+                                  (self._design_hash(design_inputs),)).fetchall()
+        if not rows:
+            return None
+
+        points = np.array([row[:5] for row in rows])
+        dist = np.linalg.norm((points - np.asarray(point, dtype=float)) / point_scales, axis=1)
+        i = np.argmin(dist)
+        if dist[i] >= max_distance:
+            return None
+        self.near_misses += 1
+        return json.loads(rows[i][5])
+
+    def put(self, design_inputs, point, states, outputs):
+        to_list = lambda d: dict((k, np.atleast_1d(v).tolist()) for k, v in d.items())
+        with self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO points VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                               (self._design_hash(design_inputs), _hash(point)) +
+                               tuple(float(v) for v in point) +
+                               (json.dumps(to_list(states)), json.dumps(to_list(outputs))))
+
+    def close(self):
+        self._conn.close()
+
+
+def _seed_states(cache, design_inputs, point, guess_point, max_distance):
+    """
+    States of the nearest cached point if it is closer to `point` than
+    `guess_point`, the point the current guesses were converged at, else None.
+    """
+    if guess_point is not None:
+        guess_distance = np.linalg.norm((np.asarray(point, dtype=float) -
+                                         np.asarray(guess_point, dtype=float)) / point_scales)
+        max_distance = min(max_distance, guess_distance)
+    states = cache.nearest(design_inputs, point, max_distance)
+    if states is None:
+        cache.misses += 1
+    return states
+
+
+def cached_run_model(prob, cache, design_inputs, point, state_vars, output_vars, max_distance=1.,
+                     residual_tol=1e-4, guess_point=None):
+    """
+    Run the model for one off-design point unless it is already in the cache.
+
+    On a hit the stored outputs are returned without solving, and the stored
+    states are written into `prob` so that the next point continues from them.
+    On a miss the solver starts from the current states of `prob`, typically
+    the converged previous point of a sweep, unless a cached point is closer
+    than the point they came from; its states are then used instead.  The
+    point is added to the cache if the model residuals are below
+    `residual_tol`, so that points that failed to converge are never reused.
+
+    Parameters
+    ----------
+    prob : Problem
+        Problem with the off-design point inputs already set to `point`.
+    cache : ODPointCache
+        Cache of converged points.
+    design_inputs : dict
+        Design input values, see `get_design_inputs`.
+    point : tuple
+        (MN, alt, hpc_control, fan_control, vabi_control).
+    state_vars : list of str
+        Solver states stored with the point and used as initial guesses.
+    output_vars : list of str
+        Outputs stored with the point.
+    max_distance : float
+        Largest distance of a cached point used to seed the solver.
+    residual_tol : float
+        Largest norm of the model residuals for the point to be cached.
+    guess_point : tuple or None
+        Point at which the current states of `prob` were converged, or None if
+        they are only rough guesses.
+
+    Returns
+    -------
+    dict
+        Value of each of the output_vars.
+    bool
+        True if the point came from the cache.
+    """
+    found = cache.get(design_inputs, point)
+    if found is not None:
+        states, outputs = found
+        for var in state_vars:
+            prob[var] = states[var]
+        return dict((var, np.array(outputs[var])) for var in output_vars), True
+
+    states = _seed_states(cache, design_inputs, point, guess_point, max_distance)
+    if states is not None:
+        for var in state_vars:
+            prob[var] = states[var]
+
+    prob.run_model()
+
+    states = dict((var, prob[var]) for var in state_vars)
+    outputs = dict((var, prob[var].copy()) for var in output_vars)
+    if residual_norm(prob.model) < residual_tol:
+        cache.put(design_inputs, point, states, outputs)
+
+    return outputs, False
+
+
+def seed_points(prob, cache, design_inputs, points, max_distance=1., guess_points=None,
+                grouped=None):
+    """
+    Set the initial guesses of several off-design points that are converged
+    together by one run_model, from the cached states of the same points or of
+    the nearest cached ones.  As in `cached_run_model`, the current guesses of
+    a point are kept unless the cached point is closer than the point they
+    were converged at.
+
+    Parameters
+    ----------
+    points : dict
+        (MN, alt, hpc_control, fan_control, vabi_control) of each point name.
+    guess_points : dict or None
+        Point at which the current guesses of each point name were converged;
+        names that are missing only have rough guesses.
+    grouped : str or None
+        Path name of the GroupedOD group the points belong to, if any.
+
+    Returns
+    -------
+    bool
+        True if every point was found in the cache.
+    """
+    if guess_points is None:
+        guess_points = {}
+
+    all_hits = True
+    for pt, point in points.items():
+        found = cache.get(design_inputs, point)
+        if found is not None:
+            states = found[0]
+        else:
+            all_hits = False
+            states = _seed_states(cache, design_inputs, point, guess_points.get(pt), max_distance)
+            if states is None:
+                continue
+        set_point_states(prob, pt, states, grouped)
+    return all_hits
+
+
+def cached_points(cache, design_inputs, points):
+    """
+    Stored outputs of several off-design points, if they are all in the
+    cache, so that the run_model that would converge them together can be
+    skipped.
+
+    Returns
+    -------
+    dict or None
+        Stored outputs of each point name, or None if any point is missing.
+    """
+    outputs = {}
+    for pt, point in points.items():
+        found = cache.get(design_inputs, point)
+        if found is None:
+            return None
+        outputs[pt] = dict((var, np.array(val)) for var, val in found[1].items())
+    return outputs
+
+
+def store_points(prob, cache, design_inputs, points, output_vars=(), residual_tol=1e-4,
+                 grouped=None):
+    """
+    Add several converged off-design points to the cache, see `seed_points`.
+    The residuals of every point are checked on their own, and the points
+    whose residuals are above `residual_tol` are skipped.
+
+    Returns
+    -------
+    list of str
+        Names of the points that were not converged.
+    """
+    failed = []
+    for pt, point in points.items():
+        if point_residual_norm(prob, pt, grouped) >= residual_tol:
+            failed.append(pt)
+            continue
+        states = get_point_states(prob, pt, grouped)
+        outputs = dict((var, prob[pt+'.'+var]) for var in output_vars)
+        cache.put(design_inputs, point, states, outputs)
+    return failed
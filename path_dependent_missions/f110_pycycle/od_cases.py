@@ -0,0 +1,15 @@
+# Off-design sweep of the F110, one row per altitude.  Each point is
+# (MN, alt, hpc_control, fan_control, vabi_control); within a row the points are
+# ordered so that each one starts from the converged solution of the previous one.
+OD_CASES = [
+    [(0.001, 0.0, 0.0, 0.0, 1.0),(.2, 0.0, 0.0, 0.0, 1.0)],
+    [(0.001, 1000., 0.0, 0.0, 1.0),(.2, 1000., 0.0, 0.0, 1.0)],
+    [(0.001, 5000., 0.0, 0.0, 1.0),(.2, 5000., 0.0, 0.0, 1.0)],
+    [(0.001, 10000., 0.0, 0.0, 1.0),(.2, 10000., 0.0, 0.0, 1.0)],
+    [(0.001, 15000., 0.0, 0.0, 1.0),(.2, 15000., 0.0, 0.0, 1.0)],
+    [(0.001, 17000., 0.0, 0.0, 1.0),(.2, 17000., 0.0, 0.0, 1.0)],
+    [(0.2, 20000., 0.0, 0.0, 1.0),(.4, 20000., 0.0, 0.0, 1.0),(.6, 20000, 0.0, 0.0, 1.0), (.8, 20000, 0.0, 0.0, 1.0)],
+    [(0.2, 25000., 0.0, 0.0, 1.0),(.4, 25000., 0.0, 0.0, 1.0),(.6, 25000., 0.0, 0.0, 1.0), (.8, 25000., 0.0, 0.0, 1.0),(1.0, 25000., 0.0, 0.0, 1.0), (1.2, 25000., 0.0, 0.0, 1.0), (.9, 25000, 0.0, 0.0, 1.0), (.7, 25000, 0.0, 0.0, 1.0), (.5, 25000, 0.0, 0.0, 1.0)],
+    [(.6, 30000, 0.0, 0.0, 1.0), (.8, 30000, 0.0, 0.0, 1.0),(1.0, 30000, 0.0, 0.0, 1.0), (1.2, 30000, 0.0, 0.0, 1.0), (1.4, 30000, 0.0, 0.0, 1.0), (1.6, 30000, 0.0, 0.0, 1.0), (1.3, 30000, 0.0, 0.0, 1.0), (1.1, 30000, 0.0, 0.0, 1.0), (.9, 30000, 0.0, 0.0, 1.0), (.7, 30000, 0.0, 0.0, 1.0), (.5, 30000, 0.0, 0.0, 1.0)],
+    [(.6, 40000, 0.0, 0.0, 1.0), (.8, 40000, 0.0, 0.0, 1.0),(1.0, 40000, 0.0, 0.0, 1.0), (1.2, 40000, 0.0, 0.0, 1.0), (1.4, 40000, 0.0, 0.0, 1.0), (1.6, 40000, 0.0, 0.0, 1.0), (1.3, 40000, 0.0, 0.0, 1.0), (1.1, 40000, 0.0, 0.0, 1.0), (.9, 40000, 0.0, 0.0, 1.0), (.7, 40000, 0.0, 0.0, 1.0)],
+]
@@ -0,0 +1,179 @@
+from __future__ import print_function, division, absolute_import
+
+from openmdao.api import Problem, IndepVarComp
+
+from path_dependent_missions.f110_pycycle.mixedflow_turbofan import MixedFlowTurbofan, connect_des_data
+from path_dependent_missions.f110_pycycle.grouped_od import GroupedOD, point_names, set_od_guesses
+
+
+# Default values of the design inputs, as in mixedflow_turbofan.py
+default_design = {
+    'alt': 0.,
+    'MN': 0.001,
+    'T4max': 3200.,
+    'T4maxab': 3400.,
+    'Fn_des': 17000.,
+    'Mix_ER': 1.05,
+    'fan:PRdes': 3.3,
+    'hpc:PRdes': 9.3,
+}
+
+guess_vars = ['OD.far_core_bal.FAR', 'OD.balance.FAR_ab', 'OD.balance.BPR', 'OD.balance.W',
+              'OD.balance.HP_Nmech', 'OD.balance.LP_Nmech', 'OD.fc.balance.Pt', 'OD.fc.balance.Tt',
+              'OD.mixer.balance.P_tot', 'OD.hpt.PR', 'OD.lpt.PR', 'OD.fan.map.RlineMap',
+              'OD.hpc.map.RlineMap']
+
+
+def _add_design(prob):
+    des_vars = prob.model.add_subsystem('des_vars', IndepVarComp(), promotes=["*"])
+
+    des_vars.add_output('alt', 0., units='ft')
+    des_vars.add_output('MN', 0.001)
+    des_vars.add_output('T4max', 3200, units='degR')
+    des_vars.add_output('T4maxab', 3400, units='degR')
+    des_vars.add_output('Fn_des', 17000., units='lbf')
+    des_vars.add_output('Mix_ER', 1.05, units=None)
+    des_vars.add_output('fan:PRdes', 3.3)
+    des_vars.add_output('hpc:PRdes', 9.3)
+
+    prob.model.add_subsystem('DESIGN', MixedFlowTurbofan(design=True))
+
+    prob.model.connect('alt', 'DESIGN.fc.alt')
+    prob.model.connect('MN', 'DESIGN.fc.MN')
+    prob.model.connect('Fn_des', 'DESIGN.balance.rhs:W')
+    prob.model.connect('T4max', 'DESIGN.balance.rhs:FAR_core')
+    prob.model.connect('T4maxab', 'DESIGN.balance.rhs:FAR_ab')
+    prob.model.connect('Mix_ER', 'DESIGN.balance.rhs:BPR')
+    prob.model.connect('fan:PRdes', 'DESIGN.fan.map.PRdes')
+    prob.model.connect('hpc:PRdes', 'DESIGN.hpc.map.PRdes')
+
+    return des_vars
+
+
+def _set_design(prob, design):
+    design_inputs = dict(default_design)
+    if design is not None:
+        design_inputs.update(design)
+
+    for name, val in design_inputs.items():
+        prob[name] = val
+
+    prob['DESIGN.balance.FAR_core'] = 0.025
+    prob['DESIGN.balance.FAR_ab'] = 0.025
+    prob['DESIGN.balance.BPR'] = 0.85
+    prob['DESIGN.balance.W'] = 150.
+    prob['DESIGN.balance.lpt_PR'] = 3.5
+    prob['DESIGN.balance.hpt_PR'] = 2.5
+    prob['DESIGN.fc.balance.Pt'] = 14.
+    prob['DESIGN.fc.balance.Tt'] = 500.0
+    prob['DESIGN.mixer.balance.P_tot'] = 72.
+
+    return design_inputs
+
+
+def build_od_problem(design=None, smooth=False, rho=50., balance_rho=2000.):
+    """
+    DESIGN point plus a single off-design point 'OD', as in loop_od_points.py.
+
+    The off-design point is set through the 'OD:MN', 'OD:alt', 'OD:hpc_control',
+    'OD:fan_control' and 'OD:vabi_control' inputs, and its requested core
+    temperature through 'OD:T4', which starts at T4max.
+
+    Parameters
+    ----------
+    design : dict or None
+        Values of the design inputs that differ from `default_design`.
+    smooth : bool
+        Smooth switching in the inlet recovery and the core FAR balance.
+    rho : float
+        Sharpness of the smooth switching of the inlet recovery.
+    balance_rho : float
+        Sharpness of the smooth switching of the core FAR balance.
+    """
+    prob = Problem()
+
+    des_vars = _add_design(prob)
+
+    des_vars.add_output('OD:MN', 0.001)
+    des_vars.add_output('OD:alt', 0., units='ft')
+    des_vars.add_output('OD:T4', 3200, units='degR')
+    des_vars.add_output('OD:vabi_control', val=1)
+    des_vars.add_output('OD:hpc_control', val=0)
+    des_vars.add_output('OD:fan_control', val=0)
+
+    prob.model.add_subsystem('OD', MixedFlowTurbofan(design=False, smooth=smooth, rho=rho,
+                                                       balance_rho=balance_rho))
+    connect_des_data(prob, 'DESIGN', 'OD')
+
+    prob.model.connect('OD:alt', 'OD.fc.alt')
+    prob.model.connect('OD:MN', 'OD.fc.MN')
+    prob.model.connect('OD:vabi_control', 'OD.vabi.fact')
+    prob.model.connect('OD:hpc_control', 'OD.hpc.map.alphaMap')
+    prob.model.connect('OD:fan_control', 'OD.fan.map.alphaMap')
+    prob.model.connect('OD:T4', 'OD.far_core_bal.T_requested')
+    prob.model.connect('T4maxab', 'OD.balance.rhs:FAR_ab')
+
+    prob.setup(check=False)
+
+    design_inputs = _set_design(prob, design)
+    prob['OD:T4'] = design_inputs['T4max']
+
+    prob['OD.far_core_bal.FAR'] = 0.028
+    prob['OD.balance.FAR_ab'] = 0.034
+    prob['OD.balance.BPR'] = .9
+    prob['OD.balance.W'] = 157.225
+    prob['OD.balance.HP_Nmech'] = 1.
+    prob['OD.balance.LP_Nmech'] = 1.
+    prob['OD.fc.balance.Pt'] = 14.696
+    prob['OD.fc.balance.Tt'] = 518.67
+    prob['OD.mixer.balance.P_tot'] = 72.
+    prob['OD.hpt.PR'] = 3.439
+    prob['OD.lpt.PR'] = 2.438
+    prob['OD.fan.map.RlineMap'] = 2.0
+    prob['OD.hpc.map.RlineMap'] = 2.0
+
+    prob.set_solver_print(level=-1)
+
+    return prob
+
+
+def build_grouped_od_problem(num_points, design=None, smooth=False, rho=50., balance_rho=2000.):
+    """
+    DESIGN point plus a GroupedOD group 'OD' of `num_points` off-design points,
+    'OD.pt0' to 'OD.pt<num_points - 1>'.
+
+    The points are set through the conditions of the group, e.g.
+    prob['OD.conditions.MN'], whose requested core temperatures T4max and
+    augmentor temperatures T4maxab start at the design values.
+
+    Parameters
+    ----------
+    num_points : int
+        Number of off-design points.
+    design : dict or None
+        Values of the design inputs that differ from `default_design`.
+    smooth : bool
+        Smooth switching in the inlet recovery and the core FAR balance.
+    rho : float
+        Sharpness of the smooth switching of the inlet recovery.
+    balance_rho : float
+        Sharpness of the smooth switching of the core FAR balance.
+    """
+    prob = Problem()
+
+    _add_design(prob)
+
+    prob.model.add_subsystem('OD', GroupedOD(num_points=num_points, smooth=smooth, rho=rho,
+                                                balance_rho=balance_rho))
+    connect_des_data(prob, 'DESIGN', ['OD.' + pt for pt in point_names(num_points)])
+
+    prob.setup(check=False)
+
+    design_inputs = _set_design(prob, design)
+    prob['OD.conditions.T4max'] = design_inputs['T4max']
+    prob['OD.conditions.T4maxab'] = design_inputs['T4maxab']
+    set_od_guesses(prob, 'OD', num_points)
+
+    prob.set_solver_print(level=-1)
+
+    return prob
@@ -0,0 +1,115 @@
+"""
+Count the Newton iterations and failures of the off-design F110 point over the
+OD_CASES sweep, with the hard switching of the inlet recovery and core FAR
+balance and with the smooth variants, and report how far the thrust and the
+core temperature of the smooth variants are from the hard switching.  Run with
+
+    python -m path_dependent_missions.f110_pycycle.switching_benchmark [balance_rho ...]
+
+The inlet recovery is smoothed with its default rho in every smooth run.
+"""
+from __future__ import print_function, division, absolute_import
+import sys
+import time
+
+import numpy as np
+
+from openmdao.api import AnalysisError
+
+from path_dependent_missions.f110_pycycle.od_cases import OD_CASES
+from path_dependent_missions.f110_pycycle.od_problem import build_od_problem, guess_vars
+
+
+def run_sweep(prob, cases=OD_CASES):
+    """
+    Run the OD_CASES sweep the same way loop_od_points.py does, continuing from
+    the previous point within a row and resetting the guesses between rows.
+
+    Returns
+    -------
+    dict
+        Newton iterations, convergence flag, wall time, net thrust (lbf) and
+        core temperature (degR) of every point.
+    """
+    newton = prob.model.OD.nonlinear_solver
+    maxiter = newton.options['maxiter']
+
+    results = {'iterations': [], 'converged': [], 'time': [], 'Fn': [], 'T4': []}
+
+    for i, row in enumerate(cases):
+        for j, (MN, alt, hpc_control, fan_control, vabi_control) in enumerate(row):
+            prob['OD:MN'] = MN
+            prob['OD:alt'] = alt
+            prob['OD:hpc_control'] = hpc_control
+            prob['OD:fan_control'] = fan_control
+            prob['OD:vabi_control'] = vabi_control
+
+            st = time.time()
+            try:
+                prob.run_model()
+                converged = newton._iter_count < maxiter
+            except AnalysisError:
+                converged = False
+            results['time'].append(time.time() - st)
+            results['iterations'].append(newton._iter_count)
+            results['converged'].append(converged)
+            results['Fn'].append(prob['OD.perf.Fn'][0])
+            results['T4'].append(prob['OD.burner.Fl_O:tot:T'][0])
+
+            if i == 0:
+                guesses = {var: prob[var].copy() for var in guess_vars}
+
+        for var in guess_vars:
+            prob[var] = guesses[var]
+        prob['OD.balance.W'] = guesses['OD.balance.W']*.75
+
+    return results
+
+
+def summarize(results, reference=None):
+    """
+    Totals of a sweep, with the largest deviations of Fn and T4 from the
+    `reference` sweep, over the points converged in both.
+    """
+    iterations = np.array(results['iterations'])
+    converged = np.array(results['converged'])
+
+    dFn = dT4 = np.nan
+    if reference is not None:
+        both = converged & np.array(reference['converged'])
+        if np.any(both):
+            dFn = np.max(np.abs(np.array(results['Fn']) - reference['Fn'])[both])
+            dT4 = np.max(np.abs(np.array(results['T4']) - reference['T4'])[both])
+
+    return {
+        'points': iterations.size,
+        'failures': int(np.sum(~converged)),
+        'total_iterations': int(np.sum(iterations)),
+        'mean_iterations': float(np.mean(iterations[converged])) if np.any(converged) else np.nan,
+        'max_iterations': int(np.max(iterations)),
+        'time': float(np.sum(results['time'])),
+        'max_dFn': float(dFn),
+        'max_dT4': float(dT4),
+    }
+
+
+if __name__ == "__main__":
+    balance_rhos = [float(arg) for arg in sys.argv[1:]] or [2000.]
+
+    runs = [('hard', build_od_problem(smooth=False))]
+    runs += [('smooth rho={:g}'.format(rho), build_od_problem(smooth=True, balance_rho=rho))
+             for rho in balance_rhos]
+
+    print('{:18s} {:>7s} {:>9s} {:>11s} {:>10s} {:>9s} {:>9s} {:>11s} {:>11s}'.format(
+        'switching', 'points', 'failures', 'iterations', 'mean iter', 'max iter', 'time (s)',
+        'dFn (lbf)', 'dT4 (degR)'))
+    reference = None
+    for label, prob in runs:
+        results = run_sweep(prob)
+        if reference is None:
+            reference = results
+        summary = summarize(results, reference)
+        print('{:18s} {:7d} {:9d} {:11d} {:10.2f} {:9d} {:9.2f} {:11.2f} {:11.2f}'.format(
+            label, summary['points'], summary['failures'], summary['total_iterations'],
+            summary['mean_iterations'], summary['max_iterations'], summary['time'],
+            summary['max_dFn'], summary['max_dT4']))
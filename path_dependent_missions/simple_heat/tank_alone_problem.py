@@ -7,10 +7,11 @@ from dymos import Phase
 
 from path_dependent_missions.simple_heat.tank_alone_ode import TankAloneODE
 from path_dependent_missions.simple_heat.heat_plot_utils import plot_results
+from path_dependent_missions.utils.checkpoint import use_checkpoints, resume_from_checkpoint
 import numpy as np
 
 
-def setup_energy_opt(num_seg, order, Q_env=0., Q_sink=0., Q_out=0., m_flow=0.1, m_burn=0., opt_m_flow=False, opt_m_burn=False):
+def setup_energy_opt(num_seg, order, Q_env=0., Q_sink=0., Q_out=0., m_flow=0.1, m_burn=0., opt_m_flow=False, opt_m_burn=False, checkpoint=None, resume=False):
     """
     Helper function to set up and return a problem instance for an energy minimization
     of a simple thermal system.
@@ -21,6 +22,11 @@ def setup_energy_opt(num_seg, order, Q_env=0., Q_sink=0., Q_out=0., m_flow=0.1,
         The number of ODE segments to use when discretizing the problem.
     order : int
         The order for the polynomial interpolation for the collocation methods.
+    checkpoint : str or None
+        Name under which the optimization is checkpointed, see
+        utils/checkpoint.py.
+    resume : bool
+        Start from the last checkpoint of `checkpoint` instead of the initial guess.
     """
 
     # Instantiate the problem and set the optimizer
@@ -87,6 +93,14 @@ def setup_energy_opt(num_seg, order, Q_env=0., Q_sink=0., Q_out=0., m_flow=0.1,
 
     p.set_solver_print(level=-1)
 
+    if checkpoint is not None:
+        options = {'Q_env': Q_env, 'Q_sink': Q_sink, 'Q_out': Q_out, 'm_flow': m_flow,
+                   'm_burn': m_burn}
+        if resume:
+            resume_from_checkpoint(p, checkpoint, options=options)
+        else:
+            use_checkpoints(p, checkpoint, options=options)
+
     return p
 
 if __name__ == '__main__':
@@ -1,6 +1,4 @@
 from __future__ import print_function, division, absolute_import
-import matplotlib
-# matplotlib.use('agg')
 import numpy as np
 
 from openmdao.api import Problem, Group, pyOptSparseDriver, DirectSolver
@@ -8,9 +6,46 @@ from dymos import Phase
 
 from path_dependent_missions.thermal_mission.thermal_mission_ode import ThermalMissionODE
 from path_dependent_missions.utils.gen_mission_plot import save_results, plot_results
-
-
-def thermal_mission_problem(num_seg=5, transcription_order=3, meeting_altitude=20000., Q_env=0., Q_sink=0., Q_out=0., m_recirculated=0., opt_m_recirculated=False, opt_m_burn=False, opt_throttle=True, engine_heat_coeff=0., pump_heat_coeff=0., T=None, T_o=None, opt_m=False, m_initial=20.e3, transcription='gauss-lobatto'):
+from path_dependent_missions.utils.coloring_cache import use_coloring_cache
+from path_dependent_missions.utils.fast_setup import fast_setup
+from path_dependent_missions.utils.deriv_mode import select_deriv_mode
+from path_dependent_missions.utils.memoize import use_memoization
+from path_dependent_missions.utils.autoscale import autoscale
+from path_dependent_missions.utils.bspline_control import add_bspline_control, \
+    has_bspline_control, set_bspline_guess
+from path_dependent_missions.utils.checkpoint import use_checkpoints, resume_from_checkpoint
+from path_dependent_missions.utils.problem_factory import ProblemFactory, set_constraint_bounds
+from path_dependent_missions.utils.ks_constraint import add_ks_path_constraint, \
+    deactivate_path_constraints, set_path_constraint_bounds, use_exact_polish
+
+
+def thermal_mission_problem(num_seg=5, transcription_order=3, meeting_altitude=20000., Q_env=0., Q_sink=0., Q_out=0., m_recirculated=0., opt_m_recirculated=False, opt_m_burn=False, opt_throttle=True, engine_heat_coeff=0., pump_heat_coeff=0., T=None, T_o=None, opt_m=False, m_initial=20.e3, transcription='gauss-lobatto', coloring_cache=True, deriv_mode='fwd', memoize=False, checkpoint=None, resume=False, aggregate=None, ks_rho=50., auto_scaling=False,
+                            bspline_controls=None):
+    """
+    With `aggregate` set to 'phase' or 'segment', each bound of the path
+    constraints is aggregated by a KS function over the phase or over each
+    segment, with aggregation parameter `ks_rho`, instead of being constrained
+    at every node.  The aggregates may let the path constraints be violated
+    by up to ref * log(n) / ks_rho, so a run whose solution violates them
+    continues with the exact per-node constraints (see utils/ks_constraint.py).
+
+    With `auto_scaling`, the hand-tuned scaling of the variables and
+    constraints is replaced by one computed at the initial guess (see
+    utils/autoscale.py).
+
+    With `bspline_controls` set to a number of coefficients, alpha and the
+    throttle are cubic B-splines over the phase instead of Dymos controls
+    (see utils/bspline_control.py).
+
+    `deriv_mode` is the mode given to setup, or 'benchmark' to pick the mode
+    with the fewest colored solves (see utils/deriv_mode.py).
+
+    With `memoize`, the driver reuses the function and gradient evaluations
+    at design points it already evaluated, and reports the hit rates of each
+    run (see utils/memoize.py).
+    """
+    if aggregate not in (None, 'phase', 'segment'):
+        raise ValueError("aggregate must be None, 'phase' or 'segment', got '{}'".format(aggregate))
 
     p = Problem(model=Group())
 
@@ -50,12 +85,19 @@ def thermal_mission_problem(num_seg=5, transcription_order=3, meeting_altitude=2
     phase.set_state_options('m', fix_initial=not opt_m, lower=15.e3, upper=80e3,
                             scaler=1.0E-3, defect_scaler=1.0E-3, units='kg')
 
-    phase.add_control('alpha', units='deg', lower=-8.0, upper=8.0, scaler=1.0,
-                      rate_continuity=True)
+    if bspline_controls is None:
+        phase.add_control('alpha', units='deg', lower=-8.0, upper=8.0, scaler=1.0,
+                          rate_continuity=True)
+    else:
+        add_bspline_control(p.model, 'phase', phase, 'alpha', bspline_controls, units='deg',
+                            lower=-8.0, upper=8.0)
 
     phase.add_design_parameter('S', val=1., units='m**2', opt=False)
 
-    if opt_throttle:
+    if opt_throttle and bspline_controls is not None:
+        add_bspline_control(p.model, 'phase', phase, 'throttle', bspline_controls, val=1.0,
+                            lower=0.0, upper=1.0)
+    elif opt_throttle:
         phase.add_control('throttle', val=1.0, lower=0.0, upper=1.0, opt=True, rate_continuity=True)
     else:
         phase.add_design_parameter('throttle', val=1.0, opt=False)
@@ -66,8 +108,9 @@ def thermal_mission_problem(num_seg=5, transcription_order=3, meeting_altitude=2
     phase.add_boundary_constraint('aero.mach', loc='final', equals=1., units=None)
     phase.add_boundary_constraint('gam', loc='final', equals=0.0, units='rad')
 
-    phase.add_path_constraint(name='h', lower=100.0, upper=20000, ref=20000)
-    phase.add_path_constraint(name='aero.mach', lower=0.1, upper=1.8)
+    # name, lower, upper, units, ref of each path constraint
+    path_constraints = [('h', 100.0, 20000., 'm', 20000.),
+                        ('aero.mach', 0.1, 1.8, None, 1.)]
     # phase.add_path_constraint(name='time', upper=110.)
 
     # Minimize time at the end of the phase
@@ -93,17 +136,93 @@ def thermal_mission_problem(num_seg=5, transcription_order=3, meeting_altitude=2
     # sure that the amount recirculated is at least 0, otherwise we'd burn
     # more fuel than we pumped.
     if opt_m_recirculated:
-        phase.add_path_constraint('m_flow', lower=0., upper=50., units='kg/s', ref=10.)
+        path_constraints.append(('m_flow', 0., 50., 'kg/s', 10.))
 
     if T is not None:
-        phase.add_path_constraint('T', upper=T, units='K')
+        path_constraints.append(('T', None, T, 'K', 1.))
 
     if T_o is not None:
-        phase.add_path_constraint('T_o', upper=T_o, units='K', ref=300.)
+        path_constraints.append(('T_o', None, T_o, 'K', 300.))
+
+    for name, lower, upper, units, ref in path_constraints:
+        phase.add_path_constraint(name, lower=lower, upper=upper, units=units, ref=ref)
+        if aggregate is not None:
+            add_ks_path_constraint(p.model, 'phase', phase, name, lower=lower, upper=upper,
+                                   units=units, ref=ref, segmented=aggregate == 'segment',
+                                   rho=ks_rho)
 
     # phase.add_path_constraint('m_flow', lower=0., upper=20., units='kg/s', ref=10.)
 
-    p.setup(mode='fwd', check=True)
+    if deriv_mode == 'benchmark':
+        deriv_mode = select_deriv_mode(p)
+
+    fast_setup(p, mode=deriv_mode)
+
+    if aggregate is not None:
+        deactivate_path_constraints(p, 'phase', [con[0] for con in path_constraints])
+
+    configure_thermal_mission(p, meeting_altitude=meeting_altitude, Q_env=Q_env, Q_sink=Q_sink,
+                              Q_out=Q_out, m_recirculated=m_recirculated,
+                              opt_m_recirculated=opt_m_recirculated, T=T, T_o=T_o, m_initial=m_initial,
+                              checkpoint=checkpoint, resume=resume, auto_scaling=auto_scaling)
+
+    if coloring_cache:
+        use_coloring_cache(p)
+
+    if memoize:
+        use_memoization(p)
+
+    if aggregate is not None:
+        use_exact_polish(p)
+
+    return p
+
+
+def configure_thermal_mission(p, guesses=True, meeting_altitude=20000., Q_env=0., Q_sink=0., Q_out=0.,
+                              m_recirculated=0., opt_m_recirculated=False, T=None, T_o=None,
+                              m_initial=20.e3, checkpoint=None, resume=False, auto_scaling=False,
+                              **kwargs):
+    """
+    Set the values of the thermal loads and constraint bounds of a problem
+    built by thermal_mission_problem and, if `guesses` is True, its initial
+    guesses.  Options that change the structure of the problem are ignored.
+
+    With a `checkpoint` name, the optimization is checkpointed and hot-started
+    from the previous run of the same name, or resumed from its last
+    checkpoint if `resume` is True (see utils/checkpoint.py).  With
+    `auto_scaling`, the problem is scaled at the initial guesses, before they
+    are replaced by a resumed checkpoint, so that a resumed run is scaled like
+    the run it continues.
+    """
+    phase = p.model.phase
+
+    # the checkpoints of one set of values are not reused by another
+    checkpoint_options = {'meeting_altitude': meeting_altitude, 'Q_env': Q_env, 'Q_sink': Q_sink,
+                          'Q_out': Q_out, 'm_recirculated': m_recirculated, 'T': T, 'T_o': T_o,
+                          'm_initial': m_initial, 'auto_scaling': auto_scaling}
+
+    p['phase.design_parameters:Q_env'] = Q_env
+    p['phase.design_parameters:Q_sink'] = Q_sink
+    p['phase.design_parameters:Q_out'] = Q_out
+
+    set_constraint_bounds(p, 'final_value:h', equals=meeting_altitude)
+    if T is not None:
+        set_path_constraint_bounds(p, 'phase', 'T', upper=T)
+    if T_o is not None:
+        set_path_constraint_bounds(p, 'phase', 'T_o', upper=T_o)
+
+    if not opt_m_recirculated:
+        p['phase.controls:m_recirculated'] = m_recirculated
+
+    if checkpoint is not None and not resume:
+        use_checkpoints(p, checkpoint, options=checkpoint_options)
+
+    if not guesses:
+        # keep the previous solution, but the initial mass is fixed by the options
+        m = p['phase.states:m'].copy()
+        m[0] = m_initial
+        p['phase.states:m'] = m
+        return
 
     p['phase.t_initial'] = 0.0
     p['phase.t_duration'] = 200.
@@ -115,12 +234,43 @@ def thermal_mission_problem(num_seg=5, transcription_order=3, meeting_altitude=2
     # p['phase.states:v'][:] = 200.
     p['phase.states:gam'] = phase.interpolate(ys=[0.0, 0.0], nodes='state_input')
     p['phase.states:m'] = phase.interpolate(ys=[m_initial, 12.e3], nodes='state_input')
-    p['phase.controls:alpha'] = phase.interpolate(ys=[1., 1.], nodes='control_input')
+    if has_bspline_control(p, 'phase', 'alpha'):
+        set_bspline_guess(p, 'phase', 'alpha', ys=[1., 1.])
+    else:
+        p['phase.controls:alpha'] = phase.interpolate(ys=[1., 1.], nodes='control_input')
+    if opt_m_recirculated:
+        p['phase.controls:m_recirculated'] = m_recirculated
 
     # Give initial values for the phase states, controls, and time
     p['phase.states:T'] = 310.
 
-    return p
+    if auto_scaling:
+        autoscale(p)
+
+    if checkpoint is not None and resume:
+        resume_from_checkpoint(p, checkpoint, options=checkpoint_options)
+
+
+def thermal_mission_factory(**defaults):
+    """
+    ProblemFactory for thermal_mission_problem.  The thermal loads, the initial
+    mass, the meeting altitude, the initial recirculated flow and the
+    temperature bounds are changed in place by `reconfigure`; any other option
+    builds and sets up a new problem.
+
+    Examples
+    --------
+    factory = thermal_mission_factory(num_seg=25, T=312.)
+    for Q_env in [100.e3, 300.e3, 500.e3]:
+        p = factory.reconfigure(Q_env=Q_env)
+        p.run_driver()
+    """
+    value_options = ['meeting_altitude', 'Q_env', 'Q_sink', 'Q_out', 'm_recirculated', 'T', 'T_o',
+                     'm_initial', 'checkpoint', 'resume']
+    return ProblemFactory(thermal_mission_problem, configure_thermal_mission, value_options,
+                          structure_key=lambda options: (options.get('T') is None,
+                                                         options.get('T_o') is None),
+                          defaults=defaults)
 
 
 if __name__ == '__main__':
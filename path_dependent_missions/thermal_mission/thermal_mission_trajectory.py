@@ -1,6 +1,4 @@
 from __future__ import print_function, division, absolute_import
-import matplotlib
-# matplotlib.use('agg')
 import numpy as np
 
 from openmdao.api import Problem, Group, pyOptSparseDriver, DirectSolver
@@ -8,6 +6,10 @@ from dymos import Phase, Trajectory
 
 from path_dependent_missions.thermal_mission.thermal_mission_ode import ThermalMissionODE
 from path_dependent_missions.utils.traj_plot import save_results, plot_results
+from path_dependent_missions.utils.coloring_cache import use_coloring_cache
+from path_dependent_missions.utils.fast_setup import fast_setup
+from path_dependent_missions.utils.deriv_mode import select_deriv_mode
+from path_dependent_missions.utils.autoscale import autoscale
 
 
 def thermal_mission_trajectory(num_seg=5,
@@ -26,7 +28,8 @@ def thermal_mission_trajectory(num_seg=5,
                                T_o=None,
                                opt_m=False,
                                m_initial=20.e3,
-                               transcription='gauss-lobatto'):
+                               transcription='gauss-lobatto',
+                               coloring_cache=True, deriv_mode='fwd', auto_scaling=False):
 
     p = Problem(model=Group())
 
@@ -179,7 +182,10 @@ def thermal_mission_trajectory(num_seg=5,
     # Link Phases (link time and all state variables)
     traj.link_phases(phases=['ascent', 'cruise'], vars=['*'])
 
-    p.setup(mode='fwd', check=True)
+    if deriv_mode == 'benchmark':
+        deriv_mode = select_deriv_mode(p)
+
+    fast_setup(p, mode=deriv_mode)
 
     p['traj.ascent.t_initial'] = 0.0
     p['traj.ascent.t_duration'] = 200.
@@ -212,6 +218,12 @@ def thermal_mission_trajectory(num_seg=5,
     # Give initial values for the cruise states, controls, and time
     p['traj.cruise.states:T'] = 310.
 
+    if auto_scaling:
+        autoscale(p)
+
+    if coloring_cache:
+        use_coloring_cache(p)
+
     return p
 
 
@@ -0,0 +1,153 @@
+"""
+Scaling of the design variables and constraints of a problem from the
+magnitudes of its initial guess.
+
+The problem builders set `scaler`, `ref`, `defect_scaler` and `duration_ref`
+of every state by hand, and the values differ between the missions.  autoscale
+replaces them after setup:
+
+- each design variable is scaled by the largest magnitude of its initial
+  values, or of its finite bounds if the initial values are all zero, so the
+  scaled design vector is of order one;
+- each constraint, including the collocation defects, is scaled by the
+  largest row of its jacobian with respect to the scaled design variables,
+  so that a unit step in the scaled design vector moves every scaled
+  constraint by at most one.
+
+The scalings only depend on the model at the initial guess, not on the
+scalings already set, so applying them again gives the same result.
+"""
+from __future__ import print_function, division, absolute_import
+import sys
+
+import numpy as np
+
+
+# Bounds beyond this are the infinite defaults of add_design_var and add_constraint
+_unbounded = 1e30
+
+
+def _unscale(val, meta):
+    scaler = 1. if meta['scaler'] is None else meta['scaler']
+    adder = 0. if meta['adder'] is None else meta['adder']
+    return np.asarray(val) / scaler - adder
+
+
+def _set_scaler(meta, scaler):
+    """
+    Replace the scaler of design variable or response metadata, and remove
+    its adder.  The bounds are stored scaled, so they are scaled again.
+    """
+    for key in ['lower', 'upper', 'equals']:
+        val = meta.get(key)
+        if val is None:
+            continue
+        unscaled = _unscale(val, meta)
+        infinite = np.abs(unscaled) >= _unbounded
+        scaled = np.where(infinite, np.sign(unscaled) * sys.float_info.max, unscaled * scaler)
+        meta[key] = float(scaled) if np.ndim(val) == 0 else scaled
+
+    meta['scaler'] = scaler
+    meta['adder'] = None
+    meta['ref'] = 1. / scaler
+    meta['ref0'] = None
+
+
+def _magnitude(x, meta, floor):
+    ref = np.max(np.abs(x)) if np.size(x) else 0.
+    if ref < floor:
+        # zero initial guess, e.g. a flight path angle; use the bounds instead
+        bounds = [np.max(np.abs(_unscale(meta[key], meta))) for key in ['lower', 'upper']
+                  if meta.get(key) is not None]
+        bounds = [bound for bound in bounds if floor <= bound < _unbounded]
+        ref = max(bounds) if bounds else 1.
+    return ref
+
+
+def autoscale(p, design_vars=True, constraints=True, objective=False, floor=1e-8,
+              limits=(1e-8, 1e8)):
+    """
+    Set the scaling of the design variables and constraints of a problem from
+    its model and total jacobian at the current values, which should be the
+    initial guess.  It must be called after the initial guesses are set and
+    before run_driver.
+
+    Parameters
+    ----------
+    p : OpenMDAO Problem instance
+        Problem after setup.
+    design_vars : bool
+        Scale the design variables by their magnitudes.
+    constraints : bool
+        Scale the constraints, including the collocation defects, by their
+        largest jacobian row.
+    objective : bool
+        Also scale the objective by its gradient.
+    floor : float
+        Magnitudes below this are treated as zero.
+    limits : tuple of float
+        Smallest and largest scalers.
+
+    Returns
+    -------
+    dict
+        The old and new scaler of each scaled variable, keyed by name.
+    """
+    from openmdao.core.total_jac import _TotalJacInfo
+
+    p.final_setup()
+    p.run_model()
+    driver = p.driver
+
+    scalers = {}
+
+    # design variables, from their values
+    dv_scalers = {}
+    values = driver.get_design_var_values(unscaled=True)
+    for name, meta in driver._designvars.items():
+        if design_vars:
+            scaler = np.clip(1. / _magnitude(values[name], meta, floor), *limits)
+        else:
+            scaler = 1. if meta['scaler'] is None else meta['scaler']
+        dv_scalers[name] = scaler
+
+    # responses, from their jacobian with respect to the scaled design variables
+    of = []
+    if constraints:
+        of.extend(driver._cons)
+    if objective:
+        of.extend(driver._objs)
+    resp_scalers = {}
+    if of:
+        wrt = list(driver._designvars)
+        J = _TotalJacInfo(p, of, wrt, True, 'dict', driver_scaling=False).compute_totals()
+        for name in of:
+            row_max = np.zeros(driver._responses[name]['size'])
+            for dv in wrt:
+                J_sub = np.abs(np.atleast_2d(J[name][dv])) / dv_scalers[dv]
+                row_max = np.maximum(row_max, np.max(J_sub, axis=1))
+            ref = np.max(row_max)
+            resp_scalers[name] = np.clip(1. / ref, *limits) if ref >= floor else 1.
+
+    for name, scaler in dv_scalers.items():
+        meta = driver._designvars[name]
+        if design_vars:
+            scalers[name] = (meta['scaler'], scaler)
+            _set_scaler(meta, scaler)
+    for name, scaler in resp_scalers.items():
+        meta = driver._responses[name]
+        scalers[name] = (meta['scaler'], scaler)
+        _set_scaler(meta, scaler)
+
+    # the metadata dicts are shared with the systems, so the next final_setup
+    # keeps them; the total jacobian and its scaling are set up again
+    driver._has_scaling = True
+    driver._total_jac = None
+
+    print('Automatic scaling at the initial guess:')
+    print('{:<60} {:>12} {:>12}'.format('variable', 'old scaler', 'new scaler'))
+    for name in sorted(scalers):
+        old, new = scalers[name]
+        print('{:<60} {:>12.4g} {:>12.4g}'.format(name, 1. if old is None else float(np.max(old)), new))
+
+    return scalers
@@ -0,0 +1,188 @@
+"""
+B-spline parameterization of the controls of a phase.
+
+A Dymos control has one design variable per control node, and with
+rate_continuity one constraint per segment boundary, so a 25 segment mission
+carries hundreds of each for alpha and throttle.  Here a control is instead a
+clamped B-spline in the normalized time of the phase with a few coefficients,
+which are the design variables.  BSplineControlComp evaluates it at the
+nodes, with a constant sparse jacobian, and its values are connected to the
+ODE targets of the control directly, so the control is not added to the phase
+and needs no continuity constraints.  A cubic B-spline is twice continuously
+differentiable, and lies between its smallest and largest coefficients, so
+bounds on the coefficients bound the control everywhere.
+
+Since the control is not a control of the phase, phase.simulate does not see
+it; use get_bspline_values for the values at the nodes.
+"""
+from __future__ import print_function, division, absolute_import
+
+import numpy as np
+import scipy.sparse
+
+from openmdao.api import ExplicitComponent, IndepVarComp
+
+
+def bspline_knots(num_cp, order=4):
+    """
+    Clamped, uniform knots on [-1, 1] of a B-spline with num_cp coefficients.
+    """
+    if num_cp < order:
+        raise ValueError('A B-spline of order {} needs at least {} coefficients, got {}'.format(
+            order, order, num_cp))
+    return np.hstack((-np.ones(order - 1), np.linspace(-1., 1., num_cp - order + 2),
+                      np.ones(order - 1)))
+
+
+def bspline_basis(num_cp, x, order=4):
+    """
+    Values of the B-spline basis functions at points x in [-1, 1], by the
+    Cox-de Boor recursion.
+
+    Returns
+    -------
+    csr_matrix
+        Matrix of shape (len(x), num_cp) mapping the coefficients to the
+        values of the B-spline at x.
+    """
+    x = np.asarray(x, dtype=float)
+    t = bspline_knots(num_cp, order)
+
+    # degree 0, with the right end in the last non-empty interval
+    B = ((t[:-1] <= x[:, np.newaxis]) & (x[:, np.newaxis] < t[1:])).astype(float)
+    B[x >= t[-1], num_cp - 1] = 1.
+
+    for k in range(1, order):
+        left = t[k:-1] - t[:-k - 1]
+        right = t[k + 1:] - t[1:-k]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            a = np.where(left > 0., (x[:, np.newaxis] - t[:-k - 1]) / left, 0.)
+            b = np.where(right > 0., (t[k + 1:] - x[:, np.newaxis]) / right, 0.)
+        B = a * B[:, :-1] + b * B[:, 1:]
+
+    return scipy.sparse.csr_matrix(B)
+
+
+def greville_abscissae(num_cp, order=4):
+    """
+    Points of [-1, 1] associated with the coefficients; a B-spline whose
+    coefficients are the values of a linear function at these points is that
+    linear function.
+    """
+    t = bspline_knots(num_cp, order)
+    return np.array([np.mean(t[i + 1:i + order]) for i in range(num_cp)])
+
+
+class BSplineControlComp(ExplicitComponent):
+    """
+    Values at the nodes of a phase of a control given by B-spline coefficients.
+    """
+
+    def initialize(self):
+        self.options.declare('phase', desc='Phase whose nodes the control is evaluated at')
+        self.options.declare('num_cp', types=int, desc='Number of B-spline coefficients')
+        self.options.declare('order', default=4, types=int, desc='B-spline order, 4 for cubic')
+        self.options.declare('units', default=None, allow_none=True, desc='Units of the control')
+
+    def setup(self):
+        gd = self.options['phase'].grid_data
+        num_cp = self.options['num_cp']
+        units = self.options['units']
+
+        self.basis = bspline_basis(num_cp, gd.node_ptau, self.options['order']).tocoo()
+
+        self.add_input('coeffs', shape=num_cp, units=units)
+        self.add_output('values', shape=gd.num_nodes, units=units)
+
+        self.declare_partials('values', 'coeffs', rows=self.basis.row, cols=self.basis.col,
+                              val=self.basis.data)
+
+    def compute(self, inputs, outputs):
+        outputs['values'] = self.basis.dot(inputs['coeffs'])
+
+
+def _bspline_name(phase_name, name):
+    return 'bspline_{}_{}'.format(phase_name, name)
+
+
+def add_bspline_control(model, phase_name, phase, name, num_cp, units=None, val=0.,
+                        lower=None, upper=None, ref=None, order=4, opt=True):
+    """
+    Add a B-spline control to a phase, in place of phase.add_control.
+
+    The coefficients are the output of an IndepVarComp and, if `opt`, a
+    design variable bounded by `lower` and `upper`.  The values at the nodes
+    are connected to the ODE targets of the control, as declared by its
+    ode_options.  Must be called after the phase is added to the model.
+
+    Parameters
+    ----------
+    model : Group
+        Model containing the phase, before setup.
+    phase_name : str
+        Name of the phase in the model.
+    phase : Phase
+        The phase.
+    name : str
+        Name of the control, a parameter of the ODE of the phase.
+    num_cp : int
+        Number of coefficients.
+    units : str or None
+        Units of the coefficients.
+    val : float
+        Initial value of the coefficients.
+    lower, upper, ref : float or None
+        Bounds and scaling of the coefficients.
+    order : int
+        B-spline order, 4 for cubic.
+    opt : bool
+        Whether the coefficients are design variables.
+    """
+    comp_name = _bspline_name(phase_name, name)
+
+    ivc = IndepVarComp()
+    ivc.add_output('coeffs', val=val, shape=num_cp, units=units)
+    model.add_subsystem(comp_name + '_coeffs', ivc)
+    model.add_subsystem(comp_name, BSplineControlComp(phase=phase, num_cp=num_cp, order=order,
+                                                      units=units))
+    model.connect(comp_name + '_coeffs.coeffs', comp_name + '.coeffs')
+
+    if opt:
+        model.add_design_var(comp_name + '_coeffs.coeffs', lower=lower, upper=upper, ref=ref)
+
+    # the ODE instances of each transcription, and the nodes each is evaluated at
+    gd = phase.grid_data
+    if gd.transcription == 'gauss-lobatto':
+        # the state discretization subset is 'disc' in older versions of Dymos
+        disc = gd.subset_node_indices.get('state_disc', gd.subset_node_indices.get('disc'))
+        rhs = [('rhs_disc', disc), ('rhs_col', gd.subset_node_indices['col'])]
+    else:
+        rhs = [('rhs_all', np.arange(gd.num_nodes))]
+
+    targets = phase.options['ode_class'].ode_options._parameters[name]['targets']
+    for rhs_name, src_indices in rhs:
+        for target in targets:
+            model.connect(comp_name + '.values', '{}.{}.{}'.format(phase_name, rhs_name, target),
+                          src_indices=src_indices)
+
+
+def has_bspline_control(p, phase_name, name):
+    return p.model._get_subsystem(_bspline_name(phase_name, name)) is not None
+
+
+def set_bspline_guess(p, phase_name, name, ys):
+    """
+    Set the coefficients of a B-spline control to a linear guess from ys[0] at
+    the start of the phase to ys[-1] at its end.
+    """
+    comp_name = _bspline_name(phase_name, name)
+    options = p.model._get_subsystem(comp_name).options
+    x = greville_abscissae(options['num_cp'], options['order'])
+    p[comp_name + '_coeffs.coeffs'] = np.interp(x, np.linspace(-1., 1., len(ys)), ys)
+
+
+def get_bspline_values(p, phase_name, name):
+    """
+    Values of a B-spline control at all the nodes of its phase.
+    """
+    return p[_bspline_name(phase_name, name) + '.values']
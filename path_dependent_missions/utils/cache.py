@@ -0,0 +1,65 @@
+from __future__ import print_function, division, absolute_import
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+def cache_root():
+    """
+    Root of the files cached between runs (compiled maps, surrogate tables,
+    colorings, checkpoints...).  It is $PATH_DEPENDENT_MISSIONS_CACHE if set,
+    else path_dependent_missions under $XDG_CACHE_HOME or ~/.cache, so that
+    nothing is written into the installed package.
+    """
+    root = os.environ.get('PATH_DEPENDENT_MISSIONS_CACHE')
+    if root:
+        return os.path.expanduser(root)
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'path_dependent_missions')
+
+
+def user_cache_dir(name):
+    """
+    Directory of the cache `name` under cache_root().  It is not created here;
+    the writers create it when they first store a file.
+    """
+    return os.path.join(cache_root(), name)
+
+
+def makedirs(dirname):
+    """
+    Create `dirname` and its parents if it does not exist yet.  Several
+    processes may create the same directory at the same time.
+    """
+    try:
+        os.makedirs(dirname)
+    except OSError:
+        if not os.path.isdir(dirname):
+            raise
+
+
+@contextmanager
+def atomic_write(filename, mode='wb'):
+    """
+    Open a temporary file next to `filename`, and rename it to `filename`
+    when the block exits without an error.  Readers, including other sweep
+    workers, never see a partially written file, and an interrupted write
+    leaves the previous file, if any, untouched.  The directory is created if
+    needed.
+
+    Examples
+    --------
+    with atomic_write(filename) as f:
+        np.savez(f, x=x)
+    """
+    dirname = os.path.dirname(os.path.abspath(filename))
+    makedirs(dirname)
+
+    fd, tmp_filename = tempfile.mkstemp(suffix=os.path.splitext(filename)[1], dir=dirname)
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.rename(tmp_filename, filename)
+    except BaseException:
+        os.remove(tmp_filename)
+        raise
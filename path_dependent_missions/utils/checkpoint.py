@@ -0,0 +1,202 @@
+from __future__ import print_function, division, absolute_import
+import os
+import json
+import shutil
+import hashlib
+
+import numpy as np
+
+from path_dependent_missions.utils.cache import user_cache_dir, makedirs, atomic_write
+from path_dependent_missions.utils.coloring_cache import openmdao_internals_supported, \
+    structure_hash, _stable_repr
+
+
+# Checkpoints and pyOptSparse history files, in the user cache directory
+# like the coloring cache
+CHECKPOINT_DIR = user_cache_dir('checkpoints')
+
+
+def checkpoint_key(p, options=None):
+    """
+    Hash of the structure of a set-up problem, of its driver options and of
+    the `options` dict it was built with.  It is part of the checkpoint file
+    names, so that the checkpoint and the history of a run are only reused by
+    the same problem: a hot start replays the stored functions for the same
+    design vector, whatever the loads or bounds of the problem.
+    """
+    if openmdao_internals_supported():
+        structure = structure_hash(p)
+    else:
+        structure = [[name, int(meta['size'])] for name, meta in
+                     sorted(p.model.get_design_vars(recurse=True).items())]
+    driver = p.driver
+    key = [structure, type(driver).__name__, _stable_repr(driver.options._dict),
+           _stable_repr(getattr(driver, 'opt_settings', {})), _stable_repr(options or {})]
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+def _checkpoint_files(name, key, checkpoint_dir=None):
+    if checkpoint_dir is None:
+        checkpoint_dir = CHECKPOINT_DIR
+    base = os.path.join(checkpoint_dir, '{}_{}'.format(name, key))
+    return base + '.npz', base + '.hst', base + '_hotstart.hst'
+
+
+def _save_npz(filename, arrays):
+    # a crash while saving never corrupts the last good checkpoint
+    with atomic_write(filename) as f:
+        np.savez(f, **arrays)
+
+
+def use_checkpoints(p, name, every=20, hotstart=True, checkpoint_dir=None, options=None):
+    """
+    Checkpoint a pyOptSparseDriver optimization and hot-start identical reruns.
+
+    The files are named <name>_<key>, where the key is the checkpoint_key of
+    the problem and `options`.  Every `every` function evaluations the
+    (scaled) design vector is saved to <name>_<key>.npz; at the end of the run
+    the final design vector and the exit status are saved too.  After a crash
+    or a timeout, `resume_from_checkpoint` restarts from there.
+
+    Every evaluation is also stored in the pyOptSparse history file
+    <name>_<key>.hst.  With `hotstart`, the history of the previous run of the
+    same problem is moved to <name>_<key>_hotstart.hst and replayed: pyOptSparse returns the
+    stored functions and gradients instead of running the model until the
+    optimizer asks for a point that differs from the stored one.  Rerunning an
+    optimization to change the post-processing thus costs no model evaluations.
+
+    Parameters
+    ----------
+    p : OpenMDAO Problem instance
+        Problem with a pyOptSparseDriver; setup must already have been called.
+    name : str
+        Name of the checkpoint, e.g. 'thermal_Q_env_300e3'.
+    every : int
+        Number of function evaluations between checkpoints.
+    hotstart : bool
+        Replay the history of the previous run with the same name.
+    checkpoint_dir : str or None
+        Directory of the checkpoint files; defaults to CHECKPOINT_DIR.
+    options : dict or None
+        Options the problem was built with that are not part of its structure,
+        such as loads and constraint bounds.
+    """
+    checkpoint_file, hist_file, hotstart_file = _checkpoint_files(name, checkpoint_key(p, options),
+                                                                  checkpoint_dir)
+
+    driver = p.driver
+    state = getattr(driver, '_checkpoint', None)
+    if state is not None and state['filename'] == checkpoint_file:
+        # configured again with the same name, keep the hot-start file
+        state['every'] = every
+        return checkpoint_file
+
+    # pyOptSparse writes the history files there
+    makedirs(os.path.dirname(checkpoint_file))
+
+    if hotstart and os.path.exists(hist_file):
+        shutil.move(hist_file, hotstart_file)
+        driver.hotstart_file = hotstart_file
+    else:
+        driver.hotstart_file = None
+    driver.hist_file = hist_file
+
+    if state is not None:
+        # already wrapped, e.g. a problem reused by a ProblemFactory sweep
+        state.update(filename=checkpoint_file, every=every)
+        return checkpoint_file
+
+    state = driver._checkpoint = {'filename': checkpoint_file, 'every': every, 'count': 0}
+    objfunc = driver._objfunc
+    run = driver.run
+
+    def _objfunc(dv_dict):
+        func_dict, fail = objfunc(dv_dict)
+        state['count'] += 1
+        if state['count'] % state['every'] == 0 and not fail:
+            arrays = dict(('dv:' + key, val) for key, val in dv_dict.items())
+            arrays['num_evals'] = state['count']
+            _save_npz(state['filename'], arrays)
+        return func_dict, fail
+
+    def _run():
+        state['count'] = 0
+        failed = run()
+
+        arrays = dict(('dv:' + key, val) for key, val in
+                      driver.get_design_var_values().items())
+        arrays['num_evals'] = state['count']
+        arrays['failed'] = failed
+        arrays['final'] = True
+
+        sol = driver.pyopt_solution
+        if sol is not None and getattr(sol, 'optInform', None):
+            arrays['exit_status'] = sol.optInform.get('value', -1)
+
+        _save_npz(state['filename'], arrays)
+
+        return failed
+
+    driver._objfunc = _objfunc
+    driver.run = _run
+
+    return checkpoint_file
+
+
+def load_checkpoint(p, name, checkpoint_dir=None, options=None):
+    """
+    Contents of the checkpoint `name` of problem `p` built with `options`, or
+    None if there is none.
+
+    Returns
+    -------
+    dict or None
+        'dv' (scaled design vector), 'num_evals' and 'final', and for a
+        finished run 'failed' and, if the optimizer reported it,
+        'exit_status'.
+    """
+    checkpoint_file = _checkpoint_files(name, checkpoint_key(p, options), checkpoint_dir)[0]
+    if not os.path.exists(checkpoint_file):
+        return None
+
+    data = np.load(checkpoint_file)
+    checkpoint = {'dv': {}, 'num_evals': int(data['num_evals']), 'final': 'final' in data.files}
+    for key in data.files:
+        if key.startswith('dv:'):
+            checkpoint['dv'][key[3:]] = data[key]
+        elif key in ('failed', 'exit_status'):
+            checkpoint[key] = data[key].item()
+    return checkpoint
+
+
+def resume_from_checkpoint(p, name, every=20, checkpoint_dir=None, options=None):
+    """
+    Set the design variables of `p` to the last checkpoint of `name` and keep
+    checkpointing under the same name, so that the next run_driver continues
+    where the previous one stopped.  Only checkpoints of the same problem,
+    built with the same `options`, are used (see use_checkpoints).  The
+    optimizer itself starts cold from the checkpointed design vector.
+
+    Returns
+    -------
+    bool
+        True if a checkpoint was found.
+    """
+    checkpoint = load_checkpoint(p, name, checkpoint_dir, options)
+
+    # the history of the interrupted run starts from a different point, so it
+    # cannot be replayed
+    use_checkpoints(p, name, every=every, hotstart=False, checkpoint_dir=checkpoint_dir,
+                    options=options)
+
+    if checkpoint is None:
+        print('No checkpoint named {}, starting from the initial guess'.format(name))
+        return False
+
+    p.final_setup()
+    for dv_name, val in checkpoint['dv'].items():
+        p.driver.set_design_var(dv_name, val)
+
+    print('Resuming {} from the checkpoint after {} function evaluations'.format(
+        name, checkpoint['num_evals']))
+    return True
@@ -0,0 +1,230 @@
+from __future__ import print_function, division, absolute_import
+import os
+import json
+import hashlib
+import warnings
+
+import numpy as np
+
+from path_dependent_missions.utils.cache import user_cache_dir, atomic_write
+
+
+# Colorings are stored in the user cache directory, so every run and every
+# sweep worker of this user shares the same files.
+COLORING_CACHE_DIR = user_cache_dir('coloring')
+
+# Release series of OpenMDAO whose private Problem, System and Driver
+# attributes (the original setup mode, the variable metadata and connections,
+# and the driver's coloring setup) are used here and in deriv_mode.py
+OPENMDAO_INTERNALS = ('2.4',)
+
+
+def openmdao_internals_supported():
+    """
+    Whether the installed OpenMDAO is one whose internals structure_hash,
+    use_coloring_cache and select_deriv_mode rely on.
+    """
+    import openmdao
+    return '.'.join(openmdao.__version__.split('.')[:2]) in OPENMDAO_INTERNALS
+
+
+def _stable_repr(val):
+    """
+    Return a JSON-friendly representation of `val` that does not depend on
+    object ids, so that it hashes identically from one run to the next.
+    """
+    if val is None or isinstance(val, (bool, int, float, str)):
+        return val
+    if isinstance(val, np.ndarray):
+        return val.tolist()
+    if isinstance(val, (np.integer, np.floating, np.bool_)):
+        return val.item()
+    if isinstance(val, type):
+        return val.__module__ + '.' + val.__name__
+    if isinstance(val, dict):
+        return [[str(k), _stable_repr(v)] for k, v in sorted(val.items(), key=lambda kv: str(kv[0]))]
+    if isinstance(val, (list, tuple, set)):
+        return [_stable_repr(v) for v in val]
+    return type(val).__name__
+
+
+def _desvar_meta(meta):
+    return {'size': int(meta['size']),
+            'indices': _stable_repr(meta.get('indices'))}
+
+
+def _response_meta(meta):
+    return {'size': int(meta['size']),
+            'indices': _stable_repr(meta.get('indices')),
+            'type': meta.get('type'),
+            'linear': bool(meta.get('linear', False))}
+
+
+def _subjac_sparsity(component):
+    """
+    Declared sparsity of every partial derivative of `component`: its rows
+    and cols, or None for a dense one, and its shape.
+    """
+    subjacs = []
+    for key, meta in sorted(component._subjacs_info.items()):
+        subjacs.append([list(key), _stable_repr(meta.get('rows')), _stable_repr(meta.get('cols')),
+                        _stable_repr(meta.get('shape')), _stable_repr(meta.get('method'))])
+    return subjacs
+
+
+def _versions():
+    """
+    Versions of OpenMDAO and Dymos, whose own components and coloring
+    algorithm determine the sparsity as much as the model does.
+    """
+    import openmdao
+    try:
+        import dymos
+        dymos_version = getattr(dymos, '__version__', 'unknown')
+    except ImportError:
+        dymos_version = None
+    return {'openmdao': openmdao.__version__, 'dymos': dymos_version}
+
+
+def structure_hash(p):
+    """
+    Hash the parts of a set-up problem that determine the total jacobian
+    sparsity: the system tree and its options (which includes the transcription
+    and mesh of every phase), the variable shapes, the declared sparsity of
+    every partial derivative, the connections, the design variables and the
+    responses, together with the versions of OpenMDAO and Dymos.
+
+    Values and bounds are deliberately left out, so problems that only differ in
+    parameter values or initial guesses share a hash.
+
+    It reads the private metadata of the model, so it raises a RuntimeError
+    unless openmdao_internals_supported().  The partial derivatives are only
+    declared in final_setup, so it calls p.final_setup() first.
+
+    Parameters
+    ----------
+    p : OpenMDAO Problem instance
+        Problem on which setup has already been called.
+
+    Returns
+    -------
+    str
+        Hexadecimal digest identifying the problem structure.
+    """
+    if not openmdao_internals_supported():
+        import openmdao
+        raise RuntimeError('structure_hash relies on internals of OpenMDAO {}, found {}'.format(
+            ' or '.join(OPENMDAO_INTERNALS), openmdao.__version__))
+
+    from openmdao.core.component import Component
+
+    p.final_setup()
+    model = p.model
+
+    systems = []
+    subjacs = []
+    for system in model.system_iter(include_self=True, recurse=True):
+        options = [[key, _stable_repr(system.options[key])] for key in sorted(system.options._dict)]
+        systems.append([system.pathname, type(system).__name__, options])
+        if isinstance(system, Component):
+            subjacs.append([system.pathname, _subjac_sparsity(system)])
+
+    variables = []
+    for io in ('input', 'output'):
+        for name in model._var_allprocs_abs_names[io]:
+            variables.append([name, list(model._var_allprocs_abs2meta[name]['shape'])])
+
+    connections = sorted(model._conn_global_abs_in2out.items())
+
+    desvars = model.get_design_vars(recurse=True)
+    responses = model.get_responses(recurse=True)
+
+    structure = {
+        'mode': p._orig_mode,
+        'systems': systems,
+        'variables': variables,
+        'subjacs': subjacs,
+        'connections': connections,
+        'desvars': [[name, _desvar_meta(meta)] for name, meta in sorted(desvars.items())],
+        'responses': [[name, _response_meta(meta)] for name, meta in sorted(responses.items())],
+        'versions': _versions(),
+    }
+
+    return hashlib.sha1(json.dumps(structure, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def coloring_filename(p, cache_dir=None):
+    """
+    Return the path of the cached coloring file for this problem structure.
+    """
+    if cache_dir is None:
+        cache_dir = COLORING_CACHE_DIR
+    return os.path.join(cache_dir, 'coloring_{}.json'.format(structure_hash(p)))
+
+
+def use_coloring_cache(p, cache_dir=None, repeats=None):
+    """
+    Reuse a previously computed total jacobian coloring for this problem, or
+    compute it once and store it for later runs.
+
+    This replaces the `dynamic_simul_derivs` driver option, which recomputes
+    the coloring at the start of every `run_driver`.  It should be called after
+    `p.setup()` and after the initial guesses have been set, since a cache miss
+    runs the model once before computing the coloring.
+
+    The coloring is set up through private Driver methods, so with other
+    versions of OpenMDAO than OPENMDAO_INTERNALS this falls back to the
+    `dynamic_simul_derivs` option, with a warning.
+
+    Parameters
+    ----------
+    p : OpenMDAO Problem instance
+        Problem on which setup has already been called.
+    cache_dir : str or None
+        Directory holding the cached colorings; defaults to COLORING_CACHE_DIR.
+    repeats : int or None
+        Number of random total jacobians used when computing a new coloring;
+        defaults to the driver's `dynamic_derivs_repeats` option.
+
+    Returns
+    -------
+    str or None
+        Path of the coloring file used by the driver, None if it falls back to
+        dynamic coloring.
+    """
+    from openmdao.utils import coloring as coloring_mod
+
+    if not openmdao_internals_supported():
+        warnings.warn('The coloring cache is not supported with this version of OpenMDAO, '
+                      'computing the coloring at every run_driver instead')
+        p.driver.options['dynamic_simul_derivs'] = True
+        return None
+
+    if cache_dir is None:
+        cache_dir = COLORING_CACHE_DIR
+
+    p.final_setup()
+    driver = p.driver
+
+    filename = coloring_filename(p, cache_dir)
+
+    if not os.path.exists(filename):
+        if repeats is None:
+            repeats = driver.options['dynamic_derivs_repeats']
+
+        driver._total_jac = None
+
+        with atomic_write(filename, 'w') as f:
+            coloring_mod.get_simul_meta(p, repeats=repeats, tol=1.e-15,
+                                        include_sparsity=True, setup=False,
+                                        run_model=True, stream=f)
+
+    driver.options['dynamic_simul_derivs'] = False
+    driver._total_jac = None
+    driver._total_jac_sparsity = None
+    driver.set_simul_deriv_color(filename)
+    driver._setup_simul_coloring()
+    if hasattr(driver, '_setup_tot_jac_sparsity'):
+        driver._setup_tot_jac_sparsity()
+
+    return filename
@@ -2,6 +2,8 @@ from __future__ import print_function, division, absolute_import
 import numpy as np
 import sys
 import os
+import json
+import hashlib
 from collections import OrderedDict
 import matplotlib.pyplot as plt
 import matplotlib.cm as cm
@@ -9,22 +11,33 @@ import matplotlib.cm as cm
 from openmdao.api import Problem, Group, IndepVarComp
 from dymos.models.atmosphere import StandardAtmosphereGroup
 
+import path_dependent_missions.escort.aero as escort_aero
 from path_dependent_missions.escort.aero import AeroGroup
 from path_dependent_missions.escort.aero.aero_smt import AeroSMTGroup
+from path_dependent_missions.escort.aero.aero_table import get_ESAV_data_hash
+from path_dependent_missions.utils.cache import user_cache_dir, atomic_write
 
 from niceplots import parula, draggable_legend
 
 
 cmap = parula.parula_map
 
-def setup_prob(nn, h, v):
+POLAR_CACHE_DIR = user_cache_dir('polars')
+
+# Outputs of the polar grid, as returned by get_polar_grid
+polar_outputs = ['aero.mach', 'aero.CL', 'aero.CD', 'aero_smt.CL', 'aero_smt.CD']
+
+def setup_prob(nn, h, v, alpha=None):
     p = Problem()
     p.model = Group()
 
+    if alpha is None:
+        alpha = np.linspace(-8., 8., nn)
+
     ivc = IndepVarComp()
     ivc.add_output('h', shape=nn, val=h, units='ft')
     ivc.add_output('v', shape=nn, val=v, units='m/s')
-    ivc.add_output('alpha', shape=nn, val=np.linspace(-8., 8., nn), units='deg')
+    ivc.add_output('alpha', shape=nn, val=alpha, units='deg')
     ivc.add_output('S', shape=nn, val=49.236, units='m**2')
 
     p.model.add_subsystem('ivc', ivc, promotes=['*'])
@@ -45,29 +58,89 @@ def setup_prob(nn, h, v):
 
     return p
 
-def plot_drag_polar():
+def _polar_model_hash():
+    """
+    Hash of what the polars depend on besides the grid: the training data of
+    the ESAV surrogate and the source of the aero components.
+    """
+    aero_dir = os.path.dirname(os.path.abspath(escort_aero.__file__))
+    sha = hashlib.sha1(get_ESAV_data_hash().encode())
+    for name in sorted(os.listdir(aero_dir)):
+        if name.endswith('.py'):
+            with open(os.path.join(aero_dir, name), 'rb') as f:
+                sha.update(f.read())
+    return sha.hexdigest()
+
+
+def get_polar_grid(v_list, alphas, hs):
+    """
+    Mach number and the CL and CD of AeroGroup and AeroSMTGroup over the full
+    (v x alpha x h) grid, from one run of a single problem with a node per
+    grid point.  The results are cached in POLAR_CACHE_DIR, keyed by the grid
+    and the aero models.
+
+    Parameters
+    ----------
+    v_list : array_like
+        Velocities, m/s.
+    alphas : array_like
+        Angles of attack, deg.
+    hs : array_like
+        Altitudes, ft.
+
+    Returns
+    -------
+    dict of ndarray
+        Each of polar_outputs, shape (len(v_list), len(alphas), len(hs)).
+    """
+    key = [[float(val) for val in vals] for vals in (v_list, alphas, hs)] + [_polar_model_hash()]
+    grid_hash = hashlib.sha1(json.dumps(key).encode()).hexdigest()
+    filename = os.path.join(POLAR_CACHE_DIR, 'polar_{}.npz'.format(grid_hash[:16]))
+
+    if os.path.exists(filename):
+        data = np.load(filename)
+        return dict((name, data[name]) for name in polar_outputs)
+
+    V, A, H = np.meshgrid(v_list, alphas, hs, indexing='ij')
+    prob = setup_prob(V.size, H.ravel(), V.ravel(), alpha=A.ravel())
+    prob.run_model()
+
+    results = dict((name, prob[name].reshape(V.shape).copy()) for name in polar_outputs)
+
+    # an interrupted run never leaves a partial cache file
+    with atomic_write(filename) as f:
+        np.savez(f, **results)
+
+    return results
+
+def plot_drag_polar(hs=(30000.,)):
+    """
+    Plot the drag polars of AeroSMTGroup at each altitude (ft), from a
+    single evaluation of the whole grid by get_polar_grid.
+    """
+    v_list = np.linspace(0., 550., 100)
+    alpha = np.linspace(-8., 8., 50)
+    polars = get_polar_grid(v_list, alpha, hs)
 
-    fig, axarr = plt.subplots(1, 3, figsize=(15, 5))
+    for k, h in enumerate(hs):
+        plot_altitude_polar(polars, k, v_list, alpha,
+                            'polars.pdf' if len(hs) == 1 else 'polars_{:.0f}ft.pdf'.format(h))
 
-    plt.sca(axarr[0])
+def plot_altitude_polar(polars, k, v_list, alpha, filename):
 
-    v_list = np.linspace(0., 550., 100)
-    prob = setup_prob(50, 30000., v_list[0])
+    fig, axarr = plt.subplots(1, 3, figsize=(15, 5))
 
-    alpha = prob['alpha']
+    plt.sca(axarr[0])
 
     for i, v in enumerate(v_list):
-        prob['v'][:] = v
-        prob.run_model()
-        CL_ = prob['aero.CL']
-        CD_ = prob['aero.CD']
+        mach = polars['aero.mach'][i, 0, k]
 
-        CL = prob['aero_smt.CL'] / 49.236/2.
-        CD = prob['aero_smt.CD'] / 49.236/2.
+        CL = polars['aero_smt.CL'][i, :, k] / 49.236/2.
+        CD = polars['aero_smt.CD'][i, :, k] / 49.236/2.
 
-        axarr[0].plot(CD, CL, color=cmap(i/len(v_list)), label=str(round(prob['aero.mach'][0], 2)))
-        axarr[1].plot(alpha, CL, color=cmap(i/len(v_list)), label=str(round(prob['aero.mach'][0], 2)))
-        axarr[2].plot(alpha, CD, color=cmap(i/len(v_list)), label=str(round(prob['aero.mach'][0], 2)))
+        axarr[0].plot(CD, CL, color=cmap(i/len(v_list)), label=str(round(mach, 2)))
+        axarr[1].plot(alpha, CL, color=cmap(i/len(v_list)), label=str(round(mach, 2)))
+        axarr[2].plot(alpha, CD, color=cmap(i/len(v_list)), label=str(round(mach, 2)))
 
     axarr[0].set_xlabel('CD')
     axarr[0].set_ylabel('CL')
@@ -98,7 +171,8 @@ def plot_drag_polar():
     cbar_ax.set_title('Mach', pad=12)
 
     # plt.show()
-    plt.savefig('polars.pdf')
+    plt.savefig(filename)
+    plt.close(fig)
 
 if __name__ == "__main__":
     plot_drag_polar()
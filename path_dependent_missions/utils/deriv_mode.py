@@ -0,0 +1,166 @@
+from __future__ import print_function, division, absolute_import
+import os
+import json
+import time
+
+import numpy as np
+
+from path_dependent_missions.utils.cache import atomic_write
+from path_dependent_missions.utils.coloring_cache import COLORING_CACHE_DIR, structure_hash, \
+    openmdao_internals_supported
+
+
+def _colored_solves(coloring, mode, J):
+    """
+    Number of linear solves of a coloring in `mode` returned by get_simul_meta
+    for the boolean total jacobian J.
+    """
+    solves = 0
+    for direction in ('fwd', 'rev'):
+        if direction in coloring:
+            # the first list holds the uncolored columns (fwd) or rows (rev),
+            # solved one by one, and each other list is solved at once
+            lists = coloring[direction][0]
+            solves += len(lists[0]) + len(lists) - 1
+    if not solves:
+        # no coloring possible, one solve per column (fwd) or row (rev)
+        solves = J.shape[1] if mode == 'fwd' else J.shape[0]
+    return solves
+
+
+def _coloring(J, mode):
+    """
+    Coloring of the boolean total jacobian J in `mode` only, in the format of
+    get_simul_meta, whose own mode-only coloring (bidirectional=False) fails
+    in OpenMDAO 2.4.
+    """
+    from openmdao.utils.coloring import _get_full_disjoint_cols
+
+    if mode == 'rev':
+        J = J.T
+
+    full_disjoint = _get_full_disjoint_cols(J)
+    uncolored = [int(clist[0]) for clist in full_disjoint if len(clist) == 1]
+    colored = [[int(col) for col in clist] for clist in full_disjoint if len(clist) > 1]
+
+    # nonzero rows (fwd) or columns (rev) of every colored column or row
+    rowcol_map = [None] * J.shape[1]
+    for clist in colored:
+        for col in clist:
+            rowcol_map[col] = [int(row) for row in np.nonzero(J[:, col])[0]]
+
+    return {mode: [[uncolored] + colored, rowcol_map]}
+
+
+def _time_totals(p, mode, coloring):
+    """
+    Wall time of one colored computation of the total jacobian in `mode`.
+    The problem is set up in that mode, and the computation is run once
+    before the timed one, which builds the total jacobian data.
+    """
+    driver = p.driver
+
+    p.setup(mode=mode, check=False)
+    p.final_setup()
+    driver.set_simul_deriv_color(coloring)
+    driver._setup_simul_coloring()
+    p.run_model()
+
+    driver._compute_totals()
+    st = time.time()
+    driver._compute_totals()
+    elapsed = time.time() - st
+
+    # leave the driver as set up, without this coloring, for the caller
+    driver._simul_coloring_info = None
+    driver._total_jac = None
+
+    return elapsed
+
+
+def select_deriv_mode(p, cache_dir=None, repeats=None, margin=0.25, verbose=False):
+    """
+    Pick forward or reverse mode for the total derivatives of a problem, by
+    the number of linear solves of its total jacobian colored in each
+    direction.  When the two counts are within `margin` of each other, the
+    cost of a solve decides: one colored total jacobian is timed in each
+    mode, and the faster mode is picked.
+
+    The number of design variables and constraints of the mission problems
+    changes a lot with the mesh and the options, so neither mode is always
+    the cheaper one.  This is opt-in: the builders take deriv_mode='benchmark'
+    to call it, and use the baseline modes otherwise.
+
+    It must be called on a problem that is not set up yet.  The problem is set
+    up once in forward mode to compute the sparsity of the total jacobian, and
+    the caller then sets it up again with the returned mode.  The choice is
+    recorded in the coloring cache directory, keyed by the problem structure,
+    so later runs of the same structure skip the sparsity computation; the
+    timings, if any, are recorded with it.
+
+    Parameters
+    ----------
+    p : OpenMDAO Problem instance
+        Problem with its design variables and responses, before setup.
+    cache_dir : str or None
+        Directory of the recorded choices; defaults to COLORING_CACHE_DIR.
+    repeats : int or None
+        Number of random total jacobians used for the sparsity; defaults to
+        the driver's `dynamic_derivs_repeats` option.
+    margin : float
+        Largest relative difference of the solve counts for which both modes
+        are timed.
+    verbose : bool
+        Print the number of solves and the timings in each mode and the
+        selected mode.
+
+    Returns
+    -------
+    str
+        The selected mode, 'fwd' or 'rev'.
+    """
+    from openmdao.utils.coloring import get_simul_meta
+
+    if cache_dir is None:
+        cache_dir = COLORING_CACHE_DIR
+
+    # the sparsity is the same in both modes
+    p.setup(mode='fwd', check=False)
+    p.final_setup()
+
+    filename = os.path.join(cache_dir, 'mode_{}.json'.format(structure_hash(p)))
+
+    if os.path.exists(filename):
+        with open(filename) as f:
+            record = json.load(f)
+    else:
+        if repeats is None:
+            repeats = p.driver.options['dynamic_derivs_repeats']
+
+        J = get_simul_meta(p, repeats=repeats, tol=1.e-15, include_sparsity=False,
+                           stream=None)['J']
+
+        record = {'shape': list(J.shape), 'solves': {}, 'times': None}
+        colorings = {}
+        for mode in ('fwd', 'rev'):
+            colorings[mode] = _coloring(J, mode)
+            record['solves'][mode] = _colored_solves(colorings[mode], mode, J)
+        record['mode'] = min(('fwd', 'rev'), key=lambda mode: record['solves'][mode])
+
+        solves = sorted(record['solves'].values())
+        if solves[1] - solves[0] <= margin * solves[0] and openmdao_internals_supported():
+            record['times'] = dict((mode, _time_totals(p, mode, colorings[mode]))
+                                   for mode in ('fwd', 'rev'))
+            record['mode'] = min(('fwd', 'rev'), key=lambda mode: record['times'][mode])
+
+        with atomic_write(filename, 'w') as f:
+            json.dump(record, f, indent=1)
+
+    if verbose:
+        print('Derivative mode {} (fwd: {} solves, rev: {} solves), total jacobian {} x {}'.format(
+            record['mode'], record['solves']['fwd'], record['solves']['rev'], *record['shape']))
+        if record.get('times'):
+            print('Colored total jacobian in {:.4f} s (fwd), {:.4f} s (rev)'.format(
+                record['times']['fwd'], record['times']['rev']))
+
+    return record['mode']
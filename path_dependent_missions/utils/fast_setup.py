@@ -0,0 +1,80 @@
+from __future__ import print_function, division, absolute_import
+import os
+import time
+
+from path_dependent_missions.utils.coloring_cache import structure_hash, \
+    openmdao_internals_supported
+from path_dependent_missions.utils.cache import user_cache_dir, atomic_write
+
+
+# Problem structures that already passed the setup checks, one marker file per
+# structure hash, shared by every run of this user like the coloring cache.
+SETUP_CACHE_DIR = user_cache_dir('setup')
+
+
+def fast_setup(p, check=True, cache_dir=None, verbose=False, **kwargs):
+    """
+    Skip check=True in the setup of a problem when its structure hash is
+    unchanged.
+
+    The structure is identified by the same hash as the coloring cache (the
+    system tree and options, variable shapes, declared partials, connections,
+    design variables and responses), so changing a value or an initial guess
+    does not trigger the checks again, while adding a constraint or changing
+    the mesh does.
+
+    The hash is only known once the problem is set up, so the problem is set
+    up with check=False first, and set up again with check=True when its
+    structure was never checked.  Only the checks are skipped: nothing of
+    the set-up problem is cached, and a new structure costs two setups.
+
+    Parameters
+    ----------
+    p : OpenMDAO Problem instance
+        Problem on which setup has not been called yet.
+    check : bool
+        Run the setup checks for new structures.  False skips them always,
+        like p.setup(check=False).
+    cache_dir : str or None
+        Directory holding the markers of checked structures; defaults to
+        SETUP_CACHE_DIR.
+    verbose : bool
+        Print whether the checks were skipped and the setup time.
+    **kwargs
+        Other arguments of p.setup, e.g. mode or force_alloc_complex.
+
+    Returns
+    -------
+    str or None
+        Structure hash of the problem, None if structure_hash is not supported
+        by this version of OpenMDAO, in which case the checks always run.
+    """
+    if cache_dir is None:
+        cache_dir = SETUP_CACHE_DIR
+
+    if not openmdao_internals_supported():
+        p.setup(check=check, **kwargs)
+        return None
+
+    st = time.time()
+    p.setup(check=False, **kwargs)
+    digest = structure_hash(p)
+
+    marker = os.path.join(cache_dir, 'checked_{}'.format(digest))
+    if not check:
+        pass
+    elif os.path.exists(marker):
+        if verbose:
+            print('Skipping setup checks, structure {} was already checked'.format(digest[:12]))
+    else:
+        # the checks run in the final_setup of a problem set up with check=True
+        p.setup(check=True, **kwargs)
+        p.final_setup()
+
+        with atomic_write(marker, 'w') as f:
+            f.write('checked {}\n'.format(time.strftime('%Y-%m-%d %H:%M:%S')))
+
+    if verbose:
+        print('Setup done in {:.2f} s'.format(time.time() - st))
+
+    return digest
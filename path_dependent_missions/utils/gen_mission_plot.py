@@ -3,14 +3,14 @@ import numpy as np
 import sys
 import os
 from collections import OrderedDict
-import matplotlib.pyplot as plt
-from matplotlib.ticker import FormatStrFormatter
 import pickle
 
 
 def adjust_spines(ax = None, spines=['left'], off_spines=['top', 'right', 'bottom']):
     """ Function to shift the axes/spines so they have that offset
         Doumont look. """
+    import matplotlib.pyplot as plt
+
     if ax == None:
         ax = plt.gca()
 
@@ -103,6 +103,8 @@ def plot_results(filenames, save_fig=False, list_to_plot=['h', 'aero.mach', 'thr
         This problem instance should contain the optimized outputs from the
         energy minimization thermal problem.
     """
+    import matplotlib.pyplot as plt
+    from matplotlib.ticker import FormatStrFormatter
 
     fontsize = 18
 
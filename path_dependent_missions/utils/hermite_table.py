@@ -0,0 +1,261 @@
+from __future__ import print_function, division, absolute_import
+import os
+import shutil
+import itertools
+import tempfile
+
+import numpy as np
+
+from path_dependent_missions.utils.cache import makedirs, atomic_write
+
+
+def _hermite_basis(t, h):
+    """
+    Cubic Hermite basis on a unit cell and its derivative with respect to the
+    physical coordinate.
+
+    Returns two arrays of shape (n, 2, 2) indexed by [point, corner, kind], where
+    kind 0 multiplies the corner value and kind 1 multiplies the corner slope.
+    """
+    t2 = t * t
+    t3 = t2 * t
+
+    basis = np.empty((t.shape[0], 2, 2))
+    basis[:, 0, 0] = 2 * t3 - 3 * t2 + 1
+    basis[:, 1, 0] = -2 * t3 + 3 * t2
+    basis[:, 0, 1] = (t3 - 2 * t2 + t) * h
+    basis[:, 1, 1] = (t3 - t2) * h
+
+    dbasis = np.empty((t.shape[0], 2, 2))
+    dbasis[:, 0, 0] = (6 * t2 - 6 * t) / h
+    dbasis[:, 1, 0] = (-6 * t2 + 6 * t) / h
+    dbasis[:, 0, 1] = 3 * t2 - 4 * t + 1
+    dbasis[:, 1, 1] = 3 * t2 - 2 * t
+
+    return basis, dbasis
+
+
+class HermiteTable(object):
+    """
+    Tensor-product cubic Hermite interpolant on a regular grid.
+
+    Each grid node stores the function value and every mixed first derivative
+    (f, df/dx0, df/dx1, d2f/dx0dx1, ...), so an evaluation only gathers the
+    2**nx corners of one cell and contracts them with the Hermite basis.  There
+    is no sparse matrix assembly, which makes it much cheaper than evaluating the
+    original surrogate when the number of nodes is large.
+
+    The class mimics the `predict_values` / `predict_derivatives` interface of
+    the SMT surrogate models so that it can be used in their place.  Points
+    outside the grid are evaluated with the cubic of the nearest boundary cell.
+
+    Parameters
+    ----------
+    xlimits : ndarray
+        Lower and upper bound of each input, shape (nx, 2).
+    coeffs : ndarray
+        Node data of shape (n_0, ..., n_{nx-1}, 2**nx, ny).  The second to last
+        axis holds the mixed derivatives, indexed by a bit mask in which bit k
+        is set when the entry is differentiated with respect to input k.
+    grids : list of ndarray or None
+        Node coordinates along each input for grids that are not uniformly
+        spaced; None means uniform spacing between the xlimits.
+    """
+
+    def __init__(self, xlimits, coeffs, grids=None):
+        self.xlimits = np.asarray(xlimits, dtype=float)
+        self.nx = self.xlimits.shape[0]
+        self.coeffs = coeffs
+        self.grids = None if grids is None else [np.asarray(g, dtype=float) for g in grids]
+
+        self.grid_shape = coeffs.shape[:self.nx]
+        self.ny = coeffs.shape[-1]
+
+        self.num_cells = np.array(self.grid_shape) - 1
+        self.h = (self.xlimits[:, 1] - self.xlimits[:, 0]) / self.num_cells
+
+        # Flat offsets of the 2**nx corners of a cell relative to its first node
+        strides = np.cumprod((1,) + tuple(self.grid_shape[::-1]))[:-1][::-1]
+        self._strides = strides
+        self._corners = np.array(list(itertools.product((0, 1), repeat=self.nx)))
+        self._corner_offsets = self._corners.dot(strides)
+
+        # Kind (value or slope) of each input in each mixed derivative mask
+        masks = np.arange(2 ** self.nx)
+        self._mask_bits = (masks[:, np.newaxis] >> np.arange(self.nx)) & 1
+
+        self._flat_coeffs = coeffs.reshape((-1, 2 ** self.nx, self.ny))
+
+    @classmethod
+    def from_function(cls, xlimits, num_points, func, dfunc):
+        """
+        Build a table by sampling a function and its first derivatives on the
+        grid; the higher mixed derivatives are obtained by central differences
+        of the exact first derivatives.
+
+        Parameters
+        ----------
+        xlimits : ndarray
+            Lower and upper bound of each input, shape (nx, 2).
+        num_points : sequence of int
+            Number of grid points along each input.
+        func : callable
+            func(x) returns the values at the points x, shape (n, ny).
+        dfunc : callable
+            dfunc(x, kx) returns the derivatives with respect to input kx, shape (n, ny).
+        """
+        xlimits = np.asarray(xlimits, dtype=float)
+        nx = xlimits.shape[0]
+        grids = [np.linspace(xlimits[k, 0], xlimits[k, 1], num_points[k]) for k in range(nx)]
+        x = np.stack([g.ravel() for g in np.meshgrid(*grids, indexing='ij')], axis=-1)
+        shape = tuple(num_points)
+
+        values = func(x)
+        ny = values.shape[1]
+
+        coeffs = np.empty(shape + (2 ** nx, ny))
+        coeffs[..., 0, :] = values.reshape(shape + (ny,))
+
+        for kx in range(nx):
+            coeffs[..., 2 ** kx, :] = dfunc(x, kx).reshape(shape + (ny,))
+
+        for mask in range(3, 2 ** nx):
+            bits = [k for k in range(nx) if mask & (1 << k)]
+            if len(bits) < 2:
+                continue
+            # differentiate the lower-order entry along the highest input in the mask
+            k = bits[-1]
+            coeffs[..., mask, :] = np.gradient(coeffs[..., mask - 2 ** k, :], grids[k], axis=k, edge_order=2)
+
+        return cls(xlimits, coeffs)
+
+    @classmethod
+    def from_grid_data(cls, grids, values):
+        """
+        Build a table from tabulated values on a (possibly non-uniform) grid.
+        All the slopes are obtained by central differences of the data.
+
+        Parameters
+        ----------
+        grids : list of ndarray
+            Node coordinates along each input.
+        values : ndarray
+            Tabulated values, shape (n_0, ..., n_{nx-1}, ny).
+        """
+        grids = [np.asarray(g, dtype=float) for g in grids]
+        nx = len(grids)
+        shape = tuple(g.size for g in grids)
+        ny = values.shape[-1]
+
+        coeffs = np.empty(shape + (2 ** nx, ny))
+        coeffs[..., 0, :] = values
+
+        for mask in range(1, 2 ** nx):
+            k = max(k for k in range(nx) if mask & (1 << k))
+            edge_order = 2 if shape[k] > 2 else 1
+            coeffs[..., mask, :] = np.gradient(coeffs[..., mask - 2 ** k, :], grids[k], axis=k,
+                                               edge_order=edge_order)
+
+        xlimits = np.array([[g[0], g[-1]] for g in grids])
+        return cls(xlimits, coeffs, grids)
+
+    def _grid_arrays(self):
+        if self.grids is None:
+            return {}
+        return {'grid_{}'.format(k): g for k, g in enumerate(self.grids)}
+
+    def save(self, filename):
+        with atomic_write(filename) as f:
+            np.savez(f, xlimits=self.xlimits, coeffs=self.coeffs, **self._grid_arrays())
+
+    @classmethod
+    def load(cls, filename):
+        data = np.load(filename)
+        grids = None
+        if 'grid_0' in data.files:
+            grids = [data['grid_{}'.format(k)] for k in range(data['xlimits'].shape[0])]
+        return cls(data['xlimits'], data['coeffs'], grids)
+
+    def export(self, dirname):
+        """
+        Write the table as raw .npy files that other processes can attach to
+        with `attach`.  The files are written to a temporary directory first and
+        renamed, so workers never see a partially written table.
+        """
+        parent = os.path.dirname(os.path.abspath(dirname))
+        makedirs(parent)
+
+        tmp_dirname = tempfile.mkdtemp(dir=parent)
+        np.save(os.path.join(tmp_dirname, 'xlimits.npy'), self.xlimits)
+        np.save(os.path.join(tmp_dirname, 'coeffs.npy'), np.ascontiguousarray(self.coeffs))
+        for name, grid in self._grid_arrays().items():
+            np.save(os.path.join(tmp_dirname, name + '.npy'), grid)
+        try:
+            os.rename(tmp_dirname, dirname)
+        except OSError:
+            # another process exported the same table first
+            shutil.rmtree(tmp_dirname)
+
+    @classmethod
+    def attach(cls, dirname):
+        """
+        Memory-map a table written by `export`.  The node data is opened
+        read-only and is never copied, so every process attached to the same
+        files shares one copy of it through the page cache.
+        """
+        xlimits = np.load(os.path.join(dirname, 'xlimits.npy'))
+        coeffs = np.load(os.path.join(dirname, 'coeffs.npy'), mmap_mode='r')
+        grids = None
+        if os.path.exists(os.path.join(dirname, 'grid_0.npy')):
+            grids = [np.load(os.path.join(dirname, 'grid_{}.npy'.format(k)))
+                     for k in range(xlimits.shape[0])]
+        return cls(xlimits, coeffs, grids)
+
+    def _locate(self, x):
+        """
+        Cell of each point, returned as the local coordinates t and cell widths h
+        (both of shape (n, nx)) and the node data of the cell corners.
+        """
+        if self.grids is None:
+            s = (x - self.xlimits[:, 0]) / self.h
+            idx = np.clip(np.floor(s).astype(int), 0, self.num_cells - 1)
+            t = s - idx
+            h = np.broadcast_to(self.h, x.shape)
+        else:
+            idx = np.empty(x.shape, dtype=int)
+            h = np.empty(x.shape)
+            t = np.empty(x.shape)
+            for k, grid in enumerate(self.grids):
+                idx[:, k] = np.clip(np.searchsorted(grid, x[:, k], side='right') - 1,
+                                    0, self.num_cells[k] - 1)
+                h[:, k] = grid[idx[:, k] + 1] - grid[idx[:, k]]
+                t[:, k] = (x[:, k] - grid[idx[:, k]]) / h[:, k]
+        base = idx.dot(self._strides)
+        corner_data = self._flat_coeffs[base[:, np.newaxis] + self._corner_offsets]
+        return t, h, corner_data
+
+    def _weights(self, bases):
+        """
+        Weight of each (corner, mask) entry as the product of the 1D bases,
+        shape (n, 2**nx, 2**nx).
+        """
+        weights = 1.
+        for k in range(self.nx):
+            w_k = bases[k][:, self._corners[:, k]][:, :, self._mask_bits[:, k]]
+            weights = weights * w_k
+        return weights
+
+    def predict_values(self, x):
+        x = np.atleast_2d(x)
+        t, h, corner_data = self._locate(x)
+        bases = [_hermite_basis(t[:, k], h[:, k])[0] for k in range(self.nx)]
+        return np.einsum('ncmy,ncm->ny', corner_data, self._weights(bases))
+
+    def predict_derivatives(self, x, kx):
+        x = np.atleast_2d(x)
+        t, h, corner_data = self._locate(x)
+        bases = []
+        for k in range(self.nx):
+            basis, dbasis = _hermite_basis(t[:, k], h[:, k])
+            bases.append(dbasis if k == kx else basis)
+        return np.einsum('ncmy,ncm->ny', corner_data, self._weights(bases))
@@ -0,0 +1,91 @@
+"""
+Measure the import time of the top-level entry points of the package.
+
+Each module is imported in a fresh interpreter, several times, and the median
+wall time is reported together with the heavy optional packages that ended up
+being imported.  Run with
+
+    python -m path_dependent_missions.utils.import_benchmark [module ...]
+"""
+from __future__ import print_function, division, absolute_import
+import sys
+import json
+import subprocess
+
+import numpy as np
+
+
+entry_points = [
+    'path_dependent_missions.thermal_mission.thermal_mission_problem',
+    'path_dependent_missions.thermal_mission.thermal_mission_trajectory',
+    'path_dependent_missions.thermal_mission.thermal_mission_ode',
+    'path_dependent_missions.escort.prop.smt_thrust_throttle',
+    'path_dependent_missions.escort.atmos.atmos_comp',
+    'path_dependent_missions.F110.smt_model',
+    'path_dependent_missions.utils.gen_mission_plot',
+    'path_dependent_missions.utils.traj_plot',
+    'path_dependent_missions.f110_pycycle.mixedflow_turbofan',
+]
+
+# Packages that should only be loaded when they are actually used
+heavy_modules = ['matplotlib', 'smt', 'pycycle', 'scipy.interpolate']
+
+_child_script = """
+import sys, time, json
+t0 = time.time()
+import {module}
+dt = time.time() - t0
+print(json.dumps({{'time': dt, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def time_import(module, num_repeats=5):
+    """
+    Import `module` in `num_repeats` fresh interpreters.
+
+    Returns
+    -------
+    dict
+        Median and minimum import time (s), the heavy modules that were loaded,
+        or the error message if the import failed.
+    """
+    script = _child_script.format(module=module, heavy=heavy_modules)
+
+    times = []
+    loaded = []
+    for i in range(num_repeats):
+        proc = subprocess.Popen([sys.executable, '-c', script],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = proc.communicate()
+        if proc.returncode != 0:
+            return {'error': err.decode().strip().splitlines()[-1]}
+        result = json.loads(out.decode().strip().splitlines()[-1])
+        times.append(result['time'])
+        loaded = result['loaded']
+
+    return {'median': float(np.median(times)), 'min': float(np.min(times)), 'loaded': loaded}
+
+
+def run_benchmark(modules=None, num_repeats=5):
+    if modules is None:
+        modules = entry_points
+
+    results = {}
+    for module in modules:
+        results[module] = time_import(module, num_repeats)
+    return results
+
+
+if __name__ == '__main__':
+    modules = sys.argv[1:] or entry_points
+    results = run_benchmark(modules)
+
+    width = max(len(module) for module in modules)
+    for module in modules:
+        result = results[module]
+        if 'error' in result:
+            print('{:{w}s}   failed: {}'.format(module, result['error'], w=width))
+        else:
+            print('{:{w}s} {:8.3f} s   heavy: {}'.format(module, result['median'],
+                                                        ', '.join(result['loaded']) or '-',
+                                                        w=width))
@@ -0,0 +1,310 @@
+"""
+Kreisselmeier-Steinhauser aggregation of Dymos path constraints.
+
+A path constraint adds one inequality row per node, so the thermal mission
+with 25 segments carries hundreds of rows.  With aggregation, each bound of a
+path constraint becomes one KS row per phase or per segment:
+
+    KS(s) = max(s) + log(sum(exp(rho * (s - max(s))))) / rho - log(n) / rho <= 0
+
+with s = (g - upper) / ref for an upper bound and (lower - g) / ref for a lower
+bound, over n nodes.  KS is a smooth estimate of max(s), closer to it for
+larger rho, with
+
+    max(s) - log(n) / rho <= KS(s) <= max(s)
+
+Without the log(n) / rho shift, KS would be strictly greater than max(s), so
+a bound met with equality at any node, like the altitude bounds, which the
+fixed initial altitude and the final altitude constraint reach, would make
+the problem infeasible.  With the shift, the aggregate can let the path
+constraint be violated by up to log(n) / rho, scaled, where several nodes are
+close to the bound: ref * log(n) / rho in the units of the constraint, e.g.
+1.7 km of altitude for ref = 20000 m, rho = 50 and n = 75.  That is too much
+to leave to the user, so use_exact_polish makes the final solve part of every
+run_driver: when the aggregated solution violates a path constraint, the
+per-node constraints are activated and the optimization continues from it,
+so the result meets the bounds at every node.  path_constraint_violations
+reports the violations.
+
+The per-node values are still computed by the phase's path constraint
+component; only their constraints are removed from the optimization, and
+they can be checked or activated again for a final, exact solve.
+"""
+from __future__ import print_function, division, absolute_import
+
+import numpy as np
+
+from openmdao.api import ExplicitComponent
+
+from path_dependent_missions.utils.problem_factory import set_constraint_bounds
+
+
+class KSComp(ExplicitComponent):
+    """
+    KS aggregate of the violation of a bound by the values of a path
+    constraint, over the nodes of a phase or of each of its segments.
+
+    The number of nodes is read from the grid data of the phase, so the
+    component must be added to the model after the phase.
+    """
+
+    def initialize(self):
+        self.options.declare('phase', desc='Phase whose path constraint is aggregated')
+        self.options.declare('upper', default=True, types=bool,
+                             desc='Aggregate g <= bound if True, g >= bound if False')
+        self.options.declare('segmented', default=False, types=bool,
+                             desc='One aggregate per segment instead of one for the phase')
+        self.options.declare('rho', default=50., types=float,
+                             desc='Aggregation parameter, for the scaled violations')
+        self.options.declare('ref', default=1., types=float,
+                             desc='Scale of the violations')
+        self.options.declare('units', default=None, allow_none=True,
+                             desc='Units of the path constraint and of its bound')
+        self.options.declare('bound', default=0., types=float,
+                             desc='Initial value of the bound input')
+
+    def setup(self):
+        gd = self.options['phase'].grid_data
+        nn = gd.num_nodes
+        units = self.options['units']
+
+        if self.options['segmented']:
+            self.groups = [(i0, i1) for i0, i1 in gd.segment_indices]
+        else:
+            self.groups = [(0, nn)]
+        ng = len(self.groups)
+
+        self.add_input('g', shape=nn, units=units, desc='path constraint values at all nodes')
+        self.add_input('bound', val=self.options['bound'], units=units)
+        self.add_output('KS', shape=ng, desc='aggregated scaled violation')
+
+        rows = np.hstack([np.full(i1 - i0, k) for k, (i0, i1) in enumerate(self.groups)])
+        cols = np.hstack([np.arange(i0, i1) for i0, i1 in self.groups])
+        self.declare_partials('KS', 'g', rows=rows, cols=cols)
+        self.declare_partials('KS', 'bound', val=(-1. if self.options['upper'] else 1.) / self.options['ref'])
+
+    def _violations(self, inputs):
+        sign = 1. if self.options['upper'] else -1.
+        return sign * (inputs['g'] - inputs['bound']) / self.options['ref']
+
+    def compute(self, inputs, outputs):
+        rho = self.options['rho']
+        s = self._violations(inputs)
+        for k, (i0, i1) in enumerate(self.groups):
+            s_k = s[i0:i1]
+            s_max = np.max(s_k)
+            outputs['KS'][k] = s_max + np.log(np.mean(np.exp(rho * (s_k - s_max)))) / rho
+
+    def compute_partials(self, inputs, partials):
+        rho = self.options['rho']
+        sign = 1. if self.options['upper'] else -1.
+        s = self._violations(inputs)
+
+        # the derivatives are the softmax weights of the violations
+        weights = []
+        for i0, i1 in self.groups:
+            w = np.exp(rho * (s[i0:i1] - np.max(s[i0:i1])))
+            weights.append(w / np.sum(w))
+        partials['KS', 'g'] = sign / self.options['ref'] * np.hstack(weights)
+
+
+def _ks_name(phase_name, con_name, upper):
+    return 'ks_{}_{}_{}'.format(phase_name, con_name, 'upper' if upper else 'lower')
+
+
+def add_ks_path_constraint(model, phase_name, phase, name, lower=None, upper=None, ref=1.,
+                           units=None, segmented=False, rho=50.):
+    """
+    Add the KS aggregates of the bounds of a path constraint of a phase, and
+    their constraints.  The path constraint itself must also be added to the
+    phase, with the same bounds, and removed from the optimization after setup
+    by deactivate_path_constraints.
+
+    Parameters
+    ----------
+    model : Group
+        Model containing the phase, before setup.
+    phase_name : str
+        Name of the phase in the model.
+    phase : Phase
+        The phase.
+    name : str
+        Name of the path constraint, as given to add_path_constraint.
+    lower, upper : float or None
+        Bounds of the path constraint.
+    ref : float
+        Scale of the violations.
+    units : str or None
+        Units of the path constraint and of the bounds.
+    segmented : bool
+        One aggregate per segment instead of one per phase.
+    rho : float
+        Aggregation parameter.
+    """
+    con_name = name.split('.')[-1]
+    for is_upper, bound in [(True, upper), (False, lower)]:
+        if bound is None:
+            continue
+        ks_name = _ks_name(phase_name, con_name, is_upper)
+        # the bound is an input, so that sweeps can change it without a new setup
+        model.add_subsystem(ks_name, KSComp(phase=phase, upper=is_upper, segmented=segmented,
+                                            rho=float(rho), ref=float(ref), units=units,
+                                            bound=float(bound)))
+        model.connect('{}.path_constraints.path:{}'.format(phase_name, con_name), ks_name + '.g')
+        model.add_constraint(ks_name + '.KS', upper=0.)
+
+
+def _path_responses(p, phase_name, names):
+    """
+    Systems and keys of the per-node response of each path constraint.
+    """
+    found = {}
+    for system in p.model.system_iter(include_self=False, recurse=True):
+        if not system.pathname.startswith(phase_name + '.'):
+            continue
+        prom2abs = system._var_allprocs_prom2abs_list['output']
+        for key in system._responses:
+            for name in names:
+                if key == 'path:' + name.split('.')[-1]:
+                    found[name] = (system, key, prom2abs[key][0])
+    missing = set(names) - set(found)
+    if missing:
+        raise KeyError("Phase '{}' has no path constraints {}".format(phase_name, sorted(missing)))
+    return found
+
+
+def _deactivate(p, responses):
+    inactive = p.model.__dict__.setdefault('inactive_path_constraints', {})
+    for abs_name, (system, key) in responses.items():
+        inactive[abs_name] = (system, key, system._responses.pop(key))
+
+    # gather the responses of the driver again
+    p.driver._update_voi_meta(p.model)
+
+
+def deactivate_path_constraints(p, phase_name, names):
+    """
+    Remove the per-node path constraints of a phase from the optimization,
+    after setup, once they are aggregated.  Their values are still computed.
+
+    The response metadata is kept in p.model.inactive_path_constraints, for
+    path_constraint_violations and activate_path_constraints.
+    """
+    _deactivate(p, dict((abs_name, (system, key)) for system, key, abs_name in
+                        _path_responses(p, phase_name, names).values()))
+
+
+def activate_path_constraints(p):
+    """
+    Put the per-node path constraints removed by deactivate_path_constraints
+    back into the optimization, e.g. to polish an aggregated solution.  The
+    KS constraints stay, and are inactive at a solution of the exact problem.
+    """
+    inactive = getattr(p.model, 'inactive_path_constraints', {})
+    for abs_name, (system, key, meta) in list(inactive.items()):
+        system._responses[key] = meta
+        del inactive[abs_name]
+
+    p.driver._update_voi_meta(p.model)
+
+
+def path_constraint_violations(p, scaled=False):
+    """
+    Largest violation of the bounds of each deactivated per-node path
+    constraint, in its units, or scaled like the constraint if `scaled`;
+    zero or negative where the bounds hold.
+    """
+    violations = {}
+    for abs_name, (system, key, meta) in getattr(p.model, 'inactive_path_constraints', {}).items():
+        scaler = 1. if meta.get('scaler') is None else meta['scaler']
+        adder = 0. if meta.get('adder') is None else meta['adder']
+        val = (p[abs_name] + adder) * scaler
+
+        violation = -np.inf
+        if meta.get('upper') is not None:
+            violation = max(violation, np.max(val - meta['upper']))
+        if meta.get('lower') is not None:
+            violation = max(violation, np.max(meta['lower'] - val))
+        violations[abs_name] = violation if scaled else violation / scaler
+    return violations
+
+
+def use_exact_polish(p, tol=1e-6):
+    """
+    Polish the aggregated solution of every run_driver of `p` with the exact
+    path constraints.
+
+    The KS aggregates may let a path constraint be violated by up to
+    ref * log(n) / rho.  After the aggregated optimization, if any scaled
+    violation is above `tol`, the per-node path constraints are activated and
+    the driver is run again from the aggregated solution, without the
+    pyOptSparse history files, which belong to the aggregated problem.  They
+    are deactivated again afterwards, so the next run starts aggregated too.
+
+    Parameters
+    ----------
+    p : OpenMDAO Problem instance
+        Problem whose path constraints were deactivated by
+        deactivate_path_constraints.
+    tol : float
+        Largest scaled violation left unpolished.
+    """
+    driver = p.driver
+    if getattr(driver, '_exact_polish', False):
+        return
+    driver._exact_polish = True
+
+    run = driver.run
+
+    def _run():
+        failed = run()
+
+        violations = path_constraint_violations(p, scaled=True)
+        if failed or not violations or max(violations.values()) <= tol:
+            return failed
+
+        print('Path constraints violated by up to {:.3g} (scaled), polishing with the exact '
+              'constraints'.format(max(violations.values())))
+
+        responses = dict((abs_name, (system, key)) for abs_name, (system, key, meta) in
+                         p.model.inactive_path_constraints.items())
+        activate_path_constraints(p)
+
+        files = getattr(driver, 'hotstart_file', None), getattr(driver, 'hist_file', None)
+        driver.hotstart_file = driver.hist_file = None
+        try:
+            failed = run()
+        finally:
+            driver.hotstart_file, driver.hist_file = files
+            _deactivate(p, responses)
+
+        return failed
+
+    driver.run = _run
+
+
+def set_path_constraint_bounds(p, phase_name, name, lower=None, upper=None):
+    """
+    Change the bounds of a path constraint after setup, whether or not it is
+    aggregated: the bound inputs of its KS components, the per-node
+    constraint if it is active, and its kept metadata otherwise.
+    """
+    con_name = name.split('.')[-1]
+    model = p.model
+    for is_upper, bound in [(True, upper), (False, lower)]:
+        ks_name = _ks_name(phase_name, con_name, is_upper)
+        if bound is not None and model._get_subsystem(ks_name) is not None:
+            p[ks_name + '.bound'] = bound
+
+    inactive = getattr(model, 'inactive_path_constraints', {})
+    for abs_name, (system, key, meta) in inactive.items():
+        if abs_name.startswith(phase_name + '.') and key == 'path:' + con_name:
+            scaler = 1. if meta.get('scaler') is None else meta['scaler']
+            adder = 0. if meta.get('adder') is None else meta['adder']
+            if lower is not None:
+                meta['lower'] = (lower + adder) * scaler
+            if upper is not None:
+                meta['upper'] = (upper + adder) * scaler
+            return
+
+    set_constraint_bounds(p, 'path:' + con_name, lower=lower, upper=upper)
@@ -0,0 +1,154 @@
+from __future__ import print_function, division, absolute_import
+import copy
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+class LRUCache(object):
+    """
+    Dictionary of bounded size that evicts the least recently used entry.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of entries.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        try:
+            val = self._data.pop(key)
+        except KeyError:
+            return None
+        self._data[key] = val
+        return val
+
+    def put(self, key, val):
+        self._data.pop(key, None)
+        self._data[key] = val
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+
+def design_vector_key(dv_dict, quantum=1e-12):
+    """
+    Hash of a design vector with every (scaled) value rounded to `quantum`,
+    so that points that differ by round-off only share a key.
+    """
+    h = hashlib.sha1()
+    for name in sorted(dv_dict):
+        h.update(name.encode())
+        h.update(np.round(np.asarray(dv_dict[name], dtype=float) / quantum).astype(np.int64).tobytes())
+    return h.hexdigest()
+
+
+def use_memoization(p, maxsize=50, quantum=1e-12):
+    """
+    Reuse the function and gradient evaluations of a pyOptSparseDriver at
+    design points it already evaluated.
+
+    Optimizers often come back to a point they already evaluated, e.g. at the
+    end of a line search or after a failed step, and every such request runs
+    the whole model or computes the total derivatives again.  The driver's
+    function and gradient callbacks are wrapped with LRU caches keyed on the
+    quantized (scaled) design vector.  A gradient requested at a point where
+    the function was memoized runs the model first, since the total
+    derivatives are linearized about the current model state.  Failed
+    evaluations are never cached.
+
+    The hits and misses of each run are printed at its end and kept in
+    p.driver.memo_stats.  It is opt-in, with memoize=True in the problem
+    builders: pyOptSparse already skips a function call at the last point,
+    and the runs so far came back to older points too rarely to make it the
+    default, but the hit rates tell whether it pays off for a given problem.
+
+    Parameters
+    ----------
+    p : OpenMDAO Problem instance
+        Problem with a pyOptSparseDriver.
+    maxsize : int
+        Number of function and of gradient evaluations kept.
+    quantum : float
+        Resolution of the scaled design variables in the cache key.
+    """
+    driver = p.driver
+    if getattr(driver, 'memo_stats', None) is not None:
+        return
+
+    func_cache = LRUCache(maxsize)
+    grad_cache = LRUCache(maxsize)
+    stats = driver.memo_stats = {'func_hits': 0, 'func_misses': 0,
+                                 'grad_hits': 0, 'grad_misses': 0}
+    # key of the design point at which the model was last run
+    model_key = [None]
+
+    objfunc = driver._objfunc
+    gradfunc = driver._gradfunc
+    run = driver.run
+
+    def _objfunc(dv_dict):
+        key = design_vector_key(dv_dict, quantum)
+        func_dict = func_cache.get(key)
+        if func_dict is not None:
+            stats['func_hits'] += 1
+            return copy.deepcopy(func_dict), False
+
+        stats['func_misses'] += 1
+        func_dict, fail = objfunc(dv_dict)
+        model_key[0] = key
+        if not fail:
+            func_cache.put(key, copy.deepcopy(func_dict))
+        return func_dict, fail
+
+    def _gradfunc(dv_dict, func_dict):
+        key = design_vector_key(dv_dict, quantum)
+        sens_dict = grad_cache.get(key)
+        if sens_dict is not None:
+            stats['grad_hits'] += 1
+            return copy.deepcopy(sens_dict), False
+
+        stats['grad_misses'] += 1
+        if model_key[0] != key:
+            objfunc(dv_dict)
+            model_key[0] = key
+
+        # the sparse jacobian arrays are reused by the driver from one call to
+        # the next, so the cache keeps its own copy
+        sens_dict, fail = gradfunc(dv_dict, func_dict)
+        if not fail:
+            grad_cache.put(key, copy.deepcopy(sens_dict))
+        return sens_dict, fail
+
+    def _run():
+        # the model may change between runs, e.g. in a sweep, so start empty
+        func_cache.clear()
+        grad_cache.clear()
+        model_key[0] = None
+        for name in stats:
+            stats[name] = 0
+
+        failed = run()
+
+        for kind in ('func', 'grad'):
+            hits, misses = stats[kind + '_hits'], stats[kind + '_misses']
+            total = hits + misses
+            print('Memoized {} evaluations: {} of {} ({:.1f} %)'.format(
+                'function' if kind == 'func' else 'gradient', hits, total,
+                100. * hits / total if total else 0.))
+
+        return failed
+
+    driver._objfunc = _objfunc
+    driver._gradfunc = _gradfunc
+    driver.run = _run
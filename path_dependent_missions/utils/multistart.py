@@ -0,0 +1,247 @@
+"""
+Multi-start optimization of the trajectory problems.
+
+The escort and climb problems are not convex, and the optimum they converge
+to depends on the linearly interpolated initial trajectories.  The runner
+samples the end points of those interpolations, either with a Latin
+hypercube over given ranges or as random perturbations of the nominal guess,
+and optimizes each start in a worker process.  Once enough converged starts
+agree on the best objective, the remaining ones are cancelled.  Run with
+
+    python -m path_dependent_missions.utils.multistart [num_starts [num_procs]]
+"""
+from __future__ import print_function, division, absolute_import
+import time
+import traceback
+from multiprocessing import Pool
+
+import numpy as np
+
+from path_dependent_missions.utils.sampling import lhs_sample
+
+
+def climb_guesses(meeting_altitude=20000., prefix='phase', state_nodes='state_input'):
+    """
+    Ranges of the initial guesses of a min time climb phase.  The initial
+    states are fixed to the values of the problems.
+
+    Returns
+    -------
+    dict
+        For each variable, the nodes of the interpolation and the lower and
+        upper values of its end points.
+    """
+    return {
+        prefix + '.states:r': (state_nodes, [0., 50.e3], [0., 200.e3]),
+        prefix + '.states:h': (state_nodes, [100., 0.5 * meeting_altitude], [100., 1.2 * meeting_altitude]),
+        prefix + '.states:v': (state_nodes, [135.964, 150.], [135.964, 450.]),
+        prefix + '.states:gam': (state_nodes, [0., -0.2], [0., 0.2]),
+        prefix + '.controls:alpha': ('all', [-2., -2.], [5., 5.]),
+    }
+
+
+def escort_guesses(meeting_altitude=11000.):
+    """
+    Ranges of the initial guesses of the climb and escort phases of the
+    escort problems.
+    """
+    guesses = climb_guesses(meeting_altitude, prefix='climb', state_nodes='disc')
+    guesses.update({
+        'escort.states:v': ('disc', [180., 180.], [320., 320.]),
+        'escort.controls:alpha': ('all', [-1., -1.], [3., 3.]),
+    })
+    return guesses
+
+
+def sample_guesses(guesses, num_starts, method='lhs', sigma=0.1, seed=0):
+    """
+    Sample initial guesses.
+
+    Parameters
+    ----------
+    guesses : dict
+        Ranges of the guesses, as returned by climb_guesses.
+    num_starts : int
+        Number of samples.
+    method : str
+        'lhs' for a maximin Latin hypercube over the ranges; 'perturb' for
+        normal perturbations of the middle of the ranges, with a standard
+        deviation of `sigma` times the range.  The first sample is always the
+        middle of the ranges.
+    seed : int
+        Random seed.
+
+    Returns
+    -------
+    list of dict
+        For each start, the nodes and end point values of each variable.
+    """
+    names = sorted(guesses)
+    lower = np.hstack([guesses[name][1] for name in names])
+    upper = np.hstack([guesses[name][2] for name in names])
+
+    np.random.seed(seed)
+    if method == 'lhs':
+        # fixed end points, e.g. the initial range, have a zero-width range
+        free = upper > lower
+        x = np.tile(lower, (num_starts, 1))
+        x[:, free] = lhs_sample(np.vstack((lower[free], upper[free])).T, num_starts, seed=seed)
+    elif method == 'perturb':
+        middle = 0.5 * (lower + upper)
+        x = middle + sigma * (upper - lower) * np.random.randn(num_starts, len(lower))
+        x[0] = middle
+        x = np.clip(x, lower, upper)
+    else:
+        raise ValueError("method must be 'lhs' or 'perturb', got '{}'".format(method))
+
+    samples = []
+    for row in x:
+        sample = {}
+        i = 0
+        for name in names:
+            n = len(guesses[name][1])
+            sample[name] = (guesses[name][0], row[i:i + n])
+            i += n
+        samples.append(sample)
+    return samples
+
+
+def set_guess(p, guess):
+    """
+    Set the interpolated initial trajectories of a sampled guess.
+    """
+    for name, (nodes, ys) in guess.items():
+        phase = p.model._get_subsystem(name.split('.')[0])
+        p[name] = phase.interpolate(ys=ys, nodes=nodes)
+
+
+def _run_start(args):
+    index, build, build_kwargs, guess = args
+
+    st = time.time()
+    result = {'index': index, 'status': 'failed', 'objective': np.inf, 'design': None,
+              'iterations': 0}
+    try:
+        p = build(**build_kwargs)
+        set_guess(p, guess)
+        failed = p.run_driver()
+    except Exception:
+        result['status'] = 'error'
+        result['error'] = traceback.format_exc()
+    else:
+        result['status'] = 'failed' if failed else 'converged'
+        result['objective'] = float(list(p.driver.get_objective_values(unscaled=True).values())[0][0])
+        result['design'] = p.driver.get_design_var_values()
+        result['iterations'] = p.driver.iter_count
+    result['time'] = time.time() - st
+
+    return result
+
+
+def multistart(build, guesses, build_kwargs=None, num_starts=8, method='lhs', sigma=0.1,
+               num_procs=None, num_agree=3, rtol=1e-4, seed=0):
+    """
+    Optimize a problem from several sampled initial guesses in parallel.
+
+    Parameters
+    ----------
+    build : callable
+        Module-level function returning the problem after setup, e.g.
+        min_time_climb_problem; it is called in each worker process.
+    guesses : dict
+        Ranges of the guesses, as returned by climb_guesses.
+    build_kwargs : dict or None
+        Arguments of `build`.
+    num_starts : int
+        Number of starts.
+    method : str
+        Sampling method, 'lhs' or 'perturb', see sample_guesses.
+    sigma : float
+        Relative standard deviation of the 'perturb' method.
+    num_procs : int or None
+        Number of worker processes, all the cores by default.
+    num_agree : int or None
+        Cancel the remaining starts once this many converged starts reach the
+        best objective within `rtol`; None runs all the starts.
+    rtol : float
+        Relative tolerance on the objective for starts to agree.
+    seed : int
+        Random seed of the sampling.
+
+    Returns
+    -------
+    dict or None
+        Result of the best converged start, with its 'objective', the scaled
+        'design' variable values and its 'guess'; None if no start converged.
+    list of dict
+        Result of every start: 'status' is 'converged', 'failed', 'error' or
+        'cancelled', with the 'objective', 'iterations' and 'time' of the
+        starts that ran.
+    """
+    if build_kwargs is None:
+        build_kwargs = {}
+
+    samples = sample_guesses(guesses, num_starts, method=method, sigma=sigma, seed=seed)
+    tasks = [(i, build, build_kwargs, guess) for i, guess in enumerate(samples)]
+
+    st = time.time()
+    results = [{'index': i, 'status': 'cancelled', 'objective': np.inf, 'iterations': 0, 'time': 0.}
+               for i in range(num_starts)]
+
+    pool = Pool(num_procs)
+    try:
+        for result in pool.imap_unordered(_run_start, tasks, chunksize=1):
+            results[result['index']] = result
+            print('start {}: {}, objective {:.6g}, {} iterations in {:.1f} s'.format(
+                result['index'], result['status'], result['objective'], result['iterations'],
+                result['time']))
+
+            if num_agree is None:
+                continue
+            objectives = np.array([r['objective'] for r in results if r['status'] == 'converged'])
+            if len(objectives) >= num_agree:
+                best = np.min(objectives)
+                if np.sum(objectives - best <= rtol * max(abs(best), 1.)) >= num_agree:
+                    break
+    finally:
+        # cancels the starts that are still running
+        pool.terminate()
+        pool.join()
+
+    converged = [r for r in results if r['status'] == 'converged']
+    best = min(converged, key=lambda r: r['objective']) if converged else None
+    if best is not None:
+        best['guess'] = samples[best['index']]
+
+    counts = dict((status, sum(r['status'] == status for r in results))
+                  for status in ['converged', 'failed', 'error', 'cancelled'])
+    print('{} starts in {:.1f} s: {converged} converged, {failed} failed, {error} errors, '
+          '{cancelled} cancelled'.format(num_starts, time.time() - st, **counts))
+    if best is not None:
+        print('best objective {:.6g} from start {}'.format(best['objective'], best['index']))
+
+    return best, results
+
+
+def apply_solution(p, result):
+    """
+    Set the design variables of a problem built like the multi-start problems
+    to the solution of a start, e.g. to warm start a finer mesh or to
+    post-process the best solution.
+    """
+    p.final_setup()
+    for name, val in result['design'].items():
+        p.driver.set_design_var(name, val)
+    p.run_model()
+
+
+if __name__ == "__main__":
+    import sys
+    from path_dependent_missions.escort.min_time_climb_problem import min_time_climb_problem
+
+    num_starts = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    num_procs = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    build_kwargs = {'optimizer': 'SNOPT', 'num_seg': 20, 'transcription_order': 3}
+    best, results = multistart(min_time_climb_problem, climb_guesses(20000.), build_kwargs,
+                               num_starts=num_starts, num_procs=num_procs)
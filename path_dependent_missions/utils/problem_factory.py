@@ -0,0 +1,114 @@
+from __future__ import print_function, division, absolute_import
+import json
+
+from path_dependent_missions.utils.coloring_cache import _stable_repr
+
+
+def set_constraint_bounds(p, name, lower=None, upper=None, equals=None):
+    """
+    Change the bounds of a constraint of a problem that is already set up.
+
+    The new bounds are given in the units of the constraint, and are scaled
+    like add_constraint does.  The driver metadata shares its dicts with the
+    response metadata of the systems, so the new bounds persist through
+    final_setup and are used by the next run_driver.
+
+    Parameters
+    ----------
+    p : Problem
+        Problem after setup.
+    name : str
+        Name of the constraint, or the end of it, e.g. 'path:T' for the path
+        constraint on 'T' of any phase.
+    """
+    if p.driver._cons is None:
+        # not gathered from the model until the first final_setup
+        p.driver._update_voi_meta(p.model)
+
+    matches = [key for key in p.driver._cons if key == name or key.endswith('.' + name)]
+    if len(matches) != 1:
+        raise KeyError("Found {} constraints matching '{}': {}".format(len(matches), name, matches))
+    meta = p.driver._cons[matches[0]]
+
+    scaler = 1. if meta.get('scaler') is None else meta['scaler']
+    adder = 0. if meta.get('adder') is None else meta['adder']
+
+    if lower is not None:
+        meta['lower'] = (lower + adder) * scaler
+    if upper is not None:
+        meta['upper'] = (upper + adder) * scaler
+    if equals is not None:
+        meta['equals'] = (equals + adder) * scaler
+
+
+class ProblemFactory(object):
+    """
+    Build problems once per model structure and reuse them for sweeps.
+
+    The options of a problem builder are split between the options that
+    change the model structure (number of segments, which controls are
+    optimized, which constraints exist, ...) and the options that only change
+    values (design parameters, bounds, initial guesses).  `reconfigure`
+    returns the set-up problem of the structure, building it only the first
+    time, and applies the value options in place.  Setup, coloring and
+    surrogate training are thus skipped for every sweep point after the first.
+
+    Parameters
+    ----------
+    build : callable
+        build(**options) returns a problem after setup.
+    configure : callable
+        configure(p, guesses, **options) sets the values, bounds and, if
+        `guesses` is True, the initial guesses of a problem; it gets all the
+        options.
+    value_options : list of str
+        Names of the options that do not change the structure.
+    structure_key : callable or None
+        structure_key(options) returns additional hashable data that decides
+        the structure, for value options that also change the structure in
+        some cases (e.g. a bound of None meaning no constraint).
+    defaults : dict or None
+        Default value of every option.
+    """
+
+    def __init__(self, build, configure, value_options, structure_key=None, defaults=None):
+        self.build = build
+        self.configure = configure
+        self.value_options = set(value_options)
+        self.structure_key = structure_key
+        self.defaults = {} if defaults is None else dict(defaults)
+        self.problems = {}
+        self.num_builds = 0
+
+    def _key(self, options):
+        structure = dict((k, v) for k, v in options.items() if k not in self.value_options)
+        extra = None if self.structure_key is None else self.structure_key(options)
+        return json.dumps(_stable_repr([structure, extra]))
+
+    def reconfigure(self, warm_start=False, **options):
+        """
+        Return the problem for `options`, set up once per structure.
+
+        Parameters
+        ----------
+        warm_start : bool
+            Keep the current values of the problem (e.g. the solution of the
+            previous sweep point) as the initial guess instead of resetting it.
+        **options
+            Options of the problem builder.
+        """
+        all_options = dict(self.defaults)
+        all_options.update(options)
+
+        key = self._key(all_options)
+        if key in self.problems:
+            p = self.problems[key]
+            guesses = not warm_start
+        else:
+            p = self.problems[key] = self.build(**all_options)
+            self.num_builds += 1
+            guesses = True
+
+        self.configure(p, guesses, **all_options)
+
+        return p
@@ -0,0 +1,40 @@
+from __future__ import print_function, division, absolute_import
+import numpy as np
+
+
+def lhs_sample(xlimits, num, seed=None, criterion='maximin'):
+    """
+    Latin hypercube sample with the SMT LHS, reproducible for a given seed.
+
+    SMT 2.x draws from its own generator, seeded by the `seed` option, and
+    ignores np.random.seed; SMT 1.x takes the seed as `random_state`; older
+    versions draw from the global numpy generator.
+
+    Parameters
+    ----------
+    xlimits : ndarray
+        Lower and upper bound of each input, shape (nx, 2).
+    num : int
+        Number of samples.
+    seed : int or None
+        Random seed.
+    criterion : str
+        LHS criterion.
+
+    Returns
+    -------
+    ndarray
+        Samples, shape (num, nx).
+    """
+    from smt.sampling_methods import LHS
+
+    # the generator is created in the constructor, so the seed is passed to it
+    declared = LHS(xlimits=xlimits).options
+    kwargs = {}
+    if declared.is_declared('seed'):
+        kwargs['seed'] = seed
+    elif declared.is_declared('random_state'):
+        kwargs['random_state'] = seed
+    elif seed is not None:
+        np.random.seed(seed)
+    return LHS(xlimits=xlimits, criterion=criterion, **kwargs)(num)
@@ -0,0 +1,165 @@
+from __future__ import print_function, division, absolute_import
+import os
+import pickle
+import hashlib
+from numbers import Integral
+
+import numpy as np
+from smt.surrogate_models import RMTB, RMTC
+
+from path_dependent_missions.utils.cache import atomic_write
+
+
+class WarmStartMixin(object):
+    """
+    Incremental training for the RMTS surrogates.
+
+    The regularization and energy terms of the RMTS Hessian only depend on the
+    spline structure (bounds, number of control points or elements, order,
+    smoothness and weights), not on the training data.  When the structure is
+    unchanged from the previous training, those terms are reused and the Newton
+    solve starts from the previous control-point coefficients, so appending or
+    correcting a few training points only costs a handful of Newton iterations.
+    Any structural change falls back to a training from scratch, and so does
+    a warm start that has not converged to `solver_tolerance` within
+    `warm_start_maxiter` iterations.
+
+    The state is kept in a pickle file given by the `state_file` option, so the
+    warm start also works across runs.
+    """
+
+    def _initialize(self):
+        super(WarmStartMixin, self)._initialize()
+        declare = self.options.declare
+
+        declare('state_file', None, values=(None,), types=str,
+                desc='File holding the state of the previous training; None means no warm start')
+        declare('warm_start_maxiter', 5, types=Integral,
+                desc='Maximum number of nonlinear solver iterations when warm starting')
+
+    def _structure_signature(self):
+        options = self.options
+        structure = [self.name, self.num['x'], self.num['y'], self.num['dof'],
+                     options['xlimits'], options['smoothness'], options['min_energy'],
+                     options['energy_weight'], options['regularization_weight']]
+        for name in ('num_ctrl_pts', 'order', 'num_elements'):
+            if name in options._dict:
+                structure.append(options[name])
+        return hashlib.md5(pickle.dumps([np.asarray(val).tolist() for val in structure])).hexdigest()
+
+    def _data_signature(self):
+        data = []
+        for kx in sorted(self.training_points[None]):
+            xt, yt = self.training_points[None][kx]
+            data.extend([kx, xt.tobytes(), yt.tobytes()])
+        return hashlib.md5(pickle.dumps([self.options['approx_order'], data])).hexdigest()
+
+    def _load_state(self):
+        filename = self.options['state_file']
+        if filename is None or not os.path.exists(filename):
+            return None
+        try:
+            with open(filename, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+    def _save_state(self, structure, data):
+        filename = self.options['state_file']
+        if filename is None:
+            return
+
+        state = {
+            'structure': structure,
+            'data': data,
+            'sol': self.sol,
+            'mtx': self.mtx,
+            'full_dof2coeff': self.full_dof2coeff,
+            'full_hess': self.full_hess,
+        }
+        with atomic_write(filename) as f:
+            pickle.dump(state, f)
+
+    def _converged(self, sol):
+        options = self.options
+        p = options['approx_order']
+        for ind_y in range(sol.shape[1]):
+            yt_dict = self._get_yt_dict(ind_y)
+            if self._opt_norm(sol[:, ind_y], p, yt_dict) > options['solver_tolerance']:
+                return False
+        return True
+
+    def _warm_train(self, state):
+        """
+        Newton solve from the previous solution, with at most
+        `warm_start_maxiter` iterations.  Returns False, without setting the
+        solution, if it has not converged.
+        """
+        options = self.options
+
+        self.full_dof2coeff = state['full_dof2coeff']
+        self.full_hess = state['full_hess']
+        self.mtx = state['mtx']
+
+        with self.printer._timed_context('Computing approximation terms', 'approx'):
+            self.full_jac_dict = self._compute_approx_terms()
+
+        with self.printer._timed_context('Warm starting nonlinear problem', 'total_solution'):
+            sol = np.array(state['sol'])
+
+            nonlinear_maxiter = options['nonlinear_maxiter']
+            options['nonlinear_maxiter'] = options['warm_start_maxiter']
+            try:
+                self._run_newton_solver(sol)
+            finally:
+                options['nonlinear_maxiter'] = nonlinear_maxiter
+
+            if not self._converged(sol):
+                return False
+
+            self.sol = sol
+
+        if self.full_dof2coeff is not None:
+            self.sol_coeff = self.full_dof2coeff * self.sol
+        else:
+            self.sol_coeff = self.sol
+        return True
+
+    def _train(self):
+        """
+        Train the model, reusing the previous training when possible.
+        """
+        self._setup()
+
+        structure = self._structure_signature()
+        data = self._data_signature()
+        state = self._load_state()
+
+        if state is not None and state['structure'] == structure:
+            if state['data'] == data:
+                self.printer('Training data unchanged; reusing the previous solution')
+                self.full_dof2coeff = state['full_dof2coeff']
+                self.full_hess = state['full_hess']
+                self.mtx = state['mtx']
+                self.full_jac_dict = self._compute_approx_terms()
+                self.sol = state['sol']
+                if self.full_dof2coeff is not None:
+                    self.sol_coeff = self.full_dof2coeff * self.sol
+                else:
+                    self.sol_coeff = self.sol
+                return
+            if not self._warm_train(state):
+                self.printer('Warm start not converged; training from scratch')
+                self._new_train()
+        else:
+            self._new_train()
+
+        self._save_state(structure, data)
+
+
+class WarmStartRMTB(WarmStartMixin, RMTB):
+    pass
+
+
+class WarmStartRMTC(WarmStartMixin, RMTC):
+    pass
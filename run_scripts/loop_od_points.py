@@ -1,121 +1,30 @@
 from pprint import pprint as pp
 import numpy as np
 
-from openmdao.api import Problem, IndepVarComp
-
 from path_dependent_missions.f110_pycycle import mixedflow_turbofan as mftf
+from path_dependent_missions.f110_pycycle.od_cases import OD_CASES
+from path_dependent_missions.f110_pycycle.od_cache import ODPointCache, get_design_inputs, \
+                                                         get_point_states, set_point_states
+from path_dependent_missions.f110_pycycle.od_problem import build_grouped_od_problem
+from path_dependent_missions.f110_pycycle.grouped_od import point_names, set_od_guesses, run_grouped_points
 
 
-prob = Problem()
-
-des_vars = prob.model.add_subsystem('des_vars', IndepVarComp(), promotes=["*"])
-
-##########################################
-#  Design Variables
-##########################################
-des_vars.add_output('alt', 0., units='ft') #DV
-des_vars.add_output('MN', 0.001) #DV
-des_vars.add_output('T4max', 3200, units='degR')
-des_vars.add_output('T4maxab', 3400, units='degR')
-des_vars.add_output('Fn_des', 17000., units='lbf')
-des_vars.add_output('Mix_ER', 1.05 ,units=None) # defined as 1 over 2
-des_vars.add_output('fan:PRdes', 3.3) #ADV
-des_vars.add_output('hpc:PRdes', 9.3)
-
-#####################
-# DESIGN CASE
-#####################
-
-prob.model.add_subsystem('DESIGN', mftf.MixedFlowTurbofan(design=True))
-
-prob.model.connect('alt', 'DESIGN.fc.alt')
-prob.model.connect('MN', 'DESIGN.fc.MN')
-prob.model.connect('Fn_des', 'DESIGN.balance.rhs:W')
-prob.model.connect('T4max', 'DESIGN.balance.rhs:FAR_core')
-prob.model.connect('T4maxab', 'DESIGN.balance.rhs:FAR_ab')
-prob.model.connect('Mix_ER', 'DESIGN.balance.rhs:BPR')
-
-prob.model.connect('fan:PRdes', 'DESIGN.fan.map.PRdes')
-
-prob.model.connect('hpc:PRdes', 'DESIGN.hpc.map.PRdes')
-
-
-######################
-# ONE OFF DESIGN CASE
-######################
-
-
-des_vars.add_output('OD:alt', val=0.0, units='ft')
-des_vars.add_output('OD:MN', val=0.001)
-
-mftf.connect_des_data(prob, 'DESIGN', 'OD')
-
-prob.model.add_subsystem('OD', mftf.MixedFlowTurbofan(design=False))
-
-prob.model.connect('OD:alt', 'OD.fc.alt')
-prob.model.connect('OD:MN', 'OD.fc.MN')
-prob.model.connect('OD:vabi_control', 'OD.vabi.fact')
-prob.model.connect('OD:hpc_control', 'OD.hpc.map.alphaMap')
-prob.model.connect('OD:fan_control', 'OD.fan.map.alphaMap')
+NUM_OD_CASES = np.sum([len(row) for row in OD_CASES])
 
-prob.model.connect('T4max', 'OD.far_core_bal.T_requested')
-prob.model.connect('T4maxab', 'OD.balance.rhs:FAR_ab')
 
-OD_CASES = [
-    [(0.001, 0.0, 0.0, 0.0, 1.0),(.2, 0.0, 0.0, 0.0, 1.0)],
-    [(0.001, 1000., 0.0, 0.0, 1.0),(.2, 1000., 0.0, 0.0, 1.0)],
-    [(0.001, 5000., 0.0, 0.0, 1.0),(.2, 5000., 0.0, 0.0, 1.0)],
-    [(0.001, 10000., 0.0, 0.0, 1.0),(.2, 10000., 0.0, 0.0, 1.0)],
-    [(0.001, 15000., 0.0, 0.0, 1.0),(.2, 15000., 0.0, 0.0, 1.0)],
-    [(0.001, 17000., 0.0, 0.0, 1.0),(.2, 17000., 0.0, 0.0, 1.0)],
-    [(0.2, 20000., 0.0, 0.0, 1.0),(.4, 20000., 0.0, 0.0, 1.0),(.6, 20000, 0.0, 0.0, 1.0), (.8, 20000, 0.0, 0.0, 1.0)],
-    [(0.2, 25000., 0.0, 0.0, 1.0),(.4, 25000., 0.0, 0.0, 1.0),(.6, 25000., 0.0, 0.0, 1.0), (.8, 25000., 0.0, 0.0, 1.0),(1.0, 25000., 0.0, 0.0, 1.0), (1.2, 25000., 0.0, 0.0, 1.0), (.9, 25000, 0.0, 0.0, 1.0), (.7, 25000, 0.0, 0.0, 1.0), (.5, 25000, 0.0, 0.0, 1.0)],
-    [(.6, 30000, 0.0, 0.0, 1.0), (.8, 30000, 0.0, 0.0, 1.0),(1.0, 30000, 0.0, 0.0, 1.0), (1.2, 30000, 0.0, 0.0, 1.0), (1.4, 30000, 0.0, 0.0, 1.0), (1.6, 30000, 0.0, 0.0, 1.0), (1.3, 30000, 0.0, 0.0, 1.0), (1.1, 30000, 0.0, 0.0, 1.0), (.9, 30000, 0.0, 0.0, 1.0), (.7, 30000, 0.0, 0.0, 1.0), (.5, 30000, 0.0, 0.0, 1.0)],
-    [(.6, 40000, 0.0, 0.0, 1.0), (.8, 40000, 0.0, 0.0, 1.0),(1.0, 40000, 0.0, 0.0, 1.0), (1.2, 40000, 0.0, 0.0, 1.0), (1.4, 40000, 0.0, 0.0, 1.0), (1.6, 40000, 0.0, 0.0, 1.0), (1.3, 40000, 0.0, 0.0, 1.0), (1.1, 40000, 0.0, 0.0, 1.0), (.9, 40000, 0.0, 0.0, 1.0), (.7, 40000, 0.0, 0.0, 1.0)],
-]
+#####################################
+# OFF DESIGN CASES, ONE ROW AT A TIME
+#####################################
+# each row of OD_CASES is solved as one GroupedOD group; the problems are
+# built once per row length, and design inputs that match give the same
+# OD cache keys in all of them
+problems = {}
 
-NUM_OD_CASES = np.sum([len(row) for row in OD_CASES])
+def get_problem(num_points):
+    if num_points not in problems:
+        problems[num_points] = build_grouped_od_problem(num_points)
+    return problems[num_points]
 
-##########################################
-#  Control Variables
-##########################################]
-# Note: note sure what the range should be here, but probably around .8-1.2 ish is a good start
-des_vars.add_output('OD:vabi_control', val=1)
-des_vars.add_output('OD:hpc_control', val=0)
-des_vars.add_output('OD:fan_control', val=0)
-
-
-# setup problem
-prob.setup(check=False)#True)
-
-# initial guesses
-prob['DESIGN.balance.FAR_core'] = 0.025
-prob['DESIGN.balance.FAR_ab'] = 0.025
-prob['DESIGN.balance.BPR'] = 0.85
-prob['DESIGN.balance.W'] = 150.
-prob['DESIGN.balance.lpt_PR'] = 3.5
-prob['DESIGN.balance.hpt_PR'] = 2.5
-prob['DESIGN.fc.balance.Pt'] = 14.
-prob['DESIGN.fc.balance.Tt'] = 500.0
-prob['DESIGN.mixer.balance.P_tot']= 72.
-
-prob['OD.far_core_bal.FAR'] = 0.028
-prob['OD.balance.FAR_ab'] = 0.034
-prob['OD.balance.BPR'] = .9
-prob['OD.balance.W'] = 157.225
-prob['OD.balance.HP_Nmech'] = 1.
-prob['OD.balance.LP_Nmech'] = 1.
-prob['OD.fc.balance.Pt'] = 14.696
-prob['OD.fc.balance.Tt'] = 518.67
-prob['OD.mixer.balance.P_tot'] = 72. # 380.
-prob['OD.hpt.PR'] = 3.439
-prob['OD.lpt.PR'] = 2.438
-prob['OD.fan.map.RlineMap'] = 2.0
-prob['OD.hpc.map.RlineMap'] = 2.0
-
-
-prob.set_solver_print(level=-1)
-prob.set_solver_print(level=2, depth=1)
 
 # OD CASES (MN, alt) #each row is one altitude, but data does not necessarily need to be structured
 # OD_CASES = [
@@ -149,66 +58,89 @@ data = {
 }
 
 
-guess_vars = ['OD.far_core_bal.FAR', 'OD.balance.FAR_ab', 'OD.balance.BPR', 'OD.balance.W', 'OD.balance.HP_Nmech', 'OD.balance.LP_Nmech',
-              'OD.fc.balance.Pt', 'OD.fc.balance.Tt', 'OD.mixer.balance.P_tot', 'OD.hpt.PR', 'OD.lpt.PR', 'OD.fan.map.RlineMap', 'OD.hpc.map.RlineMap']
+output_vars = ['augmentor.Wfuel', 'augmentor.Fl_O:stat:W', 'burner.Wfuel', 'burner.Fl_O:stat:W',
+               'perf.Fn', 'inlet.F_ram', 'balance.W', 'balance.BPR', 'hp_shaft.Nmech',
+               'lp_shaft.Nmech', 'nozzle.PR', 'hpc.eff', 'fan.eff', 'hpc.map.readMap.NcMap',
+               'fan.map.readMap.NcMap']
 
-for i, row in enumerate(OD_CASES):
-    for j, (MN, alt, hpc_control, fan_control, vabi_control) in enumerate(row):
-        prob['OD:MN'] = MN
-        prob['OD:alt'] = alt
-        prob['OD:hpc_control'] = hpc_control
-        prob['OD:fan_control'] = fan_control
-        prob['OD:vabi_control'] = vabi_control
-
-        print('\n\n\n\n### MN: {} alt {}'.format(MN, alt))
-        prob.run_model()
-        if i == 0 and j==0:
-            mftf.page_viewer(prob, 'DESIGN')
-        mftf.page_viewer(prob, 'OD')
+# converged points are reused as long as the design inputs do not change
+cache = ODPointCache()
+# converged states and point of each Mach number of the previous row; every
+# row continues from the one below it, with less mass flow as the altitude
+# always increases
+prev_states = None
+prev_points = None
 
+for i, row in enumerate(OD_CASES):
+    prob = get_problem(len(row))
+    design_inputs = get_design_inputs(prob)
+    od_pts = ['OD.' + pt for pt in point_names(len(row))]
+
+    cases = np.array(row)
+    prob['OD.conditions.MN'] = cases[:, 0]
+    prob['OD.conditions.alt'] = cases[:, 1]
+    prob['OD.conditions.hpc_control'] = cases[:, 2]
+    prob['OD.conditions.fan_control'] = cases[:, 3]
+    prob['OD.conditions.vabi_control'] = cases[:, 4]
+
+    print('\n\n\n\n### alt {}'.format(row[0][1]))
+    points = dict(zip(od_pts, row))
+    guess_points = {}
+    set_od_guesses(prob, 'OD', len(row))
+    if prev_states is not None:
+        for j, pt in enumerate(od_pts):
+            # the point of the previous row with the closest Mach number
+            k = np.argmin([abs(point[0] - row[j][0]) for point in prev_points])
+            states = dict(prev_states[k])
+            states['balance.W'] = states['balance.W']*.75 #ditry hack, cause altitude is always increasing so mass flow should always decrease
+            set_point_states(prob, pt, states, 'OD')
+            guess_points[pt] = prev_points[k]
+
+    prob.set_solver_print(level=-1)
+    prob.set_solver_print(level=2, depth=2)
+
+    out, failed = run_grouped_points(prob, 'OD', cache, design_inputs, points, output_vars=output_vars,
+                                     guess_points=guess_points)
+    if failed:
+        # the converged points are in the data, but the page views tell why the others failed
+        print('not converged, not cached: {}'.format(', '.join(failed)))
+        for pt in failed:
+            mftf.page_viewer(prob, pt)
+
+    prev_states = [get_point_states(prob, pt, 'OD') for pt in od_pts]
+    prev_points = row
+
+    for pt, (MN, alt, hpc_control, fan_control, vabi_control) in zip(od_pts, row):
         # save the data
         # FAR are nasty to compute... need to make this easier
-        W_fuel = prob['OD.augmentor.Wfuel'][0]
-        W_tot = prob['OD.augmentor.Fl_O:stat:W'][0]
+        W_fuel = out[pt]['augmentor.Wfuel'][0]
+        W_tot = out[pt]['augmentor.Fl_O:stat:W'][0]
         W_air = W_tot - W_fuel
         FAR = W_fuel/W_air
         data['FAR_ab'].append(FAR)
 
-        W_fuel = prob['OD.burner.Wfuel'][0]
-        W_tot = prob['OD.burner.Fl_O:stat:W'][0]
+        W_fuel = out[pt]['burner.Wfuel'][0]
+        W_tot = out[pt]['burner.Fl_O:stat:W'][0]
         W_air = W_tot - W_fuel
         FAR = W_fuel/W_air
         data['FAR_core'].append(FAR)
 
-        data['Fnet'].append(prob['OD.perf.Fn'][0])
-        data['Fram'].append(prob['OD.inlet.F_ram'][0])
-        data['W'].append(prob['OD.balance.W'][0])
-        data['BPR'].append(prob['OD.balance.BPR'][0])
-        data['hp_nmech'].append(prob['OD.hp_shaft.Nmech'][0])
-        data['lp_nmech'].append(prob['OD.lp_shaft.Nmech'][0])
-        data['NPR'].append(prob['OD.nozzle.PR'][0])
-        data['hpc_eff'].append(prob['OD.hpc.eff'][0])
-        data['fan_eff'].append(prob['OD.fan.eff'][0])
-        data['hpc_Nc'].append(prob['OD.hpc.map.readMap.NcMap'])
-        data['fan_Nc'].append(prob['OD.fan.map.readMap.NcMap'])
+        data['Fnet'].append(out[pt]['perf.Fn'][0])
+        data['Fram'].append(out[pt]['inlet.F_ram'][0])
+        data['W'].append(out[pt]['balance.W'][0])
+        data['BPR'].append(out[pt]['balance.BPR'][0])
+        data['hp_nmech'].append(out[pt]['hp_shaft.Nmech'][0])
+        data['lp_nmech'].append(out[pt]['lp_shaft.Nmech'][0])
+        data['NPR'].append(out[pt]['nozzle.PR'][0])
+        data['hpc_eff'].append(out[pt]['hpc.eff'][0])
+        data['fan_eff'].append(out[pt]['fan.eff'][0])
+        data['hpc_Nc'].append(out[pt]['hpc.map.readMap.NcMap'])
+        data['fan_Nc'].append(out[pt]['fan.map.readMap.NcMap'])
 
 
         data['MN'].append(MN)
         data['alt'].append(alt)
 
-        if i == 0:
-            #save_guesses
-
-            guesses = {}
-            for var in guess_vars:
-                guesses[var] = prob[var]
-
-    if i > 0: # after the first set of altitude cases, reset the guesses back to MN = 0
-        for var in guess_vars:
-            prob[var] = guesses[var]
-        prob['OD.balance.W'] = guesses['OD.balance.W']*.75 #ditry hack, cause altitude is always increasing so mass flow should always decrease
+print('OD cache: {} hits, {} seeded, {} solved from scratch'.format(cache.hits, cache.near_misses, cache.misses))
 
 pp(data)
-
-
-
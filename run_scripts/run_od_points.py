@@ -3,6 +3,9 @@ import numpy as np
 from openmdao.api import Problem, IndepVarComp
 
 from path_dependent_missions.f110_pycycle import mixedflow_turbofan as mftf
+from path_dependent_missions.f110_pycycle.grouped_od import GroupedOD, point_names, set_od_guesses, \
+                                                          run_grouped_points
+from path_dependent_missions.f110_pycycle.od_cache import ODPointCache, get_design_inputs
 
 
 prob = Problem()
@@ -42,37 +45,19 @@ prob.model.connect('hpc:PRdes', 'DESIGN.hpc.map.PRdes')
 ####################
 # OFF DESIGN CASES
 ####################
-od_pts = ['OD_DES_CHECK','OD0', 'OD1', 'OD2', 'OD3']
-# od_pts = []
-
 od_alts = [0,     0,   20000, 20000, 20000]
 od_MNs =  [0.001, 0.5, 0.5, 0.5, .5]
-
-des_vars.add_output('OD:alts', val=od_alts, units='ft')
-des_vars.add_output('OD:MNs', val=od_MNs)
-
-
-##########################################
-#  Control Variables
-##########################################]
 # Note: note sure what the range should be here, but probably around .8-1.2 ish is a good start
-des_vars.add_output('OD:vabi_fact', val=[1,1,1,.8, 1.2])
-des_vars.add_output('OD:hpc_control', val=[0,0,0,0,0])
-des_vars.add_output('OD:fan_control', val=[0,0,0,0,0])
-
-mftf.connect_des_data(prob, 'DESIGN', od_pts)
-
-for i,pt in enumerate(od_pts):
-    prob.model.add_subsystem(pt, mftf.MixedFlowTurbofan(design=False))
+od_vabi_fact = [1,1,1,.8, 1.2]
+od_hpc_control = [0,0,0,0,0]
+od_fan_control = [0,0,0,0,0]
 
-    prob.model.connect('OD:alts', pt+'.fc.alt', src_indices=[i,])
-    prob.model.connect('OD:MNs', pt+'.fc.MN', src_indices=[i,])
-    prob.model.connect('OD:vabi_fact', pt+'.vabi.fact', src_indices=[i,])
-    prob.model.connect('OD:hpc_control', pt+'.hpc.map.alphaMap', src_indices=[i,])
-    prob.model.connect('OD:fan_control', pt+'.fan.map.alphaMap', src_indices=[i,])
+# all the off-design points are converged together, the first one being the design check
+num_points = len(od_alts)
+prob.model.add_subsystem('OD', GroupedOD(num_points=num_points))
+od_pts = ['OD.' + pt for pt in point_names(num_points)]
 
-    prob.model.connect('T4max', pt+'.far_core_bal.T_requested')
-    prob.model.connect('T4maxab', pt+'.balance.rhs:FAR_ab')
+mftf.connect_des_data(prob, 'DESIGN', od_pts)
 
 
 # setup problem
@@ -89,45 +74,50 @@ prob['DESIGN.fc.balance.Pt'] = 14.
 prob['DESIGN.fc.balance.Tt'] = 500.0
 prob['DESIGN.mixer.balance.P_tot']= 72.
 
+prob['OD.conditions.alt'] = od_alts
+prob['OD.conditions.MN'] = od_MNs
+prob['OD.conditions.vabi_control'] = od_vabi_fact
+prob['OD.conditions.hpc_control'] = od_hpc_control
+prob['OD.conditions.fan_control'] = od_fan_control
+
+set_od_guesses(prob, 'OD', num_points)
 for pt in od_pts:
-    prob[pt+'.far_core_bal.FAR'] = 0.028
-    prob[pt+'.balance.FAR_ab'] = 0.034
-    prob[pt+'.balance.BPR'] = .9
-    prob[pt+'.balance.W'] = 157.225
-    prob[pt+'.balance.HP_Nmech'] = 1.
-    prob[pt+'.balance.LP_Nmech'] = 1.
-    prob[pt+'.fc.balance.Pt'] = 14.696
-    prob[pt+'.fc.balance.Tt'] = 518.67
     prob[pt+'.mixer.balance.P_tot'] = 72. # 380.
-    prob[pt+'.hpt.PR'] = 3.439
-    prob[pt+'.lpt.PR'] = 2.438
-    prob[pt+'.fan.map.RlineMap'] = 2.0
-    prob[pt+'.hpc.map.RlineMap'] = 2.0
 
 # model is very sensitive to mass flow guesses, and higher altitudes have less mass-flow
-prob['OD1.balance.W'] = 80
-prob['OD2.balance.W'] = 80
-prob['OD3.balance.W'] = 80
+for pt, alt in zip(od_pts, od_alts):
+    if alt > 0:
+        prob[pt+'.balance.W'] = 80
+
+# a full hit returns the stored outputs without solving; otherwise start from
+# the converged points of earlier runs with the same design inputs
+cache = ODPointCache()
+design_inputs = get_design_inputs(prob)
+od_points = dict((pt, case) for pt, case in zip(od_pts, zip(od_MNs, od_alts, od_hpc_control,
+                                                            od_fan_control, od_vabi_fact)))
+output_vars = ['perf.Fn', 'perf.TSFC']
 
-
-# prob.model.DESIGN.nonlinear_solver.options['maxiter'] = 3
-# prob.model.OD1.nonlinear_solver.options['maxiter'] = 0
 prob.set_solver_print(level=-1)
-prob.set_solver_print(level=2, depth=1)
-
-prob.run_model()
-
-# prob.model.DESIGN.mixer.list_outputs(residuals=True, units=True, residuals_tol=1e-3, prom_name=True)
-# prob.model.DESIGN.mixer.list_outputs(residuals=True, units=True, prom_name=True)
-# prob.model.DESIGN.fc.list_inputs()
+prob.set_solver_print(level=2, depth=2)
 
+outputs, failed = run_grouped_points(prob, 'OD', cache, design_inputs, od_points, output_vars=output_vars)
+if failed:
+    print('not converged, not cached: {}'.format(', '.join(failed)))
 
+for pt in od_pts:
+    print('{:>12s}  MN {:5.3f}  alt {:7.0f} ft  Fn {:9.1f} lbf  TSFC {:7.4f}'.format(
+        pt, od_points[pt][0], od_points[pt][1], outputs[pt]['perf.Fn'][0],
+        outputs[pt]['perf.TSFC'][0]))
 
-mftf.page_viewer(prob, 'DESIGN')
-print(3*"\n")
+if cache.hits < len(od_pts):
+    # prob.model.DESIGN.mixer.list_outputs(residuals=True, units=True, residuals_tol=1e-3, prom_name=True)
+    # prob.model.DESIGN.mixer.list_outputs(residuals=True, units=True, prom_name=True)
+    # prob.model.DESIGN.fc.list_inputs()
 
-for pt in od_pts:
-    mftf.page_viewer(prob, pt)
+    mftf.page_viewer(prob, 'DESIGN')
+    print(3*"\n")
 
-print()
+    for pt in od_pts:
+        mftf.page_viewer(prob, pt)
 
+    print()
@@ -6,7 +6,7 @@ import numpy as np
 from openmdao.api import Problem, Group, pyOptSparseDriver, DirectSolver
 from dymos import Phase
 
-from path_dependent_missions.thermal_mission.thermal_mission_problem import thermal_mission_problem
+from path_dependent_missions.thermal_mission.thermal_mission_problem import thermal_mission_factory
 from path_dependent_missions.utils.gen_mission_plot import save_results, plot_results
 
 options = {
@@ -26,9 +26,12 @@ options = {
 
 Q_env_recirc_list = np.linspace(4., 5., 3)*1e5
 
+# only the first case sets up the problem, the others change Q_env in place
+factory = thermal_mission_factory()
+
 for i, Q_env in enumerate(Q_env_recirc_list):
     options['Q_env'] = Q_env
-    p = thermal_mission_problem(**options)
+    p = factory.reconfigure(**options)
     p.run_driver()
     save_results(p, 'Q_env_recirc_{}.pkl'.format(i), options)
 
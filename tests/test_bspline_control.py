@@ -0,0 +1,95 @@
+from __future__ import print_function, division, absolute_import
+import unittest
+
+import numpy as np
+
+try:
+    from openmdao.api import Problem, Group, IndepVarComp
+    from openmdao.utils.assert_utils import assert_check_partials
+except ImportError:
+    Problem = None
+
+
+class _GridData(object):
+    """
+    The parts of the grid data of a Dymos phase that BSplineControlComp reads.
+    """
+
+    def __init__(self, num_nodes):
+        self.num_nodes = num_nodes
+        self.node_ptau = np.linspace(-1., 1., num_nodes)
+
+
+class _Phase(object):
+
+    def __init__(self, num_nodes):
+        self.grid_data = _GridData(num_nodes)
+
+
+@unittest.skipIf(Problem is None, 'OpenMDAO is not installed')
+class TestBSplineBasis(unittest.TestCase):
+
+    def test_partition_of_unity(self):
+        from path_dependent_missions.utils.bspline_control import bspline_basis
+
+        x = np.linspace(-1., 1., 41)
+        for num_cp, order in ((4, 4), (7, 4), (10, 3)):
+            B = bspline_basis(num_cp, x, order).toarray()
+            self.assertEqual(B.shape, (x.size, num_cp))
+            self.assertTrue(np.all(B >= 0.))
+            np.testing.assert_allclose(B.sum(axis=1), 1., rtol=1e-14)
+
+            # clamped: the ends are the first and last coefficients
+            np.testing.assert_allclose(B[0], np.eye(num_cp)[0], atol=1e-14)
+            np.testing.assert_allclose(B[-1], np.eye(num_cp)[-1], atol=1e-14)
+
+    def test_greville_reproduces_linear(self):
+        from path_dependent_missions.utils.bspline_control import bspline_basis, greville_abscissae
+
+        x = np.linspace(-1., 1., 33)
+        for num_cp in (4, 6, 11):
+            coeffs = 3. * greville_abscissae(num_cp) - 0.5
+            np.testing.assert_allclose(bspline_basis(num_cp, x).dot(coeffs), 3. * x - 0.5,
+                                       rtol=1e-13, atol=1e-13)
+
+    def test_too_few_coefficients(self):
+        from path_dependent_missions.utils.bspline_control import bspline_knots
+
+        with self.assertRaises(ValueError):
+            bspline_knots(3, order=4)
+
+
+@unittest.skipIf(Problem is None, 'OpenMDAO is not installed')
+class TestBSplineControlComp(unittest.TestCase):
+
+    def test_values_and_partials(self):
+        from path_dependent_missions.utils.bspline_control import BSplineControlComp, bspline_basis
+
+        np.random.seed(0)
+        num_cp, num_nodes = 6, 20
+        coeffs = np.random.uniform(-1., 1., num_cp)
+
+        p = Problem(model=Group())
+        ivc = IndepVarComp()
+        ivc.add_output('coeffs', val=coeffs, units='deg')
+        p.model.add_subsystem('ivc', ivc)
+        p.model.add_subsystem('bspline', BSplineControlComp(phase=_Phase(num_nodes), num_cp=num_cp,
+                                                            units='deg'))
+        p.model.connect('ivc.coeffs', 'bspline.coeffs')
+        p.setup(check=False)
+        p.run_model()
+
+        node_ptau = np.linspace(-1., 1., num_nodes)
+        np.testing.assert_allclose(p['bspline.values'], bspline_basis(num_cp, node_ptau).dot(coeffs),
+                                   rtol=1e-14)
+
+        # the spline lies between its smallest and largest coefficients
+        self.assertTrue(np.all(p['bspline.values'] <= coeffs.max() + 1e-14))
+        self.assertTrue(np.all(p['bspline.values'] >= coeffs.min() - 1e-14))
+
+        data = p.check_partials(out_stream=None, method='fd')
+        assert_check_partials(data, atol=1e-6, rtol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+from __future__ import print_function, division, absolute_import
+import unittest
+
+import numpy as np
+
+try:
+    import openmdao.api
+    import smt
+except ImportError:
+    smt = None
+
+
+LBF = 4.4482216152605  # N
+
+
+def _evaluate_models(h, v, alpha):
+    """
+    Thrust (N), lift and drag of the aero and F110 models at full throttle,
+    in a problem of their own at the given angles of attack (deg).
+    """
+    from openmdao.api import Problem, Group, IndepVarComp
+    from path_dependent_missions.escort.atmos.atmos_comp import AtmosComp
+    from path_dependent_missions.escort.aero import AeroGroup
+    from path_dependent_missions.escort.prop.F110_prop import PropGroup
+
+    nn = len(h)
+    p = Problem(model=Group())
+
+    ivc = p.model.add_subsystem('ivc', IndepVarComp(), promotes=['*'])
+    ivc.add_output('h', val=h, units='m')
+    ivc.add_output('v', val=v, units='m/s')
+    ivc.add_output('alpha', val=alpha, units='deg')
+    ivc.add_output('S', val=49.2386 * np.ones(nn), units='m**2')
+    ivc.add_output('throttle', val=np.ones(nn))
+
+    p.model.add_subsystem('atmos', AtmosComp(num_nodes=nn), promotes_inputs=['h'])
+    p.model.add_subsystem('aero', AeroGroup(num_nodes=nn), promotes_inputs=['v', 'alpha', 'S'])
+    p.model.connect('atmos.sos', 'aero.sos')
+    p.model.connect('atmos.rho', 'aero.rho')
+    p.model.add_subsystem('prop', PropGroup(num_nodes=nn), promotes_inputs=['h', 'throttle'])
+    p.model.connect('aero.mach', 'prop.mach')
+
+    p.setup(check=False)
+    p.run_model()
+
+    # the F110 components give the thrust in lbf
+    return p['prop.thrust'] * LBF, p['aero.f_lift'], p['aero.f_drag']
+
+
+@unittest.skipIf(smt is None, 'OpenMDAO and SMT are needed')
+class TestExcessPower(unittest.TestCase):
+
+    def test_trim_and_excess_power(self):
+        from path_dependent_missions.escort.energy_state import excess_power, g
+
+        h = np.array([0., 5000., 11000.])
+        v = np.array([170., 250., 300.])
+        mass = 19030.468
+        res = excess_power(h, v, mass=mass)
+
+        thrust, lift, drag = _evaluate_models(h, v, res['alpha'])
+        weight = mass * g
+
+        # the lift is linear in alpha, so the interpolated trim is exact
+        np.testing.assert_allclose(lift, weight, rtol=1e-8)
+        np.testing.assert_allclose(res['thrust'], thrust, rtol=1e-8)
+
+        # the drag is interpolated linearly between the angles of the grid
+        np.testing.assert_allclose(res['drag'], drag, rtol=1e-2)
+        np.testing.assert_allclose(res['Ps'], v * (thrust - drag) / weight, rtol=2e-3)
+
+        # a fighter at full throttle at sea level and Mach 0.5 climbs at a few
+        # hundred m/s; the thrust read as N instead of lbf gives a negative Ps
+        self.assertTrue(50. < res['Ps'][0] < 400., res['Ps'][0])
+
+
+@unittest.skipIf(smt is None, 'OpenMDAO and SMT are needed')
+class TestEnergyClimb(unittest.TestCase):
+
+    def test_small_climb(self):
+        from path_dependent_missions.escort.energy_state import energy_climb, excess_power, g
+
+        h0, v0, hf, vf, max_dh = 100., 136., 6000., 250., 2000.
+        path = energy_climb(h0=h0, v0=v0, hf=hf, vf=vf, num_h=11, num_levels=12, max_dh=max_dh)
+
+        self.assertEqual((path['h'][0], path['v'][0]), (h0, v0))
+        self.assertEqual((path['h'][-1], path['v'][-1]), (hf, vf))
+
+        # the path climbs in energy at every level, on the energy levels
+        E = path['h'] + path['v'] ** 2 / (2 * g)
+        np.testing.assert_allclose(E, path['E'], rtol=1e-10)
+        self.assertTrue(np.all(np.diff(E) > 0.))
+        self.assertTrue(np.all(np.abs(np.diff(path['h'])) <= max_dh))
+
+        # Ps at each point of the path, and the time to climb through the levels
+        Ps = excess_power(path['h'], path['v'])['Ps']
+        np.testing.assert_allclose(path['Ps'], Ps, rtol=1e-10)
+        self.assertTrue(np.all(Ps > 0.))
+        dt = 0.5 * np.diff(E) * (1. / Ps[1:] + 1. / Ps[:-1])
+        np.testing.assert_allclose(path['time'][-1], np.sum(dt), rtol=1e-10)
+        self.assertTrue(np.all(np.diff(path['fuel']) > 0.))
+
+
+if __name__ == '__main__':
+    unittest.main()
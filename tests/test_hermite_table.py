@@ -0,0 +1,93 @@
+from __future__ import print_function, division, absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from path_dependent_missions.utils.hermite_table import HermiteTable
+
+
+XLIMITS = np.array([[-1., 2.], [0.5, 3.]])
+
+
+def _cubic(x):
+    x0, x1 = x[:, 0], x[:, 1]
+    return np.column_stack((x0 ** 3 * x1 ** 2 + x0 * x1 ** 2 + x1 ** 3 - 2. * x0 ** 2 + 1.,
+                            x1 ** 3 - x0 * x1))
+
+
+def _dcubic(x, kx):
+    x0, x1 = x[:, 0], x[:, 1]
+    if kx == 0:
+        return np.column_stack((3. * x0 ** 2 * x1 ** 2 + x1 ** 2 - 4. * x0, -x1))
+    return np.column_stack((2. * x0 ** 3 * x1 + 2. * x0 * x1 + 3. * x1 ** 2, 3. * x1 ** 2 - x0))
+
+
+def _random_points(n):
+    np.random.seed(0)
+    return XLIMITS[:, 0] + np.random.rand(n, 2) * (XLIMITS[:, 1] - XLIMITS[:, 0])
+
+
+class TestHermiteTable(unittest.TestCase):
+
+    def test_cubic_is_exact(self):
+        # cubic in each input, and the mixed derivatives, obtained by central
+        # differences of df/dx0 along x1, are exact since df/dx0 is quadratic in x1
+        table = HermiteTable.from_function(XLIMITS, [5, 4], _cubic, _dcubic)
+        x = _random_points(50)
+
+        np.testing.assert_allclose(table.predict_values(x), _cubic(x), rtol=1e-12, atol=1e-12)
+        for kx in range(2):
+            np.testing.assert_allclose(table.predict_derivatives(x, kx), _dcubic(x, kx),
+                                       rtol=1e-11, atol=1e-11)
+
+    def test_grid_data_is_exact_on_quadratics(self):
+        # the central differences of from_grid_data are exact on quadratics,
+        # also on a non-uniform grid
+        grids = [np.array([-1., -0.2, 0.3, 1.1, 2.]), np.array([0.5, 1., 2.2, 3.])]
+        func = lambda x: np.column_stack((x[:, 0] ** 2 * x[:, 1] ** 2 - 3. * x[:, 0] * x[:, 1] + x[:, 1],))
+
+        x0, x1 = np.meshgrid(*grids, indexing='ij')
+        values = func(np.column_stack((x0.ravel(), x1.ravel()))).reshape(x0.shape + (1,))
+        table = HermiteTable.from_grid_data(grids, values)
+
+        x = _random_points(50)
+        np.testing.assert_allclose(table.predict_values(x), func(x), rtol=1e-12, atol=1e-12)
+
+    def test_derivatives_match_finite_differences(self):
+        func = lambda x: np.column_stack((np.sin(2. * x[:, 0]) * np.exp(-x[:, 1]), x[:, 0] * np.cos(x[:, 1])))
+        x0, x1 = np.meshgrid(np.linspace(-1., 2., 7), np.linspace(0.5, 3., 6), indexing='ij')
+        values = func(np.column_stack((x0.ravel(), x1.ravel()))).reshape(x0.shape + (2,))
+        table = HermiteTable.from_grid_data([x0[:, 0], x1[0, :]], values)
+
+        x = _random_points(30)
+        step = 1e-6
+        for kx in range(2):
+            dx = np.zeros(2)
+            dx[kx] = step
+            fd = (table.predict_values(x + dx) - table.predict_values(x - dx)) / (2 * step)
+            np.testing.assert_allclose(table.predict_derivatives(x, kx), fd, rtol=1e-6, atol=1e-7)
+
+    def test_save_and_export(self):
+        table = HermiteTable.from_function(XLIMITS, [5, 4], _cubic, _dcubic)
+        x = _random_points(10)
+
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmp_dir, 'table.npz')
+            table.save(filename)
+            np.testing.assert_array_equal(HermiteTable.load(filename).predict_values(x),
+                                          table.predict_values(x))
+
+            dirname = os.path.join(tmp_dir, 'table')
+            table.export(dirname)
+            np.testing.assert_array_equal(HermiteTable.attach(dirname).predict_values(x),
+                                          table.predict_values(x))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+from __future__ import print_function, division, absolute_import
+import unittest
+
+import numpy as np
+
+try:
+    from openmdao.api import Problem, Group, IndepVarComp
+    from openmdao.utils.assert_utils import assert_check_partials
+except ImportError:
+    Problem = None
+
+try:
+    import dymos
+    from pyoptsparse import OPT
+    OPT('SNOPT')
+except Exception:
+    dymos = None
+
+
+class _GridData(object):
+    """
+    The parts of the grid data of a Dymos phase that KSComp reads.
+    """
+
+    def __init__(self, segment_sizes):
+        ends = np.cumsum(segment_sizes)
+        self.num_nodes = int(ends[-1])
+        self.segment_indices = np.column_stack((ends - segment_sizes, ends))
+
+
+class _Phase(object):
+
+    def __init__(self, segment_sizes):
+        self.grid_data = _GridData(segment_sizes)
+
+
+def _ks_problem(g, segment_sizes, **options):
+    from path_dependent_missions.utils.ks_constraint import KSComp
+
+    p = Problem(model=Group())
+    ivc = IndepVarComp()
+    ivc.add_output('g', val=g, units='m')
+    p.model.add_subsystem('ivc', ivc)
+    p.model.add_subsystem('ks', KSComp(phase=_Phase(segment_sizes), units='m', **options))
+    p.model.connect('ivc.g', 'ks.g')
+    p.setup(check=False, force_alloc_complex=True)
+    p.run_model()
+    return p
+
+
+@unittest.skipIf(Problem is None, 'OpenMDAO is not installed')
+class TestKSComp(unittest.TestCase):
+
+    def test_bounds_of_max(self):
+        np.random.seed(0)
+        segment_sizes = [4, 7, 5]
+        g = np.random.uniform(0., 2., sum(segment_sizes))
+        rho = 20.
+        p = _ks_problem(g, segment_sizes, segmented=True, rho=rho, ref=0.5, bound=1.)
+
+        s = (g - 1.) / 0.5
+        ends = np.cumsum(segment_sizes)
+        for k, (i0, i1) in enumerate(zip(ends - segment_sizes, ends)):
+            s_max = np.max(s[i0:i1])
+            self.assertLessEqual(p['ks.KS'][k], s_max + 1e-12)
+            self.assertGreaterEqual(p['ks.KS'][k], s_max - np.log(i1 - i0) / rho - 1e-12)
+
+    def test_active_bound_is_feasible(self):
+        # fixed initial altitude on the lower bound, every other node above it
+        g = np.linspace(100., 20000., 12)
+        p = _ks_problem(g, [12], upper=False, rho=50., ref=20000., bound=100.)
+        self.assertLess(p['ks.KS'][0], 0.)
+
+        # final altitude on the upper bound
+        p = _ks_problem(g, [12], upper=True, rho=50., ref=20000., bound=20000.)
+        self.assertLess(p['ks.KS'][0], 0.)
+
+    def test_partials(self):
+        np.random.seed(1)
+        segment_sizes = [3, 6]
+        g = np.random.uniform(-1., 1., sum(segment_sizes))
+        for upper in (True, False):
+            p = _ks_problem(g, segment_sizes, upper=upper, segmented=True, rho=10., ref=2.)
+            data = p.check_partials(out_stream=None, method='cs')
+            assert_check_partials(data, atol=1e-10, rtol=1e-10)
+
+
+class _System(object):
+
+    def __init__(self):
+        self._responses = {'path:h': {'upper': 1., 'lower': None, 'scaler': 0.5, 'adder': None}}
+
+
+class _Model(object):
+    pass
+
+
+class _Driver(object):
+    """
+    Driver whose run moves h to its exact optimum, 2, when the per-node
+    constraint is active, and to the aggregated one, 2.1, otherwise.
+    """
+
+    def __init__(self, p, system):
+        self.p = p
+        self.system = system
+        self.hotstart_file = 'hotstart.hst'
+        self.hist_file = 'hist.hst'
+        self.runs = []
+
+    def _update_voi_meta(self, model):
+        pass
+
+    def run(self):
+        exact = 'path:h' in self.system._responses
+        self.runs.append((exact, self.hotstart_file))
+        self.p.values['phase.h'] = np.array([1., 2. if exact else 2.1])
+        return False
+
+
+class _Problem(object):
+
+    def __init__(self):
+        self.values = {}
+        self.model = _Model()
+        self.system = _System()
+        self.driver = _Driver(self, self.system)
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+
+@unittest.skipIf(Problem is None, 'OpenMDAO is not installed')
+class TestExactPolish(unittest.TestCase):
+
+    def test_polish_violated_constraints(self):
+        from path_dependent_missions.utils.ks_constraint import _deactivate, use_exact_polish, \
+            path_constraint_violations
+
+        p = _Problem()
+        _deactivate(p, {'phase.h': (p.system, 'path:h')})
+        use_exact_polish(p)
+
+        self.assertFalse(p.driver.run())
+        # the aggregated run, then the exact one without the history files
+        self.assertEqual(p.driver.runs, [(False, 'hotstart.hst'), (True, None)])
+        self.assertEqual(p.driver.hotstart_file, 'hotstart.hst')
+        self.assertLessEqual(path_constraint_violations(p)['phase.h'], 0.)
+
+        # the next run starts aggregated
+        self.assertNotIn('path:h', p.system._responses)
+
+
+@unittest.skipIf(dymos is None, 'Dymos and pyOptSparse with SNOPT are needed')
+class TestAggregatedMission(unittest.TestCase):
+
+    def test_default_mission_converges(self):
+        from path_dependent_missions.thermal_mission.thermal_mission_problem import \
+            thermal_mission_problem
+        from path_dependent_missions.utils.ks_constraint import path_constraint_violations
+
+        p = thermal_mission_problem(num_seg=5, aggregate='phase')
+        failed = p.run_driver()
+        self.assertFalse(failed)
+
+        # the aggregates alone allow violations of ref * log(n) / rho, which
+        # the polish with the exact path constraints removes
+        for name, violation in path_constraint_violations(p, scaled=True).items():
+            self.assertLess(violation, 1e-6, name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+from __future__ import print_function, division, absolute_import
+import unittest
+
+import numpy as np
+
+from path_dependent_missions.utils.memoize import design_vector_key, use_memoization
+
+
+class _Driver(object):
+    """
+    The callbacks of a pyOptSparseDriver that use_memoization wraps, counting
+    the model runs and total derivative computations.
+    """
+
+    def __init__(self, points):
+        self.points = points
+        self.model_runs = 0
+        self.totals = 0
+
+    def _objfunc(self, dv_dict):
+        self.model_runs += 1
+        return {'obj': np.sum(dv_dict['x'] ** 2)}, False
+
+    def _gradfunc(self, dv_dict, func_dict):
+        self.totals += 1
+        return {'obj': {'x': 2. * dv_dict['x']}}, False
+
+    def run(self):
+        for x in self.points:
+            dv_dict = {'x': np.array(x)}
+            func_dict, _ = self._objfunc(dv_dict)
+            self._gradfunc(dv_dict, func_dict)
+        return False
+
+
+class _Problem(object):
+
+    def __init__(self, driver):
+        self.driver = driver
+
+
+class TestMemoization(unittest.TestCase):
+
+    def test_key(self):
+        x = np.array([0.1 + 0.2, 3.])
+        self.assertEqual(design_vector_key({'x': x}), design_vector_key({'x': np.array([0.3, 3.])}))
+        self.assertNotEqual(design_vector_key({'x': x}),
+                            design_vector_key({'x': np.array([0.3 + 1e-9, 3.])}))
+        self.assertNotEqual(design_vector_key({'x': x}), design_vector_key({'y': x}))
+
+    def test_repeated_points(self):
+        # a line search that comes back to its starting point, twice
+        points = [[1., 2.], [0.5, 1.], [1., 2.], [0.75, 1.5], [1., 2.]]
+        driver = _Driver(points)
+        use_memoization(_Problem(driver), maxsize=10)
+
+        self.assertFalse(driver.run())
+        self.assertEqual(driver.model_runs, 3)
+        self.assertEqual(driver.totals, 3)
+        self.assertEqual(driver.memo_stats, {'func_hits': 2, 'func_misses': 3,
+                                             'grad_hits': 2, 'grad_misses': 3})
+
+        # every run starts with empty caches
+        driver.run()
+        self.assertEqual(driver.model_runs, 6)
+        self.assertEqual(driver.memo_stats['func_hits'], 2)
+
+    def test_gradient_runs_the_model_first(self):
+        driver = _Driver([])
+        use_memoization(_Problem(driver), maxsize=10)
+
+        a, b = {'x': np.array([1., 2.])}, {'x': np.array([3., 4.])}
+        driver._objfunc(a)
+        driver._objfunc(b)
+        # the model is at b, so the gradient at a (a function hit) reruns it
+        driver._objfunc(a)
+        sens, fail = driver._gradfunc(a, None)
+        self.assertEqual(driver.model_runs, 3)
+        np.testing.assert_array_equal(sens['obj']['x'], [2., 4.])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+from __future__ import print_function, division, absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from path_dependent_missions.f110_pycycle.od_cache import ODPointCache, get_design_inputs, \
+    cached_points, get_point_states, set_point_states, od_state_vars, _seed_states
+
+
+class _MapData(object):
+    """
+    The parts of a pyCycle map data module that the cache key reads.
+    """
+
+    def __init__(self, scale=1.):
+        self.param_data = [{'name': 'NcMap', 'values': np.array([0.5, 0.8, 1.])}]
+        self.output_data = [{'name': 'PRmap', 'values': scale * np.array([1.5, 2.5, 3.2])}]
+
+
+class _System(object):
+
+    def __init__(self, pathname, **options):
+        self.pathname = pathname
+        self.options = options
+
+
+class _Model(object):
+
+    def __init__(self, systems):
+        self.systems = systems
+
+    def system_iter(self, recurse=True):
+        return iter(self.systems)
+
+
+class _Problem(object):
+    """
+    Problem with the design inputs as promoted values and a model of the
+    given option dicts.
+    """
+
+    def __init__(self, values, smooth=False, rho=10., map_scale=1.):
+        self.values = values
+        self.model = _Model([_System('DESIGN', smooth=smooth, rho=rho),
+                             _System('DESIGN.fan.map', map_data=_MapData(map_scale)),
+                             _System('DESIGN.inlet')])
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def __setitem__(self, name, value):
+        self.values[name] = np.array(value)
+
+
+DESIGN_VALUES = {'alt': 0., 'MN': 1e-6, 'T4max': 3200., 'T4maxab': 3400., 'Fn_des': 17000.,
+                 'Mix_ER': 1.05, 'fan:PRdes': 3.3, 'hpc:PRdes': 9.3}
+
+POINT = (0.8, 20000., 0., 0., 0.)
+
+
+class TestODPointCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = ODPointCache(os.path.join(self.tmp_dir, 'od_points.sqlite'))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def _put(self, design_inputs, point, value=1.):
+        self.cache.put(design_inputs, point, {'balance.W': value}, {'perf.Fn': 10. * value})
+
+    def test_model_options_change_the_key(self):
+        design_inputs = get_design_inputs(_Problem(DESIGN_VALUES))
+        self.assertEqual(design_inputs['_System:smooth'], [False])
+        self.assertEqual(design_inputs['_System:rho'], [10.])
+        self.assertEqual(len(design_inputs['_System:map_data']), 1)
+        self._put(design_inputs, POINT)
+
+        self.assertIsNotNone(self.cache.get(get_design_inputs(_Problem(DESIGN_VALUES)), POINT))
+        for kwargs in ({'smooth': True}, {'rho': 20.}, {'map_scale': 1.01}):
+            other = get_design_inputs(_Problem(DESIGN_VALUES, **kwargs))
+            self.assertIsNone(self.cache.get(other, POINT), kwargs)
+            self.assertIsNone(self.cache.nearest(other, POINT), kwargs)
+
+        values = dict(DESIGN_VALUES, T4max=3210.)
+        self.assertIsNone(self.cache.get(get_design_inputs(_Problem(values)), POINT))
+
+    def test_round_off_shares_the_key(self):
+        design_inputs = get_design_inputs(_Problem(DESIGN_VALUES))
+        self._put(design_inputs, POINT)
+
+        values = dict((name, value * (1. + 1e-15)) for name, value in DESIGN_VALUES.items())
+        point = (0.1 + 0.7, 20000. * (1. - 1e-15), 0., 0., 0.)
+        found = self.cache.get(get_design_inputs(_Problem(values)), point)
+        self.assertIsNotNone(found)
+        self.assertEqual(found[0]['balance.W'], [1.])
+        self.assertEqual(found[1]['perf.Fn'], [10.])
+
+    def test_cached_points(self):
+        design_inputs = get_design_inputs(_Problem(DESIGN_VALUES))
+        points = {'OD0': POINT, 'OD1': (0.5, 0., 0., 0., 1.)}
+        self._put(design_inputs, points['OD0'], value=1.)
+        self.assertIsNone(cached_points(self.cache, design_inputs, points))
+
+        self._put(design_inputs, points['OD1'], value=2.)
+        outputs = cached_points(self.cache, design_inputs, points)
+        self.assertEqual(outputs['OD0']['perf.Fn'][0], 10.)
+        self.assertEqual(outputs['OD1']['perf.Fn'][0], 20.)
+
+    def test_seed_states_keeps_closer_guesses(self):
+        design_inputs = get_design_inputs(_Problem(DESIGN_VALUES))
+        self._put(design_inputs, (0.8, 20000., 0., 0., 0.), value=1.)
+        self._put(design_inputs, (0.9, 24000., 0., 0., 0.), value=2.)
+        point = (0.8, 21000., 0., 0., 0.)
+
+        # rough guesses: the nearest cached point
+        states = _seed_states(self.cache, design_inputs, point, None, max_distance=1.)
+        self.assertEqual(states['balance.W'], [1.])
+
+        # guesses converged at a closer point are kept
+        states = _seed_states(self.cache, design_inputs, point, (0.8, 20800., 0., 0., 0.),
+                              max_distance=1.)
+        self.assertIsNone(states)
+        self.assertEqual(self.cache.misses, 1)
+
+        # guesses converged farther away than the nearest cached point are replaced
+        states = _seed_states(self.cache, design_inputs, point, (0.9, 24000., 0., 0., 0.),
+                              max_distance=1.)
+        self.assertEqual(states['balance.W'], [1.])
+
+        # a point as far as max_distance is not used
+        states = _seed_states(self.cache, design_inputs, (0.8, 22000., 0., 0., 0.), None,
+                              max_distance=1.)
+        self.assertIsNone(states)
+
+
+class TestGroupedPointStates(unittest.TestCase):
+
+    def test_grouped_far(self):
+        # the points of a group have no core FAR balance of their own
+        values = dict(('OD.pt1.' + var, np.array([1.])) for var in od_state_vars
+                      if var != 'far_core_bal.FAR')
+        values['OD.far_core_bal.FAR'] = np.array([0.02, 0.03, 0.04])
+        prob = _Problem(values)
+
+        states = get_point_states(prob, 'OD.pt1', 'OD')
+        self.assertEqual(states['far_core_bal.FAR'], [0.03])
+
+        states['far_core_bal.FAR'] = [0.035]
+        states['balance.W'] = [2.]
+        set_point_states(prob, 'OD.pt1', states, 'OD')
+        np.testing.assert_array_equal(values['OD.far_core_bal.FAR'], [0.02, 0.035, 0.04])
+        self.assertEqual(values['OD.pt1.balance.W'], [2.])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+from __future__ import print_function, division, absolute_import
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from path_dependent_missions.F110.surrogate_benchmark import load_results, select_model
+
+
+class TestLoadResults(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_select_model_after_reload(self):
+        results = {
+            'RMTB': {'max_error_thrust': 1e-3, 'max_error_fuel_flow': 2e-3,
+                     'throughput': {10: 1e4, 1000: 1e6}, 'deriv_cost': {10: 2., 1000: None}},
+            'KRG': {'max_error_thrust': 1e-4, 'max_error_fuel_flow': 1e-4,
+                    'throughput': {10: 1e3, 1000: 1e5}, 'deriv_cost': {10: 3., 1000: 3.}},
+            'IDW': {'error': 'failed to train'},
+        }
+        filename = os.path.join(self.tmp_dir, 'results.json')
+        with open(filename, 'w') as f:
+            json.dump(results, f)
+
+        loaded = load_results(filename)
+        self.assertEqual(loaded['RMTB']['throughput'], results['RMTB']['throughput'])
+        self.assertEqual(loaded['RMTB']['deriv_cost'], results['RMTB']['deriv_cost'])
+        self.assertEqual(select_model(loaded, 1e-2, batch_size=1000), 'RMTB')
+        self.assertEqual(select_model(loaded, 1e-3, batch_size=1000), 'KRG')
+
+
+if __name__ == '__main__':
+    unittest.main()
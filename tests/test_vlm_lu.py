@@ -0,0 +1,105 @@
+from __future__ import print_function, division, absolute_import
+import unittest
+
+import numpy as np
+
+# path_dependent_missions.CRM.aero imports the OpenAeroStruct groups
+try:
+    from openmdao.api import Problem, Group, IndepVarComp
+    from openmdao.utils.assert_utils import assert_check_partials
+    import openaerostruct
+except ImportError:
+    Problem = None
+
+
+def _crm_factorization():
+    from path_dependent_missions.CRM.aero.vlm_lu import VLMFactorization, wing_mesh, crm_chord, \
+        crm_twist, crm_displacement_x, crm_displacement_y, crm_displacement_z
+
+    mesh = wing_mesh(crm_chord, crm_twist, crm_displacement_x, crm_displacement_y,
+                     crm_displacement_z, num_x=3, num_y=9)
+    return VLMFactorization(mesh)
+
+
+@unittest.skipIf(Problem is None, 'OpenMDAO and OpenAeroStruct are needed')
+class TestVLMFactorization(unittest.TestCase):
+
+    def test_prandtl_glauert(self):
+        factorization = _crm_factorization()
+        alpha = np.array([0.02, 0.02])
+        mach = np.array([0., 0.6])
+        CL, CD = factorization.coefficients(alpha, mach)[:2]
+
+        # the induced drag is quadratic in the circulations, and the lift
+        # nearly linear, with a small quadratic part from the induced velocities
+        beta = np.sqrt(1. - 0.6 ** 2)
+        self.assertAlmostEqual(CD[1] / CD[0], 1. / beta ** 2, places=12)
+        self.assertAlmostEqual(CL[1] / CL[0], 1. / beta, places=3)
+
+        # a finite wing has a lift slope below 2 pi, and a positive induced drag
+        CL_a = factorization.coefficients(np.array([0.]), np.array([0.]))[2][0]
+        self.assertTrue(3. < CL_a < 2 * np.pi, CL_a)
+        self.assertTrue(np.all(CD > 0.))
+
+    def test_derivatives_match_finite_differences(self):
+        factorization = _crm_factorization()
+        alpha = np.array([-0.05, 0.01, 0.08])
+        mach = np.array([0.2, 0.5, 0.8])
+        re = np.array([0.5, 2., 8.])
+        step = 1e-7
+
+        CL, CD, dCL_da, dCL_dm, dCD_da, dCD_dm = factorization.coefficients(alpha, mach)
+        CL_p, CD_p = factorization.coefficients(alpha + step, mach)[:2]
+        CL_m, CD_m = factorization.coefficients(alpha - step, mach)[:2]
+        np.testing.assert_allclose(dCL_da, (CL_p - CL_m) / (2 * step), rtol=1e-6)
+        np.testing.assert_allclose(dCD_da, (CD_p - CD_m) / (2 * step), rtol=1e-6)
+
+        CL_p, CD_p = factorization.coefficients(alpha, mach + step)[:2]
+        CL_m, CD_m = factorization.coefficients(alpha, mach - step)[:2]
+        np.testing.assert_allclose(dCL_dm, (CL_p - CL_m) / (2 * step), rtol=1e-6)
+        np.testing.assert_allclose(dCD_dm, (CD_p - CD_m) / (2 * step), rtol=1e-6)
+
+        CDv, dCDv_dm, dCDv_dre = factorization.viscous_drag(mach, re)
+        self.assertTrue(np.all((CDv > 1e-3) & (CDv < 3e-2)), CDv)
+        fd = (factorization.viscous_drag(mach + step, re)[0]
+              - factorization.viscous_drag(mach - step, re)[0]) / (2 * step)
+        np.testing.assert_allclose(dCDv_dm, fd, rtol=1e-6)
+        fd = (factorization.viscous_drag(mach, re + step)[0]
+              - factorization.viscous_drag(mach, re - step)[0]) / (2 * step)
+        np.testing.assert_allclose(dCDv_dre, fd, rtol=1e-6)
+
+
+@unittest.skipIf(Problem is None, 'OpenMDAO and OpenAeroStruct are needed')
+class TestVLMLUComp(unittest.TestCase):
+
+    def test_partials(self):
+        from path_dependent_missions.CRM.aero.vlm_lu import VLMLUComp
+
+        nn = 4
+        p = Problem(model=Group())
+        ivc = IndepVarComp()
+        ivc.add_output('alpha', val=np.linspace(-0.05, 0.1, nn), units='rad')
+        ivc.add_output('mach', val=np.linspace(0.2, 0.85, nn))
+        # a dynamic pressure times area of order one, so that the absolute and
+        # relative errors of the finite differences are comparable
+        ivc.add_output('v', val=np.linspace(1., 2., nn), units='m/s')
+        ivc.add_output('rho', val=np.linspace(0.005, 0.01, nn), units='kg/m**3')
+        ivc.add_output('Re_1e6', val=np.linspace(1., 10., nn))
+        p.model.add_subsystem('ivc', ivc, promotes=['*'])
+        p.model.add_subsystem('aero', VLMLUComp(num_nodes=nn, CD0=0.01), promotes=['*'])
+        p.setup(check=False)
+        p.run_model()
+
+        data = p.check_partials(out_stream=None, method='fd', form='central', step=1e-7)
+        # the geometry inputs have no partials, the wing is fixed during a mission
+        for key in list(data['aero']):
+            if key[1].startswith('wing_'):
+                del data['aero'][key]
+        assert_check_partials(data, atol=1e-6, rtol=1e-6)
+
+        # the drag is the induced, viscous and parasite drag
+        self.assertTrue(np.all(p['C_D'] > 0.01))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+from __future__ import print_function, division, absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+try:
+    from smt.surrogate_models import RMTB
+except ImportError:
+    RMTB = None
+
+
+def _training_data(num, seed):
+    rng = np.random.RandomState(seed)
+    xt = rng.rand(num, 2)
+    yt = np.sin(3. * xt[:, 0]) * np.cos(2. * xt[:, 1]) + xt[:, 0] ** 3
+    return xt, yt
+
+
+@unittest.skipIf(RMTB is None, 'SMT is not installed')
+class TestWarmStartRMTB(unittest.TestCase):
+
+    def setUp(self):
+        from path_dependent_missions.utils.warm_rmts import WarmStartRMTB
+
+        class _CountingRMTB(WarmStartRMTB):
+
+            def _new_train(self):
+                _CountingRMTB.cold_trainings += 1
+                super(_CountingRMTB, self)._new_train()
+
+        _CountingRMTB.cold_trainings = 0
+        self.sm_class = _CountingRMTB
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.tmp_dir, 'rmtb_state.pkl')
+        self.options = dict(xlimits=np.array([[0., 1.], [0., 1.]]), order=3, num_ctrl_pts=8,
+                            energy_weight=1e-4, regularization_weight=0., nonlinear_maxiter=20,
+                            solver_tolerance=1e-7, print_global=False)
+
+        # the state of a previous training, before a few points were corrected
+        self.xt, yt = _training_data(60, seed=0)
+        self._train(self.xt, yt)
+        self.yt = yt.copy()
+        self.yt[:3] += 1e-2
+        self.x = _training_data(200, seed=1)[0]
+
+        cold = RMTB(**self.options)
+        cold.set_training_values(self.xt, self.yt)
+        cold.train()
+        self.cold = cold.predict_values(self.x)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _train(self, xt, yt, **options):
+        sm = self.sm_class(state_file=self.state_file, **dict(self.options, **options))
+        sm.set_training_values(xt, yt)
+        sm.train()
+        return sm
+
+    def test_warm_matches_cold(self):
+        sm = self._train(self.xt, self.yt)
+        self.assertEqual(self.sm_class.cold_trainings, 1)
+        np.testing.assert_allclose(sm.predict_values(self.x), self.cold, atol=1e-6)
+
+    def test_unconverged_warm_start_falls_back(self):
+        # no Newton iteration at all from the previous solution
+        sm = self._train(self.xt, self.yt, warm_start_maxiter=0)
+        self.assertEqual(self.sm_class.cold_trainings, 2)
+        np.testing.assert_allclose(sm.predict_values(self.x), self.cold, atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()